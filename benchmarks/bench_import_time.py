@@ -0,0 +1,70 @@
+"""
+Cold start time of the command line interface.
+
+Each command is started in a fresh interpreter several times and the median wall time
+is compared with its budget. Commands that do not run the solver must also not import
+any of the heavy modules. Exits with status 1 if a budget is exceeded.
+
+    python benchmarks/bench_import_time.py [--repeat 5]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ['arcpy', 'matplotlib', 'scipy', 'jinja2', 'pandas']
+
+# Median wall time budgets in seconds, including the interpreter start
+BUDGETS = {
+    'help': (['main.py', '--help'], 0.5),
+    'validate': (['main.py', 'validate', '--config', 'config.yaml'], 1.0),
+}
+
+# Modules that must stay unimported after running a command
+IMPORT_CHECK = """
+import contextlib, io, sys
+from src.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        main({argv!r})
+    except SystemExit:
+        pass
+print(','.join(m for m in {modules!r} if m in sys.modules))
+"""
+
+def time_command(args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd = ROOT, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def heavy_imports(argv):
+    code = IMPORT_CHECK.format(argv = argv, modules = HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], cwd = ROOT, capture_output = True, text = True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'command':<12} {'median (s)':>10} {'budget (s)':>10}  heavy imports")
+    for name, (command, budget) in BUDGETS.items():
+        elapsed = time_command(command, args.repeat)
+        heavy = heavy_imports(command[1:])
+        ok = elapsed <= budget and not heavy
+        failed |= not ok
+        print(f"{name:<12} {elapsed:>10.3f} {budget:>10.3f}  {', '.join(heavy) or '-'}{'' if ok else '  FAILED'}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Latency and throughput of the yield service on a single node.
+
+The service runs in-process on a local port with a synthetic DEM and config, so the
+benchmark needs neither ArcGIS nor network access. Clients keep their connections alive
+and send requests for a set of sites concurrently. Exits with status 1 if the p95
+latency or the throughput misses its budget.
+
+    python benchmarks/bench_service.py [--requests 2000] [--concurrency 32] [--sites 20]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.service import YieldService
+from synthetic import synthetic_dem
+
+# Budgets per endpoint: p95 latency (ms) and minimum requests per second
+BUDGETS = {
+    '/yield': (50, 500),
+    '/sizing': (150, 200),
+}
+
+def synthetic_config(cache_dir):
+    return {
+        'location': [660000.0, 5150000.0],
+        'crs': 25832,
+        'dem': 'synthetic',
+        'optimization': {'optim_file': None},
+        'output_directory': str(Path(cache_dir, 'output')),
+        'FeatureSolarRadiation': {'start_date_time': "1/1/2024", 'end_date_time': "12/31/2024"},
+        'orientation': {'n_steps': 24, 'n_directions': 36, 'max_distance': 10000},
+        'sizing': {'area': list(range(5, 35, 5)), 'n': 10000},
+        'panels': {
+            'south': {'area': 10, 'slope': 30, 'aspect': 180, 'efficiency': 0.18, 'system_loss': 0.85},
+            'west': {'area': 8, 'slope': 20, 'aspect': 270, 'efficiency': 0.18, 'system_loss': 0.85},
+        },
+    }
+
+async def request(reader, writer, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) != b'\r\n':
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def run_clients(port, path, payloads, concurrency):
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            status = await request(reader, writer, path, payload)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+async def benchmark(args):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = YieldService(synthetic_config(cache_dir), dem = synthetic_dem())
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        rng = np.random.default_rng(1)
+        sites = [[660000.0 + dx, 5150000.0 + dy] for dx, dy in rng.uniform(-5000, 5000, (args.sites, 2))]
+        # Compute the sky models of all sites before timing
+        for site in sites:
+            service.sky_model(tuple(site))
+
+        failed = False
+        print(f"{'endpoint':<10} {'requests':>8} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'batches':>8} {'errors':>7}")
+        for path, (p95_budget, rps_budget) in BUDGETS.items():
+            payloads = []
+            for i in range(args.requests):
+                payload = {'location': sites[i % len(sites)], 'panels': {'a': {'slope': int(rng.integers(0, 60)), 'aspect': int(rng.integers(90, 270)), 'area': 10}}}
+                if path == '/sizing':
+                    payload['consumption'] = [300] * 12
+                payloads.append(payload)
+
+            batcher = service.sizing_batcher if path == '/sizing' else service.batcher
+            batches = batcher.batches
+            latencies, errors, elapsed = await run_clients(port, path, payloads, args.concurrency)
+            latencies = np.array(latencies) * 1000
+            p50, p95 = np.percentile(latencies, [50, 95])
+            rps = len(latencies) / elapsed
+            ok = p95 <= p95_budget and rps >= rps_budget and errors == 0
+            failed |= not ok
+            print(
+                f"{path:<10} {len(latencies):>8} {rps:>8.0f} {p50:>9.1f} {p95:>9.1f} "
+                f"{batcher.batches - batches:>8} {errors:>7}{'' if ok else '  FAILED'}"
+            )
+
+        server.close()
+        await server.wait_closed()
+    return failed
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type = int, default = 2000)
+    parser.add_argument('--concurrency', type = int, default = 32)
+    parser.add_argument('--sites', type = int, default = 20)
+    args = parser.parse_args(argv)
+
+    sys.exit(1 if asyncio.run(benchmark(args)) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Deterministic stand-in for the parts of arcpy used by the package.
+
+Only meant for benchmarks on machines without ArcGIS. Datasets are plain files at the
+paths the real tools would write:
+
+- feature classes are JSON files with a crs and a list of rows, each with x, y and the
+  attribute fields,
+- rasters are numpy .npz archives with the values, the upper left corner, the cell size
+  and the crs (see `write_raster`),
+- tables written by `sa.FeatureSolarRadiation` are csv files.
+
+`sa.FeatureSolarRadiation` evaluates the package's own sky model for each feature, so its
+results are deterministic and scale with the number of features, days and panels like
+the real tool. `management.Project` only relabels features whose coordinates are already
+in the target crs, other reprojections require the optional `pyproj` package.
+"""
+
+import numpy as np
+import pandas as pd
+
+import json
+from pathlib import Path
+
+HORIZON_DIRECTIONS = 16
+HORIZON_DISTANCE = 5000
+STEPS_PER_DAY = 24
+
+class SpatialReference:
+
+    def __init__(self, item = None):
+        self.factoryCode = int(item) if item is not None else 0
+        self.name = f"EPSG_{self.factoryCode}"
+
+    def __eq__(self, other):
+        return isinstance(other, SpatialReference) and other.factoryCode == self.factoryCode
+
+class Extent:
+
+    def __init__(self, XMin, YMin, XMax, YMax):
+        self.XMin, self.YMin, self.XMax, self.YMax = XMin, YMin, XMax, YMax
+
+def CheckOutExtension(name):
+    return "CheckedOut"
+
+# Storage
+
+def write_raster(path, values, x_min, y_max, cell_size, crs):
+    """Write a single band raster to `path`, keeping the file name as is."""
+    Path(path).parent.mkdir(exist_ok = True, parents = True)
+    with open(path, 'wb') as f:
+        np.savez(f, values = values, x_min = x_min, y_max = y_max, cell_size = cell_size, crs = crs)
+
+def _read_raster(path):
+    with np.load(str(path)) as data:
+        return {key: data[key] for key in data.files}
+
+def _write_features(path, crs, rows):
+    Path(path).parent.mkdir(exist_ok = True, parents = True)
+    Path(path).write_text(json.dumps({'crs': int(crs), 'rows': rows}))
+
+def _read_features(path):
+    return json.loads(Path(path).read_text())
+
+def _is_raster(path):
+    with open(path, 'rb') as f:
+        return f.read(2) == b'PK'
+
+def _crs(reference):
+    if isinstance(reference, SpatialReference):
+        return reference.factoryCode
+    return int(reference)
+
+class _Description:
+
+    def __init__(self, path):
+        self.catalogPath = str(path)
+        if _is_raster(path):
+            self.dataType = 'RasterDataset'
+            crs = _read_raster(path)['crs']
+        else:
+            self.dataType = 'FeatureClass'
+            crs = _read_features(path)['crs']
+        self.spatialReference = SpatialReference(crs)
+
+def Describe(value):
+    return _Description(value)
+
+class Raster:
+
+    def __init__(self, path):
+        data = _read_raster(path)
+        self.values = data['values']
+        n_rows, n_cols = self.values.shape
+        cell_size = float(data['cell_size'])
+        x_min, y_max = float(data['x_min']), float(data['y_max'])
+
+        self.meanCellWidth = self.meanCellHeight = cell_size
+        self.extent = Extent(x_min, y_max - n_rows * cell_size, x_min + n_cols * cell_size, y_max)
+        self.spatialReference = SpatialReference(data['crs'])
+        self.noDataValue = None
+
+def RasterToNumPyArray(in_raster):
+    return np.array(in_raster.values)
+
+# Namespaces of the toolboxes and modules
+
+class management:
+
+    @staticmethod
+    def CreateFeatureclass(out_path, out_name, geometry_type = "POINT", spatial_reference = None, **kwargs):
+        if geometry_type != "POINT":
+            raise NotImplementedError("Only point feature classes are supported")
+        out = Path(out_path, out_name)
+        _write_features(out, _crs(spatial_reference) if spatial_reference is not None else 0, [])
+        return str(out)
+
+    @staticmethod
+    def Project(in_dataset, out_dataset, out_coor_system, **kwargs):
+        features = _read_features(in_dataset)
+        crs = _crs(out_coor_system)
+        rows = features['rows']
+        if features['crs'] != crs and rows:
+            from pyproj import Transformer
+
+            transformer = Transformer.from_crs(features['crs'], crs, always_xy = True)
+            x, y = transformer.transform([row['x'] for row in rows], [row['y'] for row in rows])
+            rows = [{**row, 'x': float(xi), 'y': float(yi)} for row, xi, yi in zip(rows, x, y)]
+        _write_features(out_dataset, crs, rows)
+        return str(out_dataset)
+
+class da:
+
+    @staticmethod
+    def NumPyArrayToFeatureClass(in_array, out_table, shape_fields, spatial_reference = None):
+        x_field, y_field = shape_fields
+        fields = [name for name in in_array.dtype.names if name not in shape_fields]
+        rows = [
+            {'x': float(row[x_field]), 'y': float(row[y_field]), **{name: row[name].item() for name in fields}}
+            for row in in_array
+        ]
+        _write_features(out_table, _crs(spatial_reference) if spatial_reference is not None else 0, rows)
+
+    class SearchCursor:
+
+        def __init__(self, in_table, field_names, spatial_reference = None, **kwargs):
+            features = _read_features(in_table)
+            if spatial_reference is not None and _crs(spatial_reference) != features['crs']:
+                raise NotImplementedError("Reading features in another crs is not supported")
+            self.rows = [
+                tuple((row['x'], row['y']) if field == "SHAPE@XY" else row[field] for field in field_names)
+                for row in features['rows']
+            ]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def __iter__(self):
+            return iter(self.rows)
+
+    class InsertCursor:
+
+        def __init__(self, in_table, field_names):
+            self.in_table = in_table
+            self.field_names = field_names
+            self.features = _read_features(in_table)
+
+        def insertRow(self, row):
+            values = dict(zip(self.field_names, row))
+            x, y = values.pop("SHAPE@XY")
+            self.features['rows'].append({'x': float(x), 'y': float(y), **values})
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            _write_features(self.in_table, self.features['crs'], self.features['rows'])
+            return False
+
+class sa:
+
+    @staticmethod
+    def FeatureSolarRadiation(
+        in_surface_raster,
+        in_features,
+        out_table,
+        unique_id_field = None,
+        time_zone = "UTC",
+        start_date_time = "1/1/2024",
+        end_date_time = "12/31/2024",
+        use_time_interval = "NO_INTERVAL",
+        interval_unit = None,
+        interval = 1,
+        feature_area = 0,
+        feature_offset = 0,
+        feature_slope = 0,
+        feature_aspect = 0,
+        diffuse_model_type = "UNIFORM_SKY",
+        diffuse_proportion = 0.3,
+        transmittivity = 0.5,
+        **kwargs
+    ):
+        """
+        Insolation (kWh/m²) on a plane at each feature, summed per time interval.
+
+        Writes a csv table with the id field, str_time, global_ave, direct_ave, diff_ave and
+        dir_dur (hours) and returns its path.
+        """
+        from src.core.sky_model import SkyModel, horizon_angles
+        from src.core.solar_geometry import to_latitude
+        from src.utils import RasterGrid
+
+        raster = _read_raster(in_surface_raster)
+        dem = RasterGrid(raster['values'].astype(float), float(raster['x_min']), float(raster['y_max']), float(raster['cell_size']))
+        features = _read_features(in_features)
+        if features['crs'] != int(raster['crs']):
+            raise ValueError("Features and surface raster must share the spatial reference")
+
+        rows = features['rows']
+        if not rows:
+            raise ValueError(f"{in_features} has no features")
+        id_field = next((name for name in rows[0] if unique_id_field and name.lower() == unique_id_field.lower()), 'Id')
+
+        dates = pd.date_range(
+            pd.to_datetime(start_date_time, format = "%m/%d/%Y"),
+            pd.to_datetime(end_date_time, format = "%m/%d/%Y"),
+            freq = 'D'
+        )
+        if use_time_interval == "INTERVAL":
+            days = {'DAY': 1, 'WEEK': 7}.get(interval_unit)
+            if days is None:
+                raise NotImplementedError(f"Interval unit {interval_unit} is not supported")
+            period = np.arange(len(dates)) // (days * int(interval))
+        else:
+            period = np.zeros(len(dates), dtype = int)
+        starts = dates[np.unique(period, return_index = True)[1]]
+
+        slope, aspect = np.deg2rad(feature_slope), np.deg2rad(feature_aspect)
+        latitudes = to_latitude([[row['x'], row['y']] for row in rows], features['crs'])
+
+        tables = []
+        for row, latitude in zip(rows, latitudes):
+            horizon = horizon_angles(
+                dem, row['x'], row['y'],
+                n_directions = HORIZON_DIRECTIONS,
+                max_distance = HORIZON_DISTANCE,
+                offset = feature_offset
+            )
+            elevation = dem.sample([[row['x'], row['y']]])[0] + feature_offset
+            model = SkyModel(latitude, dates, n_steps = STEPS_PER_DAY, horizon = horizon, elevation = elevation)
+
+            beam_normal, diffuse_horizontal = model.irradiance(transmittivity, diffuse_proportion)
+            cos_incidence = np.clip(model._plane_normals(np.atleast_1d(slope), np.atleast_1d(aspect)) @ model.sun, 0, None)[0]
+            direct = beam_normal * cos_incidence
+            diffuse = diffuse_horizontal * (1 + np.cos(slope)) / 2
+            step_period = period[model.day]
+
+            def per_period(values):
+                return np.bincount(step_period, weights = values, minlength = len(starts))
+
+            tables.append(pd.DataFrame({
+                id_field: row[id_field],
+                'str_time': starts.strftime('%Y-%m-%d'),
+                'global_ave': per_period(direct + diffuse) * model.hours / 1000,
+                'direct_ave': per_period(direct) * model.hours / 1000,
+                'diff_ave': per_period(diffuse) * model.hours / 1000,
+                'dir_dur': per_period((direct > 0) * 1.0) * model.hours,
+            }))
+
+        Path(out_table).parent.mkdir(exist_ok = True, parents = True)
+        pd.concat(tables).to_csv(out_table, index = False)
+        return str(out_table)
+
+class conversion:
+
+    @staticmethod
+    def TableToExcel(Input_Table, Output_Excel_File, **kwargs):
+        pd.read_csv(Input_Table).to_excel(Output_Excel_File, index = False)
+        return str(Output_Excel_File)
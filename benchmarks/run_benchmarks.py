@@ -0,0 +1,186 @@
+"""
+Benchmarks of the computation and reporting functions on synthetic data.
+
+ArcGIS is replaced by the deterministic stand-in in `fake_arcpy`, so the suite runs on
+any machine. Each case is run `--warmup` times untimed after its setup, to load lazy
+imports and fill caches, then timed `--repeat` times. Its median wall time is compared
+with the budget stored in `baseline.json`. Exits with status 1 if a case exceeds its budget.
+
+    python benchmarks/run_benchmarks.py [--repeat 3] [--warmup 1] [--filter report]
+    python benchmarks/run_benchmarks.py --update-baseline [--tolerance 2]
+
+`--update-baseline` stores the measured medians as new baseline with budgets of
+`tolerance` times the median. The budgets are relative, so the fastest cases get the
+same headroom against timer noise as the slow ones.
+
+The baseline holds absolute times of the machine it was recorded on, which is stored
+with it. On any other machine, e.g. a CI runner, record a new baseline with
+`--update-baseline` first and compare later runs on that machine only.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Puts the arcpy stand-in on the module search path before the package is imported
+import synthetic
+
+import numpy as np
+
+from src.core.solar_calculator import SolarCalculator
+from src.transformation import sample_solar_energy
+from src.utils import load_monthly_radiation
+from src.visualization.report import Report
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+MACHINE_KEY = '_machine'
+
+def calculate_radiation(sites, days = 365, n_panels = 3):
+    def setup(directory):
+        dem = synthetic.write_dem(directory / 'dem.tif')
+        calculator = SolarCalculator(synthetic.config(directory, dem, n_panels = n_panels, days = days))
+        coords = synthetic.site_coords(sites)
+        return lambda: calculator.calculate_radiation(dem = str(dem), features = coords)
+    return setup
+
+def optimize(stations, step = 0.2, days = 365):
+    def setup(directory):
+        dem = synthetic.write_dem(directory / 'dem.tif')
+        coords = synthetic.write_stations(directory / 'optim', n_stations = stations)
+        calculator = SolarCalculator(synthetic.config(directory, dem, days = days, stations = coords))
+        return lambda: calculator.optimize(
+            dem = str(dem),
+            observation_dir = coords.parent,
+            observation_coords = coords,
+            step = step
+        )
+    return setup
+
+def monthly_radiation(stations, years = 3):
+    def setup(directory):
+        synthetic.write_stations(directory / 'optim', n_stations = stations, years = years)
+        files = sorted((directory / 'optim').glob('*.csv'))
+        return lambda: load_monthly_radiation(files)
+    return setup
+
+def solar_energy(n, periods = 12):
+    def setup(directory):
+        srad = synthetic.radiation_table(n_panels = 1).set_index('date')['srad'].resample('MS').sum().to_numpy()
+        srad = np.resize(srad, periods)
+        return lambda: sample_solar_energy(srad, 0.15, 0.20, 0.75, 0.9, area = 10, n = n, seed = 0)
+    return setup
+
+def report(n_panels, years = 1):
+    def setup(directory):
+        srad = synthetic.radiation_table(n_panels = n_panels, years = years)
+        consumption = synthetic.consumption_table(freq = 'D')
+        panels = synthetic.panel_config(n_panels)
+
+        def run():
+            tbl = Report(srad, panel_config = panels, consumption = consumption)
+            return tbl.total_production, tbl.energy_balance, tbl.monthly_balance, tbl.chart_data()
+        return run
+    return setup
+
+def render(chart, n_panels = 3):
+    def setup(directory):
+        tbl = Report(
+            synthetic.radiation_table(n_panels = n_panels),
+            panel_config = synthetic.panel_config(n_panels),
+            consumption = synthetic.consumption_table(freq = 'D')
+        )
+        template_dir = str(synthetic.ROOT / 'templates')
+        # Compile the templates before timing, as every process after the first report does
+        tbl.render(template_dir, chart = 'inline')
+        return lambda: tbl.render(template_dir, chart = chart)
+    return setup
+
+CASES = {
+    'calculate_radiation[sites=1]': calculate_radiation(1),
+    'calculate_radiation[sites=5]': calculate_radiation(5),
+    'calculate_radiation[sites=25]': calculate_radiation(25),
+    'optimize[stations=2]': optimize(2),
+    'optimize[stations=6]': optimize(6),
+    'load_monthly_radiation[stations=5]': monthly_radiation(5),
+    'load_monthly_radiation[stations=50]': monthly_radiation(50),
+    'sample_solar_energy[n=10000]': solar_energy(10000),
+    'sample_solar_energy[n=1000000]': solar_energy(1000000),
+    'sample_solar_energy[n=100000,periods=3650]': solar_energy(100000, periods = 3650),
+    'report[panels=3]': report(3),
+    'report[panels=10,years=10]': report(10, years = 10),
+    'render[chart=inline]': render('inline'),
+    'render[chart=svg]': render('svg'),
+    'render[chart=png]': render('png'),
+}
+
+def machine():
+    """Description of the machine the times are measured on."""
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+    }
+
+def measure(setup, repeat, warmup = 1):
+    with tempfile.TemporaryDirectory() as directory:
+        run = setup(Path(directory))
+        for _ in range(warmup):
+            run()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--warmup', type = int, default = 1, help = "Untimed runs of each case before timing")
+    parser.add_argument('--filter', default = '', help = "Only run the cases whose name contains this text")
+    parser.add_argument('--update-baseline', action = 'store_true', help = "Store the results as new baseline")
+    parser.add_argument('--tolerance', type = float, default = 2, help = "Budget as multiple of the median for --update-baseline")
+    args = parser.parse_args(argv)
+    if args.tolerance < 1:
+        parser.error("--tolerance must be at least 1")
+
+    # Keep the warnings about default parameters of the solar calculator out of the table
+    logging.basicConfig(level = logging.ERROR)
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    recorded_on = baseline.pop(MACHINE_KEY, None)
+    if recorded_on is not None and recorded_on != machine() and not args.update_baseline:
+        print(f"Baseline recorded on another machine ({recorded_on['platform']}), budgets may not apply. Record one with --update-baseline.")
+    results, failed = {}, False
+    print(f"{'case':<44} {'median (s)':>10} {'baseline':>9} {'budget':>9}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        median = measure(setup, args.repeat, warmup = args.warmup)
+        budget = median * args.tolerance
+        results[name] = {'median': round(median, 4), 'budget': round(budget, 4)}
+
+        expected = baseline.get(name)
+        if expected is None:
+            status, reference, budget = 'new', '-', '-'
+        else:
+            ok = median <= expected['budget']
+            failed |= not ok and not args.update_baseline
+            status = '' if ok else 'FAILED'
+            reference, budget = f"{expected['median']:.4f}", f"{expected['budget']:.4f}"
+        print(f"{name:<44} {median:>10.4f} {reference:>9} {budget:>9}  {status}")
+
+    if args.update_baseline:
+        BASELINE.write_text(json.dumps({MACHINE_KEY: machine(), **baseline, **results}, indent = 4) + '\n')
+        print(f"Baseline of {len(results)} cases written to {BASELINE}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
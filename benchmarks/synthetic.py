@@ -0,0 +1,151 @@
+"""
+Synthetic inputs for the benchmarks: DEMs, weather station observations, consumption
+tables and radiation tables. All generators are seeded and return the same data for
+the same arguments.
+
+Importing this module puts the arcpy stand-in of `fake_arcpy` first on the module
+search path, so files are written in the formats it reads.
+"""
+
+import numpy as np
+import pandas as pd
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+FAKE_ARCPY = Path(__file__).resolve().parent / 'fake_arcpy'
+for path in (ROOT, FAKE_ARCPY):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import arcpy
+
+from src.utils import RasterGrid
+
+CRS = 25832
+ORIGIN = (640000.0, 5170000.0)
+
+def synthetic_dem(x0 = ORIGIN[0], y0 = ORIGIN[1], size = 400, cell_size = 100, seed = 0):
+    """Smooth random terrain of `size` x `size` cells."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    values = 1500 * np.sin(3 * x + rng.uniform(0, 3)) * np.cos(2 * y + rng.uniform(0, 3)) + 1500
+    return RasterGrid(values, x0, y0, cell_size)
+
+def write_dem(path, size = 400, cell_size = 100, crs = CRS, seed = 0):
+    """Write a synthetic DEM in the raster format of the arcpy stand-in."""
+    dem = synthetic_dem(size = size, cell_size = cell_size, seed = seed)
+    arcpy.write_raster(path, dem.values, dem.x_min, dem.y_max, dem.cell_size, crs)
+    return Path(path)
+
+def site_coords(n, size = 400, cell_size = 100, seed = 1):
+    """`n` random x,y coordinates in the inner half of a synthetic DEM."""
+    rng = np.random.default_rng(seed)
+    extent = size * cell_size
+    x = ORIGIN[0] + rng.uniform(0.25, 0.75, n) * extent
+    y = ORIGIN[1] - rng.uniform(0.25, 0.75, n) * extent
+    return np.column_stack([x, y])
+
+def daily_insolation(dates, seed = 0, missing = 0.02):
+    """Daily insolation (kWh/m²) with a seasonal cycle, noise and missing days."""
+    rng = np.random.default_rng(seed)
+    doy = pd.DatetimeIndex(dates).dayofyear.to_numpy()
+    insol = 3.5 - 2.5 * np.cos(2 * np.pi * (doy + 10) / 365) + rng.normal(0, 0.8, len(doy))
+    insol = np.clip(insol, 0.1, None)
+    insol[rng.random(len(doy)) < missing] = np.nan
+    return insol
+
+def write_stations(directory, n_stations = 5, years = 3, size = 400, cell_size = 100, crs = CRS, seed = 0):
+    """
+    Write station observations like the `optim_dir` of the config.
+
+    Each station gets a csv file `<st_id>.csv` with the columns date and insol covering
+    `years` years. The station locations are written to `stations.shp` with the field st_id.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the station feature class.
+    """
+    directory = Path(directory)
+    directory.mkdir(exist_ok = True, parents = True)
+    dates = pd.date_range('2021-01-01', periods = 365 * years, freq = 'D')
+    coords = site_coords(n_stations, size = size, cell_size = cell_size, seed = seed + 1)
+
+    stations = np.zeros(n_stations, dtype = [('st_id', '<U16'), ('x', '<f8'), ('y', '<f8')])
+    for i in range(n_stations):
+        st_id = f"st{i:03d}"
+        stations[i] = (st_id, *coords[i])
+        pd.DataFrame({
+            'date': dates.strftime('%Y-%m-%d'),
+            'insol': daily_insolation(dates, seed = seed + i),
+        }).to_csv(directory / f"{st_id}.csv", index = False)
+
+    out = directory / 'stations.shp'
+    arcpy.da.NumPyArrayToFeatureClass(stations, str(out), ('x', 'y'), arcpy.SpatialReference(crs))
+    return out
+
+def consumption_table(year = 2024, freq = 'MS', seed = 0):
+    """Consumption (kWh) with a winter peak at the frequency `freq`."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(f'{year}-01-01', f'{year}-12-31', freq = freq)
+    per_month = 350 + 100 * np.cos(2 * np.pi * (dates.month.to_numpy() - 1) / 12)
+    scale = len(dates) / 12
+    consumption = per_month / scale * rng.uniform(0.9, 1.1, len(dates))
+    return pd.DataFrame({'date': dates, 'consumption': consumption})
+
+def write_consumption(path, year = 2024, seed = 0):
+    """Write a monthly consumption table like the `consumption_tbl` of the config."""
+    Path(path).parent.mkdir(exist_ok = True, parents = True)
+    table = consumption_table(year, seed = seed)
+    table['date'] = table['date'].dt.strftime('%Y-%m-%d')
+    table.to_excel(path, index = False)
+    return Path(path)
+
+def radiation_table(n_panels = 3, years = 1, seed = 0):
+    """Daily radiation table (date, panel, srad) as returned by `calculate_radiation`."""
+    dates = pd.date_range('2024-01-01', periods = 365 * years, freq = 'D')
+    tables = [
+        pd.DataFrame({'date': dates, 'panel': f"panel{i}", 'srad': 10 * daily_insolation(dates, seed = seed + i, missing = 0)})
+        for i in range(n_panels)
+    ]
+    return pd.concat(tables, ignore_index = True)
+
+def panel_config(n_panels = 3):
+    """Panel config matching `radiation_table`."""
+    return {
+        f"panel{i}": {'area': 10, 'offset': 5, 'slope': 30, 'aspect': 90 + 180 * i / max(n_panels - 1, 1), 'efficiency': 0.18, 'system_loss': 0.85}
+        for i in range(n_panels)
+    }
+
+def config(directory, dem, n_panels = 3, days = 365, stations = None):
+    """Config of a run on synthetic data, with its files and outputs in `directory`."""
+    directory = Path(directory)
+    end = pd.Timestamp('2024-01-01') + pd.Timedelta(days = days - 1)
+    return {
+        'location': site_coords(1, seed = 0)[0].tolist(),
+        'crs': CRS,
+        'dem': str(dem),
+        'output_directory': str(directory / 'output'),
+        'feature_store': str(directory / 'features'),
+        'cache_dir': str(directory / 'cache'),
+        'template_dir': str(ROOT / 'templates'),
+        'report_out': str(directory / 'report'),
+        'consumption': {'consumption_tbl': None},
+        'optimization': {
+            'optim_dir': None if stations is None else str(Path(stations).parent),
+            'optim_coords': None if stations is None else str(stations),
+            'optim_file': None,
+        },
+        'FeatureSolarRadiation': {
+            'unique_id_field': 'ID',
+            'start_date_time': "1/1/2024",
+            'end_date_time': f"{end.month}/{end.day}/{end.year}",
+            'interval_unit': 'DAY',
+            'interval': 1,
+            'diffuse_proportion': 0.3,
+            'transmittivity': 0.5,
+        },
+        'panels': panel_config(n_panels),
+    }
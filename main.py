@@ -1,24 +1,4 @@
-import logging
-import sys
-
-from src.workflow import Workflow
-
-logger = logging.getLogger(__name__)
-
-def main():
-    # Load configuration
-    workflow = Workflow()
-    workflow.load_config('config.yaml')
-
-    # Setup logging
-    workflow.start_logging()
-
-    # Run analysis
-    try:
-        workflow.run()
-    except Exception as e:
-        logger.error(f"Analysis failed: {str(e)}", exc_info=True)
-        sys.exit(1)
+from src.cli import main
 
 if __name__ == "__main__":
     main()
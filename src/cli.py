@@ -0,0 +1,200 @@
+"""
+Command line interface.
+
+Only the standard library is imported at module level. Each command imports the
+modules it needs, so `--help` and `validate` start without pandas, matplotlib or arcpy.
+"""
+
+import argparse
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = {
+    'run': "full analysis and report (default)",
+    'validate': "validate the config file without running anything",
+    'calibrate': "optimize or load the atmospheric parameters",
+    'compute': "radiation, consumption and the configured analyses without rendering the report",
+    'report': "render the report, reusing persisted stage outputs",
+    'batch': "compute several config files and render their reports with a portfolio index",
+    'sensitivity': "global sensitivity analysis of the production",
+    'serve': "local HTTP service for yield, sizing and report requests",
+}
+
+COMPUTE_STAGES = ['prescreen', 'sizing', 'orientation', 'climatology', 'conversion']
+
+def parse_args(argv = None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+
+    common = argparse.ArgumentParser(add_help = False)
+    common.add_argument('--config', default = 'config.yaml', help = "Path to the configuration file")
+    common.add_argument('--explain', action = 'store_true', help = "Log why each stage of the run ran or was skipped")
+    common.add_argument('--force', action = 'store_true', help = "Run all stages regardless of their persisted outputs")
+    common.add_argument('--profile', metavar = 'TRACE', help = "Record time and memory per stage and write a Chrome trace to this JSON file")
+
+    parser = argparse.ArgumentParser(description = "Calculate solar energy production at a given location.")
+    commands = parser.add_subparsers(dest = 'command', metavar = 'command')
+    for name, description in COMMANDS.items():
+        command = commands.add_parser(name, parents = [common], help = description, description = description)
+        if name == 'batch':
+            command.add_argument('configs', nargs = '+', help = "Paths to the configuration files")
+            command.add_argument('--out', help = "Output directory. Defaults to portfolio in the report_out of the first config")
+            command.add_argument('--workers', type = int, default = 1, help = "Number of report rendering processes")
+        if name == 'serve':
+            command.add_argument('--host', help = "Host to listen on. Defaults to the service config or 127.0.0.1")
+            command.add_argument('--port', type = int, help = "Port to listen on. Defaults to the service config or 8080")
+
+    return parser.parse_args(argv)
+
+def validate(config_file):
+    from pydantic import ValidationError
+    from .config import load_config
+
+    try:
+        load_config(config_file)
+    except (FileNotFoundError, ValidationError, ValueError) as e:
+        print(f"Invalid config {config_file}:\n{e}")
+        return 1
+    print(f"Config {config_file} is valid")
+    return 0
+
+def run_workflow(config_file, command, explain = False, force = False, start_logging = True):
+    """
+    Run a command of the workflow of one config file and return the workflow and its pipeline.
+
+    Logging is configured from the config file unless `start_logging` is False, e.g. when
+    it was configured once for several config files.
+    """
+    from .workflow import Workflow
+
+    workflow = Workflow()
+    workflow.load_config(config_file)
+    if start_logging:
+        workflow.start_logging()
+
+    pipeline = None
+    if command == 'sensitivity':
+        workflow.sensitivity()
+    elif command == 'calibrate':
+        pipeline = workflow.run(explain = explain, force = force, targets = ['calibration'])
+    elif command == 'compute':
+        stages = workflow.build_pipeline().stages
+        pipeline = workflow.run(explain = explain, force = force, targets = [name for name in COMPUTE_STAGES if name in stages])
+    elif command == 'report':
+        pipeline = workflow.run(explain = explain, force = force, targets = ['report'])
+    else:
+        pipeline = workflow.run(explain = explain, force = force)
+    return workflow, pipeline
+
+def site_names(config_files):
+    """Unique site names of config files: the file stem, with the parent directory if stems repeat."""
+    from collections import Counter
+    from pathlib import Path
+
+    paths = [Path(f) for f in config_files]
+    stems = Counter(path.stem for path in paths)
+    names = [f"{path.parent.name}_{path.stem}" if stems[path.stem] > 1 else path.stem for path in paths]
+    # Numbered if the parent directories repeat as well
+    counts = Counter(names)
+    seen = Counter()
+    for i, name in enumerate(names):
+        if counts[name] > 1:
+            seen[name] += 1
+            names[i] = f"{name}_{seen[name]}"
+    return names
+
+def batch(configs, out = None, workers = 1, explain = False, force = False):
+    """
+    Compute every config and render all reports with a portfolio index. Returns the failed configs.
+
+    Each report is rendered as soon as its config is computed, so only the reports waiting
+    to be rendered are held in memory.
+    """
+    from itertools import chain
+    from pathlib import Path
+    from .visualization.report_generator import ReportGenerator
+    from .workflow import Workflow
+
+    # Logging is configured once, from the first config that loads, not again for every site
+    for config_file in configs:
+        try:
+            workflow = Workflow()
+            workflow.load_config(config_file)
+            workflow.start_logging()
+            break
+        except ValueError:
+            continue
+
+    failed, settings = [], {}
+
+    def compute():
+        for name, config_file in zip(site_names(configs), configs):
+            try:
+                workflow, pipeline = run_workflow(config_file, 'compute', explain = explain, force = force, start_logging = False)
+            except Exception as e:
+                logger.error(f"Analysis failed for {config_file}: {str(e)}", exc_info=True)
+                failed.append(config_file)
+                continue
+            settings.setdefault('config', workflow.config)
+            yield name, pipeline.outputs['conversion']
+
+    reports = compute()
+    # The output settings are taken from the first config that was computed
+    first = next(reports, None)
+    if first is not None:
+        config = settings['config']
+        report_config = config.get('report') or {}
+        generator = ReportGenerator(
+            config['template_dir'],
+            out or Path(config['report_out'], 'portfolio'),
+            chart = report_config.get('chart', 'inline'),
+            dpi = report_config.get('dpi', 100),
+            workers = workers,
+            bytecode_cache = Path(config.get('cache_dir', 'data/cache'), 'templates')
+        )
+        generator.generate(chain([first], reports))
+    return failed
+
+def run_command(args):
+    """Run a command other than validate."""
+    if args.command == 'serve':
+        from .service import YieldService
+        from .workflow import Workflow
+
+        workflow = Workflow()
+        workflow.load_config(args.config)
+        workflow.start_logging()
+        YieldService(workflow.config).serve(host = args.host, port = args.port)
+        return
+
+    if args.command == 'batch':
+        if batch(args.configs, out = args.out, workers = args.workers, explain = args.explain, force = args.force):
+            sys.exit(1)
+        return
+
+    try:
+        run_workflow(args.config, args.command, explain = args.explain, force = args.force)
+    except Exception as e:
+        logger.error(f"Analysis failed: {str(e)}", exc_info=True)
+        sys.exit(1)
+
+def main(argv = None):
+    args = parse_args(argv)
+
+    if args.command == 'validate':
+        sys.exit(validate(args.config))
+
+    recorder = None
+    if args.profile is not None:
+        from .instrumentation import enable
+        recorder = enable()
+    try:
+        run_command(args)
+    finally:
+        if recorder is not None:
+            # One summary of all runs, the summary of each run is logged at debug level
+            logger.info(f"Time and memory per span:\n{recorder.format_summary()}")
+            recorder.write_trace(args.profile)
@@ -12,6 +12,9 @@ from datetime import datetime
 class ConsumptionConfig(BaseModel):
     """Configuration for power consumption data."""
     consumption_tbl: str = Field(..., description="Path to power consumption Excel file")
+    profile: Optional[str] = Field(None, description="Standard load profile used to expand monthly consumption, e.g. H0")
+    freq: str = Field(default="D", description="Resolution of the expanded consumption, D or h")
+    holidays: Optional[List[str]] = Field(None, description="Additional holidays treated like sundays")
     
     @validator('consumption_tbl')
     def validate_consumption_file(cls, v):
@@ -35,6 +38,110 @@ class OptimizationConfig(BaseModel):
         return v
 
 
+class InterpolationConfig(BaseModel):
+    """Configuration for the station network interpolation."""
+    prescreen: bool = Field(default=False, description="Log a station network estimate before running the terrain model")
+    id_field: str = Field(default="st_id", description="Station identifier field of the optimization coordinates")
+    k: int = Field(default=8, ge=1, description="Number of nearest stations used for interpolation")
+    power: float = Field(default=2, gt=0, description="Power of the inverse distance weights")
+    elevation_correction: bool = Field(default=False, description="Correct interpolated values with an elevation gradient from the DEM")
+    albedo: float = Field(default=0.2, ge=0, le=1, description="Ground reflectance used for transposition (0-1)")
+
+
+class PVModelConfig(BaseModel):
+    """Configuration for the temperature dependent PV conversion."""
+    temperature_tbl: Optional[str] = Field(None, description="Path to a csv file with daily or hourly air temperature")
+    noct: float = Field(default=45, description="Nominal operating cell temperature in °C")
+    temp_coefficient: float = Field(default=-0.004, le=0, description="Relative efficiency change per °C cell temperature")
+    low_light_coefficient: float = Field(default=0.02, ge=0, description="Relative efficiency change per log irradiance ratio")
+
+
+class SizingConfig(BaseModel):
+    """Configuration for the system size sweep."""
+    panel: Optional[str] = Field(None, description="Panel whose orientation is used for sizing, defaults to the first panel")
+    area: Optional[List[float]] = Field(None, description="Candidate panel areas in square meters")
+    kWp: Optional[List[float]] = Field(None, description="Candidate system sizes in kWp")
+    eff_low: float = Field(default=0.15, ge=0, le=1, description="Lower bound of the sampled panel efficiency")
+    eff_high: float = Field(default=0.20, ge=0, le=1, description="Upper bound of the sampled panel efficiency")
+    loss_low: float = Field(default=0.75, ge=0, le=1, description="Lower bound of the sampled system loss factor")
+    loss_high: float = Field(default=0.9, ge=0, le=1, description="Upper bound of the sampled system loss factor")
+    n: int = Field(default=10000, ge=1, description="Number of Monte Carlo samples")
+
+
+class OrientationConfig(BaseModel):
+    """Configuration for the panel orientation search."""
+    panel: Optional[str] = Field(None, description="Panel whose attributes are used, defaults to the first panel")
+    slope_step: float = Field(default=1, gt=0, description="Step of the slope grid in degrees")
+    aspect_step: float = Field(default=1, gt=0, description="Step of the aspect grid in degrees")
+    n_steps: int = Field(default=24, ge=1, description="Number of time steps per day of the sky model")
+    horizon: bool = Field(default=True, description="Compute the terrain horizon from the DEM")
+    n_directions: int = Field(default=36, ge=1, description="Number of horizon directions")
+    max_distance: float = Field(default=20000, gt=0, description="Horizon search distance in map units")
+    match_consumption: bool = Field(default=False, description="Match the orientation to the monthly consumption profile")
+    cache_dir: Optional[str] = Field(None, description="Directory to cache the horizon of the site")
+
+
+class StorageConfig(BaseModel):
+    """Configuration for the battery storage simulation."""
+    capacities: List[float] = Field(default=[0], description="Usable battery capacities in kWh")
+    charge_efficiency: float = Field(default=0.95, gt=0, le=1, description="Charging efficiency (0-1)")
+    discharge_efficiency: float = Field(default=0.95, gt=0, le=1, description="Discharging efficiency (0-1)")
+    c_rate: Optional[float] = Field(default=0.5, gt=0, description="Maximum power as fraction of the capacity per hour")
+    min_soc: float = Field(default=0.1, ge=0, le=1, description="Minimum state of charge (0-1)")
+    initial_soc: float = Field(default=0.5, ge=0, le=1, description="Initial state of charge (0-1)")
+
+
+class EconomicsConfig(BaseModel):
+    """Configuration for the economic scenarios. Lists are combined to a full factorial grid."""
+    tariff: Union[float, List[float]] = Field(default=45, description="Grid electricity price in ct/kWh")
+    feed_in_price: Union[float, List[float]] = Field(default=10, description="Feed-in price in ct/kWh")
+    system_cost: Union[float, List[float]] = Field(default=10000, description="Investment cost in €")
+    degradation: Union[float, List[float]] = Field(default=0.005, description="Annual production degradation (0-1)")
+    discount_rate: Union[float, List[float]] = Field(default=0.03, description="Annual discount rate")
+    opex: Union[float, List[float]] = Field(default=0, description="Annual operating costs in €")
+    lifetime: int = Field(default=25, ge=1, description="Years of operation")
+    capacity: Optional[float] = Field(None, ge=0, description="Battery capacity in kWh used for self-consumption")
+
+
+class SensitivityConfig(BaseModel):
+    """Configuration for the global sensitivity analysis."""
+    n: int = Field(default=1024, ge=2, description="Number of base samples, preferably a power of 2")
+    workers: int = Field(default=1, ge=1, description="Number of worker processes")
+    seed: Optional[int] = Field(None, description="Seed of the Sobol sequence")
+    out: Optional[str] = Field(None, description="Path to save the sensitivity indices as csv")
+    bounds: Optional[Dict[str, List[float]]] = Field(None, description="Lower and upper bound per parameter")
+
+
+class TranspositionConfig(BaseModel):
+    """Configuration for transposing measured horizontal insolation instead of running the terrain model."""
+    enabled: bool = Field(default=False, description="Use measured insolation instead of the terrain model")
+    source: str = Field(default="interpolation", description="'interpolation' or path to a station csv file")
+    albedo: float = Field(default=0.2, ge=0, le=1, description="Ground reflectance (0-1)")
+
+
+class ClimatologyConfig(BaseModel):
+    """Configuration for multi-year runs."""
+    years: List[int] = Field(..., min_items=2, max_items=2, description="First and last year")
+    source: str = Field(default="model", description="'model' or path to a station csv file with daily insolation")
+    q: List[float] = Field(default=[10, 50, 90], description="Percentiles of the inter-annual spread")
+
+
+class ReportConfig(BaseModel):
+    """Configuration for report rendering."""
+    chart: str = Field(default="inline", description="Chart mode: inline, svg or png")
+    dpi: int = Field(default=100, gt=0, description="Resolution of png charts")
+
+
+class ServiceConfig(BaseModel):
+    """Configuration for the local yield service."""
+    host: str = Field(default="127.0.0.1", description="Host to listen on")
+    port: int = Field(default=8080, gt=0, description="Port to listen on")
+    max_batch: int = Field(default=64, gt=0, description="Maximum number of requests evaluated with one engine call")
+    max_delay: float = Field(default=0.002, ge=0, description="Seconds a request waits for others to batch with")
+    max_sites: int = Field(default=128, gt=0, description="Number of site sky models kept in memory")
+    albedo: float = Field(default=0.2, ge=0, le=1, description="Ground reflectance")
+
+
 class PanelConfig(BaseModel):
     """Configuration for solar panel parameters."""
     area: float = Field(ge=0, description="Panel area in square meters")
@@ -116,11 +223,25 @@ class Config(BaseModel):
     price: float = Field(gt=0, description="Energy price in ct/kWh")
     template_dir: str = Field(..., description="Directory for templates")
     report_out: str = Field(..., description="Directory for report output")
+    cache_dir: str = Field("data/cache", description="Directory for the persisted stage outputs of the workflow")
+    feature_store: str = Field("data/features", description="Directory for point features reused across runs, relative to the config file")
     output_directory: Optional[str] = Field(None, description="Optional output directory")
     
     consumption: ConsumptionConfig
     optimization: OptimizationConfig
-    panels: PanelsConfig
+    interpolation: Optional[InterpolationConfig] = None
+    pv_model: Optional[PVModelConfig] = None
+    sizing: Optional[SizingConfig] = None
+    orientation: Optional[OrientationConfig] = None
+    storage: Optional[StorageConfig] = None
+    economics: Optional[EconomicsConfig] = None
+    sensitivity: Optional[SensitivityConfig] = None
+    transposition: Optional[TranspositionConfig] = None
+    climatology: Optional[ClimatologyConfig] = None
+    report: Optional[ReportConfig] = None
+    service: Optional[ServiceConfig] = None
+    area_optim: Optional[float] = Field(None, description="Fixed panel area instead of the optimum of the sizing sweep")
+    panels: Dict[str, PanelConfig]
     FeatureSolarRadiation: FeatureSolarRadiationConfig
     logging: LoggingConfig
     
@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+
+from pathlib import Path
+from typing import Iterator, Sequence, Union
+import logging
+import warnings
+
+logger = logging.getLogger(__name__)
+
+class MonthlyClimatology:
+    """
+    Running monthly statistics over many years.
+
+    Each year is added as a table of monthly totals and can be dropped afterwards. The
+    mean and variance are updated with Welford's algorithm and only the twelve monthly
+    totals per year and column are kept for the percentiles, so memory does not depend
+    on the resolution or length of the raw data.
+
+    Parameters
+    ----------
+    q : sequence of float, optional
+        Percentiles reported by `summary`. Defaults to (10, 50, 90).
+    """
+
+    def __init__(self, q: Sequence[float] = (10, 50, 90)):
+        self.q = q
+        self.columns = None
+        self.years = []
+        self.count = np.zeros(12)
+        self.mean = None
+        self.m2 = None
+        self.totals = []
+
+    def update(self, year: int, monthly: pd.DataFrame):
+        """
+        Add the monthly totals of one year.
+
+        Parameters
+        ----------
+        year : int
+            Year of the data.
+        monthly : pandas.DataFrame
+            Monthly totals indexed by date with one column per variable, e.g. panel.
+        """
+        if self.columns is None:
+            self.columns = list(monthly.columns)
+            self.mean = np.zeros((12, len(self.columns)))
+            self.m2 = np.zeros((12, len(self.columns)))
+
+        values = (
+            monthly[self.columns]
+            .groupby(pd.DatetimeIndex(monthly.index).month).sum(min_count = 1)
+            .reindex(range(1, 13))
+            .to_numpy()
+        )
+        valid = ~np.isnan(values).any(axis = 1)
+
+        self.count[valid] += 1
+        delta = np.where(valid[:, None], values - self.mean, 0)
+        self.mean += delta / np.maximum(self.count, 1)[:, None]
+        self.m2 += delta * np.where(valid[:, None], values - self.mean, 0)
+
+        self.years.append(year)
+        self.totals.append(values)
+        logger.debug("Added year %s to the climatology", year)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / np.maximum(self.count - 1, 1)[:, None])
+
+    def summary(self, total: bool = True):
+        """
+        Statistics of the monthly totals over all years.
+
+        Parameters
+        ----------
+        total : bool, optional
+            Summarize the sum over all columns instead of each column. Defaults to True.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table indexed by month with the mean, standard deviation, coefficient of
+            variation and percentiles. If `total` is False, the columns have a second
+            level with the variable.
+        """
+        if not self.years:
+            raise ValueError("No years added to the climatology.")
+
+        totals = np.stack(self.totals) # years x months x columns
+        if total:
+            totals = totals.sum(axis = -1, keepdims = True)
+            mean = self.mean.sum(axis = -1, keepdims = True)
+            # Months with less than 2 valid years have no spread, like `std` of each column
+            valid = (~np.isnan(totals)).sum(axis = 0)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                std = np.nanstd(totals, axis = 0, ddof = 1)
+            std = np.where(valid > 1, std, 0.0)
+            columns = ['total']
+        else:
+            mean, std, columns = self.mean, self.std, self.columns
+
+        stats = {'mean': mean, 'std': std, 'cv': np.divide(std, mean, out = np.zeros_like(mean), where = mean > 0)}
+        for q, values in zip(self.q, np.nanpercentile(totals, self.q, axis = 0)):
+            stats[f"p{q:g}"] = values
+
+        tbl = pd.concat(
+            {name: pd.DataFrame(values, index = pd.Index(range(1, 13), name = 'month'), columns = columns) for name, values in stats.items()},
+            axis = 1
+        )
+        if total:
+            tbl.columns = tbl.columns.droplevel(1)
+        return tbl
+
+def iter_yearly_radiation(file: Union[str, Path], chunksize: int = 100000) -> Iterator[tuple]:
+    """
+    Stream the daily insolation of a station file one year at a time.
+
+    The file is read in chunks and each year is yielded as soon as it is complete,
+    so only about one year of data is held in memory. The file must be sorted by date.
+
+    Yields
+    ------
+    tuple
+        Year and its daily insolation as a pandas.Series indexed by date.
+    """
+    pending = None
+    for chunk in pd.read_csv(file, usecols = ['date', 'insol'], chunksize = chunksize):
+        chunk['date'] = pd.to_datetime(chunk['date'], format = '%Y-%m-%d')
+        series = chunk.set_index('date')['insol']
+        if pending is not None:
+            series = pd.concat([pending, series])
+
+        years = series.index.year
+        last = years.max()
+        complete = series[years < last]
+        for year, values in complete.groupby(complete.index.year):
+            yield year, values.interpolate(method = 'time', limit = 3)
+        pending = series[years == last]
+
+    if pending is not None and len(pending):
+        yield pending.index.year[0], pending.interpolate(method = 'time', limit = 3)
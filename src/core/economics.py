@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+def scenario_grid(**params):
+    """
+    Full factorial grid of scenario parameters.
+
+    Parameters
+    ----------
+    **params
+        Scalar or array_like values of each parameter.
+
+    Returns
+    -------
+    dict
+        Flattened arrays of equal length, one per parameter.
+    """
+    names = list(params)
+    grid = np.meshgrid(*[np.atleast_1d(np.asarray(params[n], dtype = float)) for n in names], indexing = 'ij')
+    return {n: g.ravel() for n, g in zip(names, grid)}
+
+def evaluate_economics(
+    production,
+    self_consumption,
+    consumption = None,
+    tariff = 45,
+    feed_in_price = 10,
+    system_cost = 10000,
+    degradation = 0.005,
+    discount_rate = 0.03,
+    opex = 0,
+    lifetime: int = 25
+):
+    """
+    Avoided costs, feed-in revenue, net present value and payback period of a PV system.
+
+    All scenario parameters may be arrays and are combined to a full factorial grid. The
+    cash flows of all scenarios and years are evaluated as one (scenario x year) array,
+    so ten thousands of scenarios are evaluated at once.
+
+    Parameters
+    ----------
+    production : float
+        Annual electricity production (kWh) in the first year.
+    self_consumption : float
+        Annual production consumed on site (kWh), e.g. from `simulate_storage`.
+    consumption : float, optional
+        Annual consumption (kWh). If given, the remaining grid costs are returned.
+    tariff : float or array_like, optional
+        Price of electricity from the grid in ct/kWh. Defaults to 45.
+    feed_in_price : float or array_like, optional
+        Price paid for exported electricity in ct/kWh. Defaults to 10.
+    system_cost : float or array_like, optional
+        Investment cost of the system in €. Defaults to 10000.
+    degradation : float or array_like, optional
+        Annual relative decrease of the production. Defaults to 0.005.
+    discount_rate : float or array_like, optional
+        Annual discount rate. Defaults to 0.03.
+    opex : float or array_like, optional
+        Annual operation and maintenance costs in €. Defaults to 0.
+    lifetime : int, optional
+        Number of years of operation. Defaults to 25.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with one row per scenario, the scenario parameters and the first year
+        avoided costs and feed-in revenue (€), the net present value (€) and the
+        discounted payback period (years, NaN if the investment is not recovered).
+    """
+    scenarios = scenario_grid(
+        tariff = tariff,
+        feed_in_price = feed_in_price,
+        system_cost = system_cost,
+        degradation = degradation,
+        discount_rate = discount_rate,
+        opex = opex
+    )
+    tbl = pd.DataFrame(scenarios)
+
+    export = production - self_consumption
+    avoided_costs = self_consumption * tbl['tariff'].to_numpy() / 100
+    feed_in_revenue = export * tbl['feed_in_price'].to_numpy() / 100
+
+    years = np.arange(1, lifetime + 1)
+    yield_factor = (1 - tbl['degradation'].to_numpy()[:, None])**(years - 1)
+    discount = (1 + tbl['discount_rate'].to_numpy()[:, None])**-years
+    cash_flow = (
+        ((avoided_costs + feed_in_revenue)[:, None] * yield_factor - tbl['opex'].to_numpy()[:, None])
+        * discount
+    )
+    cumulative = cash_flow.cumsum(axis = 1) - tbl['system_cost'].to_numpy()[:, None]
+
+    # Payback is interpolated linearly within the first year with a positive cumulative value
+    recovered = cumulative >= 0
+    first = np.argmax(recovered, axis = 1)
+    rows = np.arange(len(tbl))
+    previous = np.where(first > 0, cumulative[rows, first - 1], -tbl['system_cost'].to_numpy())
+    step = cash_flow[rows, first]
+    # A system without costs has paid back at the start, even without cash flow
+    payback = first + np.divide(-previous, step, out = np.zeros(len(tbl)), where = step != 0)
+    payback[~recovered.any(axis = 1)] = np.nan
+
+    tbl['avoided_costs'] = avoided_costs
+    tbl['feed_in_revenue'] = feed_in_revenue
+    if consumption is not None:
+        tbl['remaining_costs'] = (consumption - self_consumption) * tbl['tariff'] / 100
+    tbl['npv'] = cumulative[:, -1]
+    tbl['payback'] = payback
+    return tbl
@@ -0,0 +1,117 @@
+import numpy as np
+
+from pathlib import Path
+from typing import Optional, Union
+import hashlib
+import json
+import logging
+
+from ..utils import coords_to_shp, import_arcpy
+from ..pipeline import file_signature
+from ..instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+def _key(value):
+    return hashlib.sha1(json.dumps(value, sort_keys = True, default = str).encode()).hexdigest()[:16]
+
+class FeatureStore:
+    """
+    Persistent store of point feature classes.
+
+    Point features are keyed by their coordinates and crs, so the same sites are written
+    to disk once and reused by all panels, optimizer evaluations and later runs. Projected
+    copies are keyed by their source and target spatial reference and are created once as
+    well. Spatial references are described once per dataset and store.
+
+    Parameters
+    ----------
+    root : str or Path
+        Directory of the stored feature classes.
+    precision : int, optional
+        Number of decimals of the coordinates used for the key. Defaults to 3.
+    """
+
+    def __init__(self, root: Union[str, Path], precision: int = 3):
+        self.root = Path(root)
+        self.precision = precision
+        self._spatial_references = {}
+
+    def points(self, coords, crs: int):
+        """
+        Point feature class with the given coordinates, created if it is not stored yet.
+
+        Parameters
+        ----------
+        coords : array_like
+            x,y coordinates, either one pair or a sequence of pairs.
+        crs : int
+            EPSG code of the coordinates.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the shapefile.
+        """
+        coords = np.round(np.atleast_2d(np.asarray(coords, dtype = float)), self.precision)
+        out = self.root / f"points_{_key([coords.tolist(), crs])}.shp"
+        if not out.exists():
+            self.root.mkdir(exist_ok = True, parents = True)
+            with span('create_features', features = len(coords)):
+                coords_to_shp(coords, crs = crs, out = out)
+        return out
+
+    def spatial_reference(self, dataset: Union[str, Path]):
+        """Spatial reference of a dataset, described once per store until the dataset changes."""
+        arcpy = import_arcpy()
+
+        key = (str(dataset), json.dumps(file_signature(dataset)))
+        if key not in self._spatial_references:
+            with span('describe'):
+                self._spatial_references[key] = arcpy.Describe(str(dataset)).spatialReference
+        return self._spatial_references[key]
+
+    def project(self, features: Union[str, Path], reference: Union[str, Path]):
+        """
+        Features in the spatial reference of `reference`, e.g. the DEM.
+
+        Returns `features` unchanged if both already share the spatial reference, or a
+        stored projected copy otherwise.
+        """
+        arcpy = import_arcpy()
+
+        spatial_ref = self.spatial_reference(reference)
+        if spatial_ref.name == self.spatial_reference(features).name:
+            return Path(features)
+
+        out = self.root / f"{Path(features).stem}_{_key([str(features), file_signature(features), spatial_ref.name])}.shp"
+        if not out.exists():
+            self.root.mkdir(exist_ok = True, parents = True)
+            with span('project'):
+                arcpy.management.Project(str(features), out_dataset = str(out), out_coor_system = spatial_ref)
+            logger.debug("Feature class %s projected to %s at %s", features, spatial_ref.name, out)
+        return out
+
+    def get(self, features, crs: int, reference: Optional[Union[str, Path]] = None):
+        """
+        Stored feature class for coordinates or an existing feature class, projected to
+        the spatial reference of `reference` if given.
+
+        Parameters
+        ----------
+        features : array_like or str or Path
+            x,y coordinates in `crs` or the path to a feature class.
+        crs : int
+            EPSG code of coordinates. Ignored for feature classes.
+        reference : str or Path, optional
+            Dataset, e.g. the DEM, whose spatial reference the features are projected to.
+
+        Returns
+        -------
+        pathlib.Path
+        """
+        if not isinstance(features, (str, Path)):
+            features = self.points(features, crs)
+        if reference is not None:
+            features = self.project(features, reference)
+        return Path(features)
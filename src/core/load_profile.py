@@ -0,0 +1,194 @@
+import pandas as pd
+import numpy as np
+
+from pathlib import Path
+from typing import Iterable, Optional, Union
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKDAY, SATURDAY, SUNDAY = 0, 1, 2
+WINTER, SUMMER, TRANSITION = 0, 1, 2
+
+# Hourly shapes (relative values) approximating the BDEW H0 household standard load profile.
+# Axis 0: season (winter, summer, transition), axis 1: day type (workday, saturday, sunday/holiday)
+H0_SHAPES = np.array([
+    [
+        [0.60, 0.50, 0.45, 0.43, 0.43, 0.47, 0.65, 0.90, 0.95, 0.90, 0.88, 0.90, 1.00, 0.95, 0.85, 0.82, 0.90, 1.10, 1.35, 1.40, 1.30, 1.15, 0.95, 0.75],
+        [0.65, 0.55, 0.48, 0.45, 0.44, 0.45, 0.52, 0.70, 0.95, 1.10, 1.15, 1.20, 1.25, 1.15, 1.00, 0.95, 1.00, 1.15, 1.35, 1.38, 1.28, 1.15, 0.98, 0.80],
+        [0.68, 0.57, 0.50, 0.46, 0.44, 0.44, 0.47, 0.58, 0.85, 1.10, 1.25, 1.40, 1.45, 1.20, 1.00, 0.92, 0.95, 1.10, 1.30, 1.32, 1.22, 1.10, 0.95, 0.78],
+    ],
+    [
+        [0.55, 0.47, 0.43, 0.41, 0.41, 0.45, 0.60, 0.80, 0.85, 0.82, 0.82, 0.85, 0.95, 0.90, 0.80, 0.78, 0.82, 0.92, 1.05, 1.10, 1.12, 1.10, 0.95, 0.72],
+        [0.60, 0.52, 0.46, 0.43, 0.42, 0.43, 0.48, 0.62, 0.85, 1.00, 1.05, 1.10, 1.15, 1.05, 0.92, 0.88, 0.90, 0.98, 1.08, 1.10, 1.12, 1.10, 0.96, 0.76],
+        [0.63, 0.54, 0.48, 0.44, 0.42, 0.42, 0.44, 0.52, 0.75, 0.98, 1.12, 1.28, 1.32, 1.10, 0.92, 0.85, 0.86, 0.95, 1.05, 1.08, 1.10, 1.08, 0.94, 0.74],
+    ],
+    [
+        [0.58, 0.49, 0.44, 0.42, 0.42, 0.46, 0.63, 0.86, 0.90, 0.86, 0.85, 0.88, 0.98, 0.93, 0.83, 0.80, 0.86, 1.02, 1.22, 1.28, 1.22, 1.12, 0.95, 0.74],
+        [0.63, 0.54, 0.47, 0.44, 0.43, 0.44, 0.50, 0.66, 0.90, 1.05, 1.10, 1.15, 1.20, 1.10, 0.96, 0.92, 0.95, 1.08, 1.22, 1.25, 1.20, 1.12, 0.97, 0.78],
+        [0.66, 0.56, 0.49, 0.45, 0.43, 0.43, 0.46, 0.55, 0.80, 1.05, 1.18, 1.34, 1.38, 1.15, 0.96, 0.88, 0.90, 1.02, 1.18, 1.20, 1.16, 1.09, 0.95, 0.76],
+    ],
+])
+
+FLAT_SHAPES = np.ones((3, 3, 24))
+
+PROFILES = {
+    'H0': H0_SHAPES,
+    'flat': FLAT_SHAPES,
+}
+
+# Fixed public holidays in Italy (month, day)
+HOLIDAYS_IT = [(1, 1), (1, 6), (4, 25), (5, 1), (6, 2), (8, 15), (11, 1), (12, 8), (12, 25), (12, 26)]
+
+def easter_sunday(year: int):
+    """Date of easter sunday in the gregorian calendar (anonymous gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+def public_holidays(years: Iterable[int]):
+    """Italian public holidays, including easter monday, for the given years."""
+    holidays = []
+    for year in years:
+        holidays.extend(datetime.date(year, month, day) for month, day in HOLIDAYS_IT)
+        holidays.append(easter_sunday(year) + datetime.timedelta(days = 1))
+    return pd.DatetimeIndex(holidays)
+
+def dynamization_factor(doy):
+    """Seasonal factor of the H0 profile for each day of year (BDEW dynamization polynomial)."""
+    doy = np.asarray(doy, dtype = float)
+    return -3.92e-10 * doy**4 + 3.2e-7 * doy**3 - 7.02e-5 * doy**2 + 2.1e-3 * doy + 1.24
+
+class LoadProfileExpander:
+    """
+    Expand monthly consumption totals into daily or hourly profiles.
+
+    The shape of every hour of the period is looked up once from a standard load profile,
+    depending on the season and the day type (workday, saturday, sunday or holiday), and
+    normalized to a share of its month. Expanding consumption is then a single broadcast
+    multiplication of the monthly totals with these shares, so the consumption of many
+    customers can be expanded at once.
+
+    Parameters
+    ----------
+    start, end : str or datetime
+        First and last day of the period.
+    profile : str, optional
+        Name of the standard load profile, one of `PROFILES`. Defaults to 'H0'.
+    holidays : iterable of dates, optional
+        Additional holidays, treated like sundays.
+    dynamize : bool, optional
+        Apply the seasonal dynamization factor of the H0 profile. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        start: Union[str, datetime.datetime] = "2024-01-01",
+        end: Union[str, datetime.datetime] = "2024-12-31",
+        profile: str = 'H0',
+        holidays: Optional[Iterable] = None,
+        dynamize: bool = True
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown load profile {profile}. Choose one of {list(PROFILES)}")
+
+        self.days = pd.date_range(start, end, freq = 'D')
+        self.hours = pd.date_range(self.days[0], self.days[-1] + pd.Timedelta(hours = 23), freq = 'h')
+
+        holiday_dates = public_holidays(self.days.year.unique())
+        if holidays is not None:
+            holiday_dates = holiday_dates.append(pd.DatetimeIndex(holidays))
+
+        day_type = np.full(len(self.days), WORKDAY)
+        day_type[self.days.dayofweek == 5] = SATURDAY
+        day_type[(self.days.dayofweek == 6) | self.days.isin(holiday_dates)] = SUNDAY
+
+        md = self.days.month * 100 + self.days.day
+        season = np.full(len(self.days), TRANSITION)
+        season[(md >= 1101) | (md <= 320)] = WINTER
+        season[(md >= 515) & (md <= 914)] = SUMMER
+
+        hourly = PROFILES[profile][season, day_type]
+        if dynamize and profile == 'H0':
+            hourly = hourly * dynamization_factor(self.days.dayofyear)[:, None]
+        hourly = hourly.ravel()
+
+        month_of_day, self.months = pd.factorize(self.days.to_period('M'), sort = True)
+        month_of_hour = np.repeat(month_of_day, 24)
+
+        month_totals = np.bincount(month_of_hour, weights = hourly)
+        self.month_of_day = month_of_day
+        self.month_of_hour = month_of_hour
+        self.hourly_share = hourly / month_totals[month_of_hour]
+        self.daily_share = self.hourly_share.reshape(-1, 24).sum(axis = 1)
+
+    def _monthly_matrix(self, monthly):
+        if isinstance(monthly, pd.Series):
+            monthly = monthly.to_frame()
+        if isinstance(monthly, pd.DataFrame):
+            periods = pd.DatetimeIndex(monthly.index).to_period('M')
+            monthly = monthly.groupby(periods).sum().reindex(self.months, fill_value = 0)
+            return monthly.to_numpy().T, list(monthly.columns)
+        monthly = np.atleast_2d(np.asarray(monthly, dtype = float))
+        return monthly, list(range(monthly.shape[0]))
+
+    def expand(self, monthly, freq: str = 'D'):
+        """
+        Expand monthly totals to daily or hourly values.
+
+        Parameters
+        ----------
+        monthly : pandas.Series, pandas.DataFrame or array_like
+            Monthly totals indexed by date, one column per customer, or an array of
+            shape (customers, months) aligned with the months of the period.
+        freq : str, optional
+            'D' for daily or 'h' for hourly values. Defaults to 'D'.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table indexed by day or hour with one column per customer.
+        """
+        matrix, columns = self._monthly_matrix(monthly)
+
+        if freq == 'D':
+            values = matrix[:, self.month_of_day] * self.daily_share
+            index = self.days
+        elif freq.lower() == 'h':
+            values = matrix[:, self.month_of_hour] * self.hourly_share
+            index = self.hours
+        else:
+            raise ValueError(f"freq must be 'D' or 'h', got: {freq}")
+
+        return pd.DataFrame(values.T, index = pd.DatetimeIndex(index, name = 'date'), columns = columns)
+
+    def expand_files(self, files, freq: str = 'D'):
+        """
+        Expand the monthly consumption of many consumption files in one call.
+
+        Parameters
+        ----------
+        files : list of Path
+            Excel files with the columns date and consumption.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table indexed by day or hour with one column per file stem.
+        """
+        tbls = []
+        for f in files:
+            tbl = pd.read_excel(f, usecols = ['date', 'consumption'])
+            tbl['date'] = pd.to_datetime(tbl['date'], format = '%Y-%m-%d')
+            tbls.append(tbl.set_index('date')['consumption'].rename(Path(f).stem))
+        logger.debug(f"Loaded {len(tbls)} consumption files")
+
+        return self.expand(pd.concat(tbls, axis = 1), freq = freq)
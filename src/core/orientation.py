@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+
+from typing import Optional
+import logging
+
+from .sky_model import SkyModel
+
+logger = logging.getLogger(__name__)
+
+def optimize_orientation(
+    sky: SkyModel,
+    transmittivity: float = 0.5,
+    diffuse_proportion: float = 0.3,
+    slopes = np.arange(0, 91, 1),
+    aspects = np.arange(0, 360, 1),
+    consumption: Optional[pd.Series] = None,
+    area: float = 1,
+    efficiency: float = 0.15,
+    system_loss: float = 0.8,
+    albedo: float = 0.2
+):
+    """
+    Search the panel slope and aspect with the highest yield.
+
+    All orientations of the slope x aspect grid are evaluated at once with the cached
+    sun positions and horizon of `sky`.
+
+    Parameters
+    ----------
+    sky : SkyModel
+        Sky model of the site.
+    transmittivity, diffuse_proportion : float, optional
+        Atmospheric parameters, e.g. from `SolarCalculator.radiation_parameters`.
+    slopes, aspects : array_like, optional
+        Candidate slopes and aspects in degrees. Default to a 1° grid.
+    consumption : pandas.Series, optional
+        Monthly consumption (kWh) indexed by date. If given, the orientation is matched
+        to the consumption profile by maximizing the production that is covered by the
+        consumption of each month, i.e. the sum of min(production, consumption).
+    area, efficiency, system_loss : float, optional
+        Panel attributes used to convert insolation to production.
+    albedo : float, optional
+        Ground reflectance. Defaults to 0.2.
+
+    Returns
+    -------
+    optimum : dict
+        Slope, aspect, insolation (kWh/m²) and score of the best orientation.
+    surface : pandas.DataFrame
+        Annual insolation (kWh/m²) with slopes as index and aspects as columns. If
+        `consumption` is given, the score is returned instead.
+    """
+    slopes = np.asarray(slopes, dtype = float)
+    aspects = np.asarray(aspects, dtype = float)
+
+    monthly = sky.monthly_insolation(
+        slopes[:, None],
+        aspects[None, :],
+        transmittivity = transmittivity,
+        diffuse_proportion = diffuse_proportion,
+        albedo = albedo
+    )
+    insolation = monthly.sum(axis = -1)
+
+    if consumption is None:
+        score = insolation
+    else:
+        consumption = consumption.reindex(sky.month_starts, fill_value = 0).to_numpy()
+        production = monthly * area * efficiency * system_loss
+        score = np.minimum(production, consumption).sum(axis = -1)
+
+    i, j = np.unravel_index(np.argmax(score), score.shape)
+    optimum = {
+        'slope': slopes[i],
+        'aspect': aspects[j],
+        'insolation': insolation[i, j],
+        'score': score[i, j]
+    }
+    logger.debug(f"Optimal orientation with slope={slopes[i]:.0f} and aspect={aspects[j]:.0f}")
+
+    surface = pd.DataFrame(
+        score,
+        index = pd.Index(slopes, name = 'slope'),
+        columns = pd.Index(aspects, name = 'aspect')
+    )
+    return optimum, surface
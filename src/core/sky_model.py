@@ -0,0 +1,276 @@
+import pandas as pd
+import numpy as np
+
+from pathlib import Path
+from typing import Optional, Union
+import hashlib
+import json
+import logging
+
+from .solar_geometry import extraterrestrial_normal, hour_angles, sun_position, to_latitude
+from ..pipeline import file_signature
+
+logger = logging.getLogger(__name__)
+
+def horizon_angles(dem, x, y, n_directions = 36, max_distance = 20000, offset = 0):
+    """
+    Elevation angle (radians) of the terrain horizon around a location.
+
+    Parameters
+    ----------
+    dem : RasterGrid
+        Elevation surface.
+    x, y : float
+        Coordinates of the location in the crs of the DEM.
+    n_directions : int, optional
+        Number of azimuth sectors, starting at north and turning clockwise. Defaults to 36.
+    max_distance : float, optional
+        Search distance in map units. Defaults to 20000.
+    offset : float, optional
+        Height of the location above the surface. Defaults to 0.
+
+    Returns
+    -------
+    numpy.ndarray
+        Horizon angle for each azimuth sector. Negative angles are set to zero.
+    """
+    azimuth = 2 * np.pi * np.arange(n_directions) / n_directions
+    distance = np.arange(dem.cell_size, max_distance, dem.cell_size)
+
+    ray_x = x + np.sin(azimuth)[:, None] * distance[None, :]
+    ray_y = y + np.cos(azimuth)[:, None] * distance[None, :]
+    height = dem.sample(np.column_stack([ray_x.ravel(), ray_y.ravel()])).reshape(ray_x.shape)
+
+    z0 = dem.sample([[x, y]])[0] + offset
+    angles = np.arctan((height - z0) / distance[None, :])
+    return np.clip(np.nan_to_num(np.nanmax(np.where(np.isnan(angles), -np.inf, angles), axis = 1), neginf = 0), 0, None)
+
+class SkyModel:
+    """
+    Sun positions and terrain horizon of one site.
+
+    The geometry only depends on the site and the time period, so it is computed once and
+    reused to evaluate any number of panel orientations and atmospheric parameters.
+    Only time steps with the sun above the horizontal plane are kept.
+
+    Parameters
+    ----------
+    latitude : float
+        Latitude of the site in degrees.
+    dates : pandas.DatetimeIndex
+        Days of the analysis period.
+    n_steps : int, optional
+        Number of time steps per day. Defaults to 24.
+    horizon : numpy.ndarray, optional
+        Horizon angles (radians) per azimuth sector as returned by `horizon_angles`.
+        If None, a flat horizon is assumed.
+    elevation : float, optional
+        Elevation of the site, used to correct the air mass for pressure. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        latitude: float,
+        dates: pd.DatetimeIndex,
+        n_steps: int = 24,
+        horizon: Optional[np.ndarray] = None,
+        elevation: float = 0
+    ):
+        self.latitude = latitude
+        self.dates = pd.DatetimeIndex(dates)
+        self.n_steps = n_steps
+        self.horizon = np.zeros(1) if horizon is None else np.asarray(horizon, dtype = float)
+        self.elevation = 0 if np.isnan(elevation) else elevation
+
+        zenith, azimuth = sun_position(latitude, self.dates.dayofyear.to_numpy()[:, None], hour_angles(n_steps))
+        day = np.broadcast_to(np.arange(len(self.dates))[:, None], zenith.shape)
+
+        daylight = zenith < np.pi / 2
+        self.zenith = zenith[daylight]
+        self.azimuth = azimuth[daylight]
+        self.day = day[daylight]
+        self.hours = 24 / n_steps
+
+        sector = np.floor(self.azimuth / (2 * np.pi) * len(self.horizon)).astype(int) % len(self.horizon)
+        self.visible = (np.pi / 2 - self.zenith) > self.horizon[sector]
+        self.sky_view = np.mean(np.cos(self.horizon)**2)
+
+        # Relative optical air mass (Kasten & Young, 1989) corrected for the site pressure
+        zenith_deg = np.rad2deg(self.zenith)
+        self.air_mass = (
+            np.exp(-self.elevation / 8434.5)
+            / (np.cos(self.zenith) + 0.50572 * (96.07995 - zenith_deg)**-1.6364)
+        )
+        self.s0 = extraterrestrial_normal(self.dates.dayofyear.to_numpy())[self.day]
+
+        self.months = self.dates.to_period('M').to_timestamp()
+        month_index, self.month_starts = pd.factorize(self.months, sort = True)
+        self.month_of_step = month_index[self.day]
+
+        # Step x month weight matrix to sum irradiance (W/m²) to monthly insolation (kWh/m²)
+        self.to_month = np.zeros((len(self.zenith), len(self.month_starts)))
+        self.to_month[np.arange(len(self.zenith)), self.month_of_step] = self.hours / 1000
+        self.sun = np.stack([
+            np.cos(self.zenith),
+            np.sin(self.zenith) * np.cos(self.azimuth),
+            np.sin(self.zenith) * np.sin(self.azimuth)
+        ])
+
+    @classmethod
+    def from_config(cls, config: dict, dem = None, cache_dir: Optional[Union[str, Path]] = None):
+        """
+        Create the sky model for the location in the config file.
+
+        The horizon is computed from `dem` if provided, either a `RasterGrid` or a function
+        returning one. A function is only called if the horizon is not cached, so a cache
+        hit does not read the raster. If `cache_dir` is given, the horizon is stored there
+        and reused by later runs with the same location, DEM file and horizon settings.
+        A flat horizon is used if `horizon` is disabled in the `orientation` section.
+        """
+        rad_config = config['FeatureSolarRadiation']
+        orientation_config = config.get('orientation') or {}
+        location = config['location']
+
+        dates = pd.date_range(
+            pd.to_datetime(rad_config.get('start_date_time', "1/1/2024"), format = "%m/%d/%Y"),
+            pd.to_datetime(rad_config.get('end_date_time', "12/31/2024"), format = "%m/%d/%Y"),
+            freq = 'D'
+        )
+        latitude = to_latitude([location], config['crs'])[0]
+        n_steps = orientation_config.get('n_steps', 24)
+        n_directions = orientation_config.get('n_directions', 36)
+        max_distance = orientation_config.get('max_distance', 20000)
+
+        if not orientation_config.get('horizon', True):
+            return cls(latitude, dates, n_steps = n_steps)
+
+        cache_file = None
+        if cache_dir is not None:
+            key = json.dumps(
+                [location, config['crs'], config['dem'], file_signature(config['dem']), n_directions, max_distance],
+                sort_keys = True
+            )
+            cache_file = Path(cache_dir, f"horizon_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz")
+
+        if cache_file is not None and cache_file.exists():
+            cached = np.load(cache_file)
+            horizon, elevation = cached['horizon'], float(cached['elevation'])
+            logger.debug("Loaded horizon from cache %s", cache_file)
+        elif dem is not None:
+            if callable(dem):
+                dem = dem()
+            horizon = horizon_angles(dem, *location, n_directions = n_directions, max_distance = max_distance)
+            elevation = dem.sample([location])[0]
+            if cache_file is not None:
+                cache_file.parent.mkdir(exist_ok = True, parents = True)
+                np.savez(cache_file, horizon = horizon, elevation = elevation)
+                logger.debug("Saved horizon to cache %s", cache_file)
+        else:
+            horizon, elevation = None, 0
+
+        return cls(latitude, dates, n_steps = n_steps, horizon = horizon, elevation = elevation)
+
+    def irradiance(self, transmittivity: float = 0.5, diffuse_proportion: float = 0.3):
+        """
+        Beam normal and diffuse horizontal irradiance (W/m²) for each daylight time step.
+
+        The beam irradiance is attenuated with `transmittivity` raised to the air mass and
+        the diffuse irradiance is a fixed proportion of the global radiation, following the
+        uniform sky model used by the ArcGIS solar radiation tools.
+        """
+        beam_normal = self.s0 * transmittivity**self.air_mass
+        diffuse_horizontal = (
+            beam_normal * diffuse_proportion / (1 - diffuse_proportion)
+            * np.cos(self.zenith) * self.sky_view
+        )
+        return beam_normal * self.visible, diffuse_horizontal
+
+    def monthly_insolation(
+        self,
+        slope,
+        aspect,
+        transmittivity: float = 0.5,
+        diffuse_proportion: float = 0.3,
+        albedo: float = 0.2,
+        chunk_size: int = 512
+    ):
+        """
+        Monthly insolation (kWh/m²) on planes with the given orientations.
+
+        The cosine of incidence of all orientations is evaluated as one matrix product of
+        the orientation and sun direction vectors, so a dense slope x aspect grid is
+        processed in a single vectorized pass (in chunks of `chunk_size` orientations).
+
+        Parameters
+        ----------
+        slope, aspect : array_like
+            Orientations in degrees, broadcast against each other.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array with the broadcast shape of `slope` and `aspect` plus a trailing month axis.
+        """
+        slope, aspect = np.broadcast_arrays(np.asarray(slope, dtype = float), np.asarray(aspect, dtype = float))
+        shape = slope.shape
+        slope = np.deg2rad(slope.ravel())
+        aspect = np.deg2rad(aspect.ravel())
+
+        beam_normal, diffuse_horizontal = self.irradiance(transmittivity, diffuse_proportion)
+        global_horizontal = beam_normal * np.cos(self.zenith) + diffuse_horizontal
+        planes = self._plane_normals(slope, aspect)
+
+        beam = np.empty((len(slope), len(self.month_starts)))
+        beam_weights = beam_normal[:, None] * self.to_month
+        for start in range(0, len(slope), chunk_size):
+            cos_incidence = planes[start:start + chunk_size] @ self.sun
+            beam[start:start + chunk_size] = np.clip(cos_incidence, 0, None) @ beam_weights
+
+        cos_slope = np.cos(slope)[:, None]
+        out = (
+            beam
+            + (diffuse_horizontal @ self.to_month)[None, :] * (1 + cos_slope) / 2
+            + albedo * (global_horizontal @ self.to_month)[None, :] * (1 - cos_slope) / 2
+        )
+        return out.reshape(shape + (len(self.month_starts),))
+
+    def sample_insolation(self, slope, aspect, transmittivity, diffuse_proportion, albedo: float = 0.2):
+        """
+        Monthly insolation (kWh/m²) for samples that each have their own orientation and
+        atmospheric parameters.
+
+        Parameters
+        ----------
+        slope, aspect, transmittivity, diffuse_proportion : array_like
+            One value per sample.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (samples, months).
+        """
+        slope = np.deg2rad(np.asarray(slope, dtype = float))
+        aspect = np.deg2rad(np.asarray(aspect, dtype = float))
+        transmittivity = np.asarray(transmittivity, dtype = float)[:, None]
+        diffuse_proportion = np.asarray(diffuse_proportion, dtype = float)[:, None]
+
+        beam_normal = self.s0 * transmittivity**self.air_mass
+        diffuse_horizontal = (
+            beam_normal * diffuse_proportion / (1 - diffuse_proportion)
+            * np.cos(self.zenith) * self.sky_view
+        )
+        global_horizontal = beam_normal * self.visible * np.cos(self.zenith) + diffuse_horizontal
+        cos_incidence = np.clip(self._plane_normals(slope, aspect) @ self.sun, 0, None)
+
+        cos_slope = np.cos(slope)[:, None]
+        irradiance = (
+            beam_normal * self.visible * cos_incidence
+            + diffuse_horizontal * (1 + cos_slope) / 2
+            + albedo * global_horizontal * (1 - cos_slope) / 2
+        )
+        return irradiance @ self.to_month
+
+    @staticmethod
+    def _plane_normals(slope, aspect):
+        """Unit normals (radians input) of planes in the (up, north, east) basis of `sun`."""
+        return np.column_stack([np.cos(slope), np.sin(slope) * np.cos(aspect), np.sin(slope) * np.sin(aspect)])
@@ -8,7 +8,9 @@ from typing import Optional, Union
 import logging
 import tempfile
 
-from ..utils import coords_to_shp, load_monthly_radiation
+from ..utils import import_arcpy, load_monthly_radiation
+from ..instrumentation import span
+from .feature_store import FeatureStore
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +24,14 @@ logger = logging.getLogger(__name__)
 class SolarCalculator:
 
     def __init__(self, config):
+        self.full_config = config
         self.config = config['FeatureSolarRadiation']
         self.panel_config = config["panels"]
         self.location = config['location']
         self.output_directory = config.get("output_directory", tempfile.TemporaryDirectory().name)
         self.crs = config['crs']
+        # Kept next to the outputs unless the config file gives a store, see `Workflow.load_config`
+        self.feature_store = FeatureStore(config.get('feature_store', Path(self.output_directory, 'features')))
         Path(self.output_directory).mkdir(exist_ok = True, parents = True)
 
         optim_file = config["optimization"]["optim_file"]       
@@ -40,7 +45,15 @@ class SolarCalculator:
         else:
             self.error_tbl = None
 
-    def calculate_radiation(self, dem: str, features: Optional[list[tuple]] = None):
+    def calculate_radiation(
+        self,
+        dem: str,
+        features: Optional[list[tuple]] = None,
+        start_date_time: Optional[str] = None,
+        end_date_time: Optional[str] = None,
+        panels: Optional[list] = None,
+        parameters: Optional[tuple[float, float]] = None
+    ):
         """
         Compute solar radiation for each feature in a feature class.
 
@@ -48,8 +61,16 @@ class SolarCalculator:
         ----------
         dem : str, path to raster
             The input elevation surface.
-        features : list of tuples
-            The input feature class. A list of tuples with x,y coordinates
+        features : list of tuples or str, optional
+            The input features. Either x,y coordinates or the path to a point feature
+            class. Defaults to the location in the config. Features are created and
+            projected to the crs of `dem` once and reused from the feature store.
+        start_date_time, end_date_time : str, optional
+            Analysis period in MM/DD/YYYY format. Default to the period in the config.
+        panels : list, optional
+            Names of the panels to compute. Defaults to all panels in the config.
+        parameters : tuple, optional
+            Transmittivity and diffuse proportion. Default to `radiation_parameters`.
 
         Returns
         -------
@@ -57,70 +78,55 @@ class SolarCalculator:
             A table with the solar radiation values for each feature.
         """
 
-        try:
-            import arcpy
-            #from arcpy.sa import *
-        except Exception as e:
-            raise ImportError("Error importing arcpy library. Make sure it is available in the current environment.")
+        arcpy = import_arcpy()
 
         if features is None:
             features = self.location
-        if isinstance(features, list):
-            features = coords_to_shp([features], crs = self.crs, out = Path(self.output_directory, "features.shp"))
+        features = self.feature_store.get(features, crs = self.crs, reference = dem)
 
-        spatial_ref = arcpy.Describe(dem).spatialReference
-
-        if spatial_ref.name != arcpy.Describe(str(features)).spatialReference.name:
-            re_name = Path(self.output_directory, "features_reprojected.shp")
-            features = arcpy.management.Project(str(features), out_dataset=str(re_name), out_coor_system=spatial_ref)
-            logger.debug(f"Feature class reprojected at {features} to crs {spatial_ref.name}")
-
-        if self.error_tbl is not None:
-            transmittivity, diffuse_proportion = self.get_optimized_values()
-            logger.info(f'Using optimized transmittivity and diffuse_proportion values of {transmittivity:.2f} and {diffuse_proportion:.2f}')
-        else:
-            diffuse_proportion=self.config.get("diffuse_proportion", 0.3),
-            transmittivity=self.config.get("transmittivity", 0.5),
-            logger.warning(f'Using default transmittivity and diffuse_proportion values of {transmittivity:.2f} and {diffuse_proportion:.2f}')
+        transmittivity, diffuse_proportion = parameters or self.radiation_parameters()
 
         # Run FeatureSolarRadiation
         tbl = []
         unique_id_field = self.config.get('unique_id_field', 'ID')
         for panel_name, panel_attrs in self.panel_config.items():
-            srad = arcpy.sa.FeatureSolarRadiation(
-                in_surface_raster=dem,
-                in_features=str(features),
-                out_table=str( Path(self.output_directory, f"solar_radiation_{panel_name}.dbf") ),
-                unique_id_field=unique_id_field,
-                time_zone=self.config.get('time_zone', "UTC"),
-                start_date_time=self.config.get('start_date', "1/1/2024"),
-                end_date_time=self.config.get('end_date', "12/31/2024"),
-                use_time_interval="NO_INTERVAL" if self.config.get("interval_unit") is None else "INTERVAL",
-                interval_unit=self.config.get("interval_unit"),
-                interval=self.config.get("interval", 1),
-
-                feature_area=panel_attrs.get('area', 0),
-                feature_offset=panel_attrs.get("offset", 0),
-                feature_slope=panel_attrs.get("slope", 0),
-                feature_aspect=panel_attrs.get("aspect", 0),
-
-                diffuse_model_type=self.config.get("diffuse_model_type", "UNIFORM_SKY"),
-                diffuse_proportion=diffuse_proportion,
-                transmittivity=transmittivity,
-                analysis_target_device=self.config.get("analysis_target_device", "GPU_THEN_CPU"),
-            )
+            if panels is not None and panel_name not in panels:
+                continue
+            with span('FeatureSolarRadiation', panel = panel_name):
+                srad = arcpy.sa.FeatureSolarRadiation(
+                    in_surface_raster=dem,
+                    in_features=str(features),
+                    out_table=str( Path(self.output_directory, f"solar_radiation_{panel_name}.dbf") ),
+                    unique_id_field=unique_id_field,
+                    time_zone=self.config.get('time_zone', "UTC"),
+                    start_date_time=start_date_time or self.config.get('start_date_time', self.config.get('start_date', "1/1/2024")),
+                    end_date_time=end_date_time or self.config.get('end_date_time', self.config.get('end_date', "12/31/2024")),
+                    use_time_interval="NO_INTERVAL" if self.config.get("interval_unit") is None else "INTERVAL",
+                    interval_unit=self.config.get("interval_unit"),
+                    interval=self.config.get("interval", 1),
+
+                    feature_area=panel_attrs.get('area', 0),
+                    feature_offset=panel_attrs.get("offset", 0),
+                    feature_slope=panel_attrs.get("slope", 0),
+                    feature_aspect=panel_attrs.get("aspect", 0),
+
+                    diffuse_model_type=self.config.get("diffuse_model_type", "UNIFORM_SKY"),
+                    diffuse_proportion=diffuse_proportion,
+                    transmittivity=transmittivity,
+                    analysis_target_device=self.config.get("analysis_target_device", "GPU_THEN_CPU"),
+                )
             logger.debug(
-                f"""FeatureSolarRadiation saved at {srad} with 
-                    diffuse_proportion={diffuse_proportion:.2f} and 
-                    transmittivity={transmittivity:.2f}
-                    """
-                    )
+                "FeatureSolarRadiation saved at %s with diffuse_proportion=%.2f and transmittivity=%.2f",
+                srad, diffuse_proportion, transmittivity
+            )
 
             out_xlsx = Path(Path().cwd(), self.output_directory, f"solar_radiation_{panel_name}.xlsx")
-            _ = arcpy.conversion.TableToExcel(srad, str(out_xlsx))
+            with span('TableToExcel', panel = panel_name):
+                _ = arcpy.conversion.TableToExcel(srad, str(out_xlsx))
 
             # Read out the table
-            _tbl = pd.read_excel(out_xlsx)
+            with span('read_excel', file = out_xlsx.name):
+                _tbl = pd.read_excel(out_xlsx)
             if unique_id_field == 'ID':
                 unique_id_field = 'Id'
             _tbl = _tbl[[unique_id_field, "str_time", "global_ave", "direct_ave", "diff_ave", "dir_dur"]].copy()
@@ -138,32 +144,36 @@ class SolarCalculator:
         if not (0.1 <= transmittivity <= 1.0 and 0.1 <= diffuse_proportion <= 1.0):
             return np.inf  # Penalize invalid values
 
-        optim_config['Location'] = observation_coords
-
-        optim_config = self.config.copy()
-        optim_config["optimization"]["optim_file"] = None
-        optim_config['FeatureSolarRadiation']['transmittivity'].update(transmittivity)
-        optim_config['FeatureSolarRadiation']['diffuse_proportion'].update(diffuse_proportion)
-        optim_config['FeatureSolarRadiation']['unique_id_field'].update("st_id")
-        optim_config['FeatureSolarRadiation']['interval_unit'].update("DAY")
-        optim_config['FeatureSolarRadiation']['interval'].update(1)
-
-        optim_config['panels'] = {"WeatherStation": {
-            "offset": 2,
-            "slope": 0,
-            "aspect": 180
-        }}
-
-        srad = SolarCalculator(optim_config).calculate_radiation(dem = dem)
+        optim_config = {
+            **self.full_config,
+            'optimization': {**self.full_config['optimization'], 'optim_file': None},
+            'FeatureSolarRadiation': {
+                **self.config,
+                'unique_id_field': "st_id",
+                'interval_unit': "DAY",
+                'interval': 1,
+            },
+            'panels': {"WeatherStation": {
+                "offset": 2,
+                "slope": 0,
+                "aspect": 180
+            }},
+        }
+
+        srad = SolarCalculator(optim_config).calculate_radiation(
+            dem = dem,
+            features = observation_coords,
+            parameters = (transmittivity, diffuse_proportion)
+        )
+        srad['st_id'] = srad['st_id'].astype(str)
         modeled_srad = srad.set_index('date').groupby('st_id').resample('MS')['global_ave'].sum()
 
-        rmse = np.sqrt(np.sum((modeled_srad - observed_srad)**2)/len(modeled_srad - observed_srad))
-        mae = np.mean(np.abs(modeled_srad - observed_srad))
+        error = (modeled_srad - observed_srad).dropna()
+        rmse = np.sqrt(np.sum(error**2)/len(error))
+        mae = np.mean(np.abs(error))
         logger.debug(
-            f"""Error with transmittivity={transmittivity:.2f}, 
-            diffuse_proportion={diffuse_proportion:.2f}: 
-            RMSE: {rmse:.2f}, MAE: {mae:.2f}
-            """
+            "Error with transmittivity=%.2f, diffuse_proportion=%.2f: RMSE: %.2f, MAE: %.2f",
+            transmittivity, diffuse_proportion, rmse, mae
         )
 
         return modeled_srad, rmse, mae
@@ -175,15 +185,18 @@ class SolarCalculator:
         observation_coords: Union[str, Path],
         step: float = 0.1,
         out: Optional[str] = None,
+        observations: Optional[Series] = None,
     ):
         trans_vals = np.arange(0.3, 0.9, step)
         diff_vals = np.arange(.1, .7, step)
 
-        observations = load_monthly_radiation(list(Path(observation_dir).glob('*.csv')))
+        if observations is None:
+            observations = load_monthly_radiation(list(Path(observation_dir).glob('*.csv')))
 
         tbl_error = []
         for params in product(trans_vals, diff_vals):
-            modeled_srad, rmse, mae = self._error_function(params, dem, observations)
+            with span('optimize.evaluate', transmittivity = params[0], diffuse_proportion = params[1]):
+                modeled_srad, rmse, mae = self._error_function(params, dem, observations, observation_coords)
             _tbl = modeled_srad.to_frame()
             _tbl['transmittivity'] = params[0]
             _tbl['diffuse_proportion'] = params[1]
@@ -197,6 +210,20 @@ class SolarCalculator:
 
         self.error_tbl = tbl_error
 
+    def radiation_parameters(self):
+        """
+        Transmittivity and diffuse proportion used for the radiation model. The optimized
+        values are used if an error table is available, the config values otherwise.
+        """
+        if self.error_tbl is not None:
+            transmittivity, diffuse_proportion = self.get_optimized_values()
+            logger.info(f'Using optimized transmittivity and diffuse_proportion values of {transmittivity:.2f} and {diffuse_proportion:.2f}')
+        else:
+            diffuse_proportion = self.config.get("diffuse_proportion", 0.3)
+            transmittivity = self.config.get("transmittivity", 0.5)
+            logger.warning(f'Using default transmittivity and diffuse_proportion values of {transmittivity:.2f} and {diffuse_proportion:.2f}')
+        return transmittivity, diffuse_proportion
+
     def get_optimized_values(self, metric = 'rmse'):
 
         if self.error_tbl is None:
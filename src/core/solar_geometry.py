@@ -0,0 +1,198 @@
+import numpy as np
+
+SOLAR_CONSTANT = 1367.0 # W/m²
+
+# Recommended average day of each month (Klein, 1977)
+MONTHLY_MEAN_DOY = np.array([17, 47, 75, 105, 135, 162, 198, 228, 258, 288, 318, 344])
+
+def solar_declination(doy):
+    """
+    Solar declination (radians) after Cooper (1969).
+
+    Parameters
+    ----------
+    doy : array_like
+        Day of year (1-366).
+    """
+    return np.deg2rad(23.45) * np.sin(2 * np.pi * (284 + np.asarray(doy)) / 365)
+
+def extraterrestrial_normal(doy):
+    """Extraterrestrial irradiance (W/m²) on a plane normal to the sun beam."""
+    return SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * np.asarray(doy) / 365))
+
+def hour_angles(n_steps = 96):
+    """Hour angles (radians) at the centre of `n_steps` equal intervals of one day."""
+    step = 2 * np.pi / n_steps
+    return -np.pi + step * (np.arange(n_steps) + 0.5)
+
+def daylight_hours(latitude, doy):
+    """Length of the day (hours) from sunrise to sunset on a horizontal plane."""
+    cos_sunset = -np.tan(np.deg2rad(latitude)) * np.tan(solar_declination(doy))
+    return 24 / np.pi * np.arccos(np.clip(cos_sunset, -1, 1))
+
+def sun_position(latitude, doy, hour_angle):
+    """
+    Compute solar zenith and azimuth angles. All inputs are broadcast against each other.
+
+    Parameters
+    ----------
+    latitude : array_like
+        Latitude in degrees.
+    doy : array_like
+        Day of year.
+    hour_angle : array_like
+        Hour angle in radians, zero at solar noon and negative in the morning.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Zenith and azimuth in radians. The azimuth is measured clockwise from north,
+        which is the same convention used for the panel `aspect` (180 = south).
+    """
+    lat = np.deg2rad(latitude)
+    decl = solar_declination(doy)
+
+    cos_zenith = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    zenith = np.arccos(np.clip(cos_zenith, -1, 1))
+    azimuth = np.pi + np.arctan2(
+        np.sin(hour_angle),
+        np.cos(hour_angle) * np.sin(lat) - np.tan(decl) * np.cos(lat)
+    )
+    return zenith, azimuth
+
+def incidence_cosine(zenith, azimuth, slope, aspect):
+    """
+    Cosine of the angle of incidence of the sun beam on a tilted plane.
+
+    Parameters
+    ----------
+    zenith, azimuth : array_like
+        Sun position in radians as returned by `sun_position`.
+    slope, aspect : array_like
+        Plane orientation in degrees. The aspect is measured clockwise from north.
+    """
+    slope = np.deg2rad(slope)
+    aspect = np.deg2rad(aspect)
+    return (
+        np.cos(zenith) * np.cos(slope)
+        + np.sin(zenith) * np.sin(slope) * np.cos(azimuth - aspect)
+    )
+
+def transposition_factor(latitude, slope, aspect, diffuse_fraction = 0.3, albedo = 0.2, doy = MONTHLY_MEAN_DOY, n_steps = 96):
+    """
+    Ratio of radiation on a tilted plane to global horizontal radiation.
+
+    Uses the isotropic sky model of Liu & Jordan (1963): the beam part is scaled by the
+    ratio of beam radiation on the tilted and the horizontal plane (Rb), the diffuse part
+    by the sky view factor of the plane and the ground reflected part by the albedo.
+
+    Parameters
+    ----------
+    latitude, slope, aspect : array_like
+        Latitude and plane orientation in degrees, broadcast against each other.
+    diffuse_fraction : float or array_like, optional
+        Share of diffuse radiation on global horizontal radiation. Broadcast against the
+        trailing day axis, so monthly values can be given. Defaults to 0.3.
+    albedo : float, optional
+        Ground reflectance. Defaults to 0.2.
+    doy : array_like, optional
+        Days of year for which the factor is computed. Defaults to the recommended
+        average day of each month.
+    n_steps : int, optional
+        Number of time steps used to integrate each day. Defaults to 96 (15 minutes).
+
+    Returns
+    -------
+    numpy.ndarray
+        Array with the broadcast shape of `latitude`, `slope` and `aspect` plus a
+        trailing axis of length `len(doy)`.
+    """
+    latitude, slope, aspect = np.broadcast_arrays(
+        np.asarray(latitude, dtype = float),
+        np.asarray(slope, dtype = float),
+        np.asarray(aspect, dtype = float)
+    )
+    doy = np.asarray(doy)
+
+    zenith, azimuth = sun_position(latitude[..., None, None], doy[:, None], hour_angles(n_steps))
+    cos_zenith = np.cos(zenith)
+    cos_incidence = incidence_cosine(zenith, azimuth, slope[..., None, None], aspect[..., None, None])
+
+    daylight = cos_zenith > 0
+    beam_tilted = np.where(daylight, np.clip(cos_incidence, 0, None), 0).sum(axis = -1)
+    beam_horizontal = np.where(daylight, cos_zenith, 0).sum(axis = -1)
+    rb = np.divide(beam_tilted, beam_horizontal, out = np.zeros_like(beam_tilted), where = beam_horizontal > 0)
+
+    cos_slope = np.cos(np.deg2rad(slope))[..., None]
+    return (
+        (1 - diffuse_fraction) * rb
+        + diffuse_fraction * (1 + cos_slope) / 2
+        + albedo * (1 - cos_slope) / 2
+    )
+
+def utm_to_latitude(x, y, zone_south = False):
+    """
+    Latitude (degrees) of projected UTM coordinates on the GRS80/WGS84 ellipsoid (Snyder, 1987).
+    """
+    a = 6378137.0
+    f = 1 / 298.257222101
+    k0 = 0.9996
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+
+    northing = np.asarray(y, dtype = float) - (10_000_000 if zone_south else 0)
+    mu = northing / k0 / (a * (1 - e2 / 4 - 3 * e2**2 / 64 - 5 * e2**3 / 256))
+    phi1 = (
+        mu
+        + (3 * e1 / 2 - 27 * e1**3 / 32) * np.sin(2 * mu)
+        + (21 * e1**2 / 16 - 55 * e1**4 / 32) * np.sin(4 * mu)
+        + (151 * e1**3 / 96) * np.sin(6 * mu)
+        + (1097 * e1**4 / 512) * np.sin(8 * mu)
+    )
+
+    c1 = ep2 * np.cos(phi1)**2
+    t1 = np.tan(phi1)**2
+    n1 = a / np.sqrt(1 - e2 * np.sin(phi1)**2)
+    r1 = a * (1 - e2) / (1 - e2 * np.sin(phi1)**2)**1.5
+    d = (np.asarray(x, dtype = float) - 500_000) / (n1 * k0)
+
+    phi = phi1 - (n1 * np.tan(phi1) / r1) * (
+        d**2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1**2 - 9 * ep2) * d**4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1**2 - 252 * ep2 - 3 * c1**2) * d**6 / 720
+    )
+    return np.rad2deg(phi)
+
+def to_latitude(coords, crs):
+    """
+    Latitude (degrees) of coordinates given in the coordinate reference system `crs`.
+
+    UTM systems (EPSG 258xx, 326xx and 327xx) and geographic WGS84 (EPSG 4326) are
+    handled directly, all other systems require the optional `pyproj` package.
+
+    Parameters
+    ----------
+    coords : array_like
+        Array of shape (n, 2) with x,y coordinates.
+    crs : int
+        EPSG code of the coordinates.
+    """
+    coords = np.atleast_2d(np.asarray(coords, dtype = float))
+    x, y = coords[:, 0], coords[:, 1]
+
+    if crs == 4326:
+        return y
+    if 25801 <= crs <= 25860 or 32601 <= crs <= 32660:
+        return utm_to_latitude(x, y)
+    if 32701 <= crs <= 32760:
+        return utm_to_latitude(x, y, zone_south = True)
+
+    try:
+        from pyproj import Transformer
+    except Exception as e:
+        raise ImportError(f"Converting coordinates of EPSG:{crs} to latitudes requires the pyproj library.")
+
+    transformer = Transformer.from_crs(crs, 4326, always_xy = True)
+    _, lat = transformer.transform(x, y)
+    return np.asarray(lat)
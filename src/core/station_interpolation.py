@@ -0,0 +1,218 @@
+import pandas as pd
+import numpy as np
+from scipy.spatial import cKDTree
+
+from pathlib import Path
+from typing import Optional
+import logging
+
+from ..utils import RasterGrid, load_monthly_radiation, read_point_features
+from .solar_geometry import MONTHLY_MEAN_DOY, to_latitude, transposition_factor
+
+logger = logging.getLogger(__name__)
+
+class StationInterpolator:
+    """
+    Fast estimate of monthly insolation from the station network.
+
+    Monthly horizontal insolation (`global_ave`) of the stations is interpolated to
+    arbitrary query locations with inverse distance weighting (IDW) over the `k`
+    nearest stations, found with a KD-tree. If a DEM is given, a linear elevation
+    gradient is fitted per month over all stations, the residuals are interpolated
+    and the gradient is applied again with the elevation of the query location.
+    The horizontal values are finally transposed to the slope and aspect of each panel.
+
+    This is intended as a pre-screen before running the full terrain model with
+    `SolarCalculator.calculate_radiation`, since it ignores terrain shading.
+    """
+
+    def __init__(
+        self,
+        observations: pd.Series,
+        station_coords: pd.DataFrame,
+        crs: int,
+        k: int = 8,
+        power: float = 2,
+        dem: Optional[RasterGrid] = None,
+        albedo: float = 0.2
+    ):
+        monthly = observations.unstack(level = 0)
+        stations = station_coords.index.intersection(monthly.columns)
+        if len(stations) == 0:
+            raise ValueError("No station ids are shared between the observations and the station coordinates.")
+        if len(stations) < len(station_coords):
+            logger.warning(f"{len(station_coords) - len(stations)} stations without observations are ignored")
+
+        self.stations = stations
+        self.dates = monthly.index
+        self.values = monthly[stations].to_numpy().T # stations x months
+        self.coords = station_coords.loc[stations, ['x', 'y']].to_numpy()
+        self.tree = cKDTree(self.coords)
+        self.crs = crs
+        self.k = min(k, len(stations))
+        self.power = power
+        self.albedo = albedo
+        self.dem = dem
+
+        self.intercept = np.zeros(len(self.dates))
+        self.gradient = np.zeros(len(self.dates))
+        self.elevation = None
+        if dem is not None:
+            self.elevation = dem.sample(self.coords)
+            self._fit_elevation_gradient()
+
+        logger.info(f"Station interpolator built from {len(stations)} stations")
+
+    @classmethod
+    def from_config(cls, config: dict, dem: Optional[RasterGrid] = None):
+        """
+        Interpolator of the stations in the `optimization` config section.
+
+        `dem` is only used with `elevation_correction`. Pass an already loaded DEM to
+        avoid reading the raster again, it is read from the config otherwise.
+        """
+        interp_config = config.get('interpolation') or {}
+        optim_config = config['optimization']
+
+        observations = load_monthly_radiation(list(Path(optim_config['optim_dir']).glob('*.csv')))
+        station_coords = read_point_features(
+            optim_config['optim_coords'],
+            id_field = interp_config.get('id_field', 'st_id'),
+            crs = config['crs']
+        )
+        if not interp_config.get('elevation_correction', False):
+            dem = None
+        elif dem is None:
+            dem = RasterGrid.from_file(config['dem'])
+
+        return cls(
+            observations,
+            station_coords,
+            crs = config['crs'],
+            k = interp_config.get('k', 8),
+            power = interp_config.get('power', 2),
+            dem = dem,
+            albedo = interp_config.get('albedo', 0.2)
+        )
+
+    def _fit_elevation_gradient(self):
+        for i in range(len(self.dates)):
+            valid = ~np.isnan(self.values[:, i]) & ~np.isnan(self.elevation)
+            if valid.sum() < 3:
+                continue
+            design = np.column_stack([np.ones(valid.sum()), self.elevation[valid]])
+            (self.intercept[i], self.gradient[i]), *_ = np.linalg.lstsq(design, self.values[valid, i], rcond = None)
+
+    def _trend(self, elevation):
+        return self.intercept + self.gradient * elevation[:, None]
+
+    def query(self, coords, elevation = None):
+        """
+        Interpolate monthly horizontal insolation to the query locations.
+
+        Parameters
+        ----------
+        coords : array_like
+            Array of shape (n, 2) with x,y coordinates in the crs of the interpolator.
+        elevation : array_like, optional
+            Elevation of the query locations. If None and a DEM is available, the
+            elevation is sampled from the DEM.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (n, months) with the horizontal insolation.
+        """
+        coords = np.atleast_2d(np.asarray(coords, dtype = float))
+        distance, index = self.tree.query(coords, k = self.k)
+        distance = distance.reshape(len(coords), -1)
+        index = index.reshape(len(coords), -1)
+
+        weights = 1 / np.maximum(distance, 1e-6)**self.power
+
+        values = self.values[index]
+        if self.elevation is not None:
+            values = values - self._trend(self.elevation)[index]
+
+        valid = ~np.isnan(values)
+        weights = weights[..., None] * valid
+        estimate = (weights * np.where(valid, values, 0)).sum(axis = 1) / weights.sum(axis = 1)
+
+        if self.elevation is not None:
+            if elevation is None:
+                elevation = self.dem.sample(coords)
+            elevation = np.asarray(elevation, dtype = float).copy()
+            # Without a valid elevation, the trend at the interpolated station elevation
+            # is restored, which reduces the estimate to plain IDW of the observations.
+            missing = np.isnan(elevation)
+            if missing.any():
+                station_weights = weights[missing].mean(axis = -1)
+                elevation[missing] = (
+                    (station_weights * self.elevation[index[missing]]).sum(axis = 1)
+                    / station_weights.sum(axis = 1)
+                )
+            estimate = estimate + self._trend(elevation)
+
+        return np.clip(estimate, 0, None)
+
+    def transpose(self, horizontal, coords, panel_config: dict, diffuse_fraction: float = 0.3):
+        """
+        Transpose horizontal insolation to the slope and aspect of each panel.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (n, panels, months) with the insolation per m² panel surface.
+        """
+        slopes = np.array([attrs.get('slope', 0) for attrs in panel_config.values()], dtype = float)
+        aspects = np.array([attrs.get('aspect', 180) for attrs in panel_config.values()], dtype = float)
+
+        # The transposition factor varies slowly with latitude, so it is only evaluated
+        # once per 0.01° latitude band and shared by all queries within the band
+        latitude = np.round(to_latitude(coords, self.crs), 2)
+        bands, band_index = np.unique(latitude, return_inverse = True)
+        factors = transposition_factor(
+            bands[:, None],
+            slopes[None, :],
+            aspects[None, :],
+            diffuse_fraction = diffuse_fraction,
+            albedo = self.albedo,
+            doy = MONTHLY_MEAN_DOY[self.dates.month - 1]
+        )
+
+        return horizontal[:, None, :] * factors[band_index.ravel()]
+
+    def estimate(self, coords, panel_config: dict, diffuse_fraction: float = 0.3, elevation = None):
+        """
+        Estimate the monthly insolation of each panel at the query locations.
+
+        Parameters
+        ----------
+        coords : array_like
+            Array of shape (n, 2) with x,y coordinates in the crs of the interpolator.
+        panel_config : dict
+            Panel attributes as in the `panels` section of the config file.
+        diffuse_fraction : float, optional
+            Share of diffuse radiation on global radiation. Defaults to 0.3.
+        elevation : array_like, optional
+            Elevation of the query locations, see `query`.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table with the columns Id, date, panel, global_ave (kWh/m²) and srad
+            (global_ave multiplied by the panel area).
+        """
+        coords = np.atleast_2d(np.asarray(coords, dtype = float))
+        tilted = self.transpose(self.query(coords, elevation), coords, panel_config, diffuse_fraction)
+
+        n_sites, n_panels, n_dates = tilted.shape
+        areas = np.array([attrs.get('area', 0) for attrs in panel_config.values()], dtype = float)
+
+        return pd.DataFrame({
+            'Id': np.repeat(np.arange(n_sites), n_panels * n_dates),
+            'date': np.tile(self.dates, n_sites * n_panels),
+            'panel': np.tile(np.repeat(list(panel_config.keys()), n_dates), n_sites),
+            'global_ave': tilted.ravel(),
+            'srad': (tilted * areas[None, :, None]).ravel()
+        })
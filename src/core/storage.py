@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def simulate_storage(
+    production,
+    consumption,
+    capacities,
+    charge_efficiency: float = 0.95,
+    discharge_efficiency: float = 0.95,
+    c_rate: Optional[float] = 0.5,
+    hours: float = 24,
+    min_soc: float = 0.1,
+    initial_soc: float = 0.5,
+    return_soc: bool = False
+):
+    """
+    Simulate battery storage and self-consumption for many battery capacities at once.
+
+    The simulation steps sequentially through time, but each step updates the state of
+    charge of all capacities with array operations, so sweeping hundreds of battery
+    sizes costs about as much as simulating one.
+
+    Parameters
+    ----------
+    production, consumption : array_like or pandas.Series
+        Electricity production and consumption (kWh) for each time step. If both are
+        Series, they are aligned on their index.
+    capacities : array_like
+        Usable battery capacities (kWh). A capacity of 0 gives the case without storage.
+    charge_efficiency, discharge_efficiency : float, optional
+        Efficiency of charging and discharging the battery. Default to 0.95.
+    c_rate : float, optional
+        Maximum charge and discharge power as a fraction of the capacity per hour. If
+        None, the power is not limited. Defaults to 0.5.
+    hours : float, optional
+        Length of one time step in hours, used with `c_rate`. Defaults to 24 (daily data).
+    min_soc : float, optional
+        Minimum state of charge as a fraction of the capacity. Defaults to 0.1.
+    initial_soc : float, optional
+        State of charge at the start as a fraction of the capacity. Defaults to 0.5.
+        If it is below `min_soc`, the battery is not discharged until it is charged above it.
+    return_soc : bool, optional
+        Also return the state of charge for each time step and capacity.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table indexed by capacity with the totals of self-consumed energy, grid import
+        and grid export, the self-consumption ratio (self-consumed / production) and the
+        self-sufficiency (self-consumed / consumption). If `return_soc` is True, a second
+        array of shape (time steps, capacities) with the state of charge (kWh) is returned.
+    """
+    if isinstance(production, pd.Series) and isinstance(consumption, pd.Series):
+        production, consumption = production.align(consumption, join = 'inner')
+
+    production = np.asarray(production, dtype = float)
+    consumption = np.asarray(consumption, dtype = float)
+    capacities = np.atleast_1d(np.asarray(capacities, dtype = float))
+
+    # Energy that is not used directly by the consumption
+    surplus = np.clip(production - consumption, 0, None)
+    deficit = np.clip(consumption - production, 0, None)
+
+    soc_min = capacities * min_soc
+    soc_max = capacities
+    power = capacities * c_rate * hours if c_rate is not None else np.full(len(capacities), np.inf)
+
+    soc = capacities * initial_soc
+    charged = np.zeros(len(capacities))
+    discharged = np.zeros(len(capacities))
+    soc_series = np.empty((len(production), len(capacities))) if return_soc else None
+
+    for t in range(len(production)):
+        charge = np.minimum(np.minimum(surplus[t], power), (soc_max - soc) / charge_efficiency)
+        # A battery that starts below the minimum state of charge is charged first, not discharged
+        discharge = np.minimum(np.minimum(deficit[t], power), np.maximum(soc - soc_min, 0) * discharge_efficiency)
+        soc = soc + charge * charge_efficiency - discharge / discharge_efficiency
+
+        charged += charge
+        discharged += discharge
+        if return_soc:
+            soc_series[t] = soc
+
+    direct = np.minimum(production, consumption).sum()
+    self_consumed = direct + discharged
+    total_production = production.sum()
+    total_consumption = consumption.sum()
+
+    tbl = pd.DataFrame({
+        'self_consumption': self_consumed,
+        'grid_import': total_consumption - self_consumed,
+        'grid_export': surplus.sum() - charged,
+        'self_consumption_ratio': self_consumed / total_production if total_production > 0 else np.nan,
+        'self_sufficiency': self_consumed / total_consumption if total_consumption > 0 else np.nan,
+    }, index = pd.Index(capacities, name = 'capacity'))
+
+    if return_soc:
+        return tbl, soc_series
+    return tbl
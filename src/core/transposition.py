@@ -0,0 +1,175 @@
+import pandas as pd
+import numpy as np
+
+import logging
+
+from .sky_model import SkyModel
+from .solar_geometry import extraterrestrial_normal, solar_declination
+
+logger = logging.getLogger(__name__)
+
+def extraterrestrial_daily(latitude, doy):
+    """Daily extraterrestrial insolation (kWh/m²) on a horizontal plane."""
+    lat = np.deg2rad(latitude)
+    decl = solar_declination(doy)
+    sunset = np.arccos(np.clip(-np.tan(lat) * np.tan(decl), -1, 1))
+    return (
+        24 / np.pi * extraterrestrial_normal(doy) / 1000
+        * (np.cos(lat) * np.cos(decl) * np.sin(sunset) + sunset * np.sin(lat) * np.sin(decl))
+    )
+
+def diffuse_fraction_erbs(clearness, sunset_angle):
+    """
+    Daily diffuse fraction from the daily clearness index (Erbs et al., 1982).
+
+    Parameters
+    ----------
+    clearness : array_like
+        Ratio of daily global to extraterrestrial horizontal insolation.
+    sunset_angle : array_like
+        Sunset hour angle in radians.
+    """
+    kt = np.clip(clearness, 0, 1)
+    short_day = np.where(
+        kt < 0.715,
+        1.0 - 0.2727 * kt + 2.4495 * kt**2 - 11.9514 * kt**3 + 9.3879 * kt**4,
+        0.143
+    )
+    long_day = np.where(
+        kt < 0.722,
+        1.0 + 0.2832 * kt - 2.5557 * kt**2 + 0.8448 * kt**3,
+        0.175
+    )
+    return np.clip(np.where(sunset_angle < np.deg2rad(81.4), short_day, long_day), 0, 1)
+
+class TranspositionEngine:
+    """
+    Transpose measured or interpolated horizontal insolation to tilted panels.
+
+    The daily global horizontal insolation is split into its direct and diffuse part with
+    the decomposition model of Erbs et al. (1982). The direct part is scaled with the ratio
+    of the direct irradiance on the panel to the horizontal plane, integrated over the day
+    with the sun positions of the sky model and shaded by its horizon. The diffuse part
+    is scaled with the sky view of the panel and the horizon, and the ground reflected
+    part with the albedo.
+
+    The output has the same columns as `SolarCalculator.calculate_radiation`, so sites
+    close to a station can be reported without running the terrain model.
+
+    Parameters
+    ----------
+    sky : SkyModel
+        Sky model of the site. Its dates define the output period.
+    panel_config : dict
+        Panel attributes as in the `panels` section of the config file.
+    albedo : float, optional
+        Ground reflectance. Defaults to 0.2.
+    """
+
+    def __init__(self, sky: SkyModel, panel_config: dict, albedo: float = 0.2):
+        self.sky = sky
+        self.panel_config = panel_config
+        self.albedo = albedo
+
+        slope = np.deg2rad([attrs.get('slope', 0) for attrs in panel_config.values()])
+        aspect = np.deg2rad([attrs.get('aspect', 180) for attrs in panel_config.values()])
+        n_days = len(sky.dates)
+
+        cos_incidence = np.clip(sky._plane_normals(slope, aspect) @ sky.sun, 0, None) * sky.visible
+        cos_zenith = np.cos(sky.zenith)
+
+        # Daily sums of the direct irradiance on each panel relative to the horizontal plane
+        tilted = np.stack([np.bincount(sky.day, weights = c, minlength = n_days) for c in cos_incidence])
+        horizontal = np.bincount(sky.day, weights = cos_zenith, minlength = n_days)
+        self.beam_ratio = np.divide(tilted, horizontal, out = np.zeros_like(tilted), where = horizontal > 0)
+        self.direct_duration = np.stack([
+            np.bincount(sky.day, weights = (c > 0) * sky.hours, minlength = n_days) for c in cos_incidence
+        ])
+
+        self.cos_slope = np.cos(slope)[:, None]
+        self.extraterrestrial = extraterrestrial_daily(sky.latitude, sky.dates.dayofyear.to_numpy())
+        self.sunset_angle = np.arccos(np.clip(
+            -np.tan(np.deg2rad(sky.latitude)) * np.tan(solar_declination(sky.dates.dayofyear.to_numpy())), -1, 1
+        ))
+
+    def _daily(self, horizontal: pd.Series):
+        """
+        Align a daily or monthly series to the days of the sky model.
+
+        Monthly values of other years than the sky model, e.g. the long-term monthly means
+        of the station network, are matched by month of year. Daily values must overlap
+        with the days of the sky model.
+        """
+        if horizontal.empty:
+            raise ValueError("No horizontal insolation to transpose")
+        horizontal = horizontal.copy()
+        horizontal.index = pd.DatetimeIndex(horizontal.index)
+        dates = self.sky.dates
+        if len(horizontal) and (horizontal.index.day == 1).all() and len(horizontal) < len(dates) / 2:
+            # Monthly totals are spread evenly over the days of the month
+            months = dates.to_period('M')
+            monthly = horizontal.groupby(horizontal.index.to_period('M')).sum()
+            if months.isin(monthly.index).any():
+                values = monthly.reindex(months).to_numpy()
+            else:
+                logger.info("Monthly insolation of other years than the period, matched by month of year")
+                values = monthly.groupby(monthly.index.month).mean().reindex(dates.month).to_numpy()
+            daily = values / dates.days_in_month.to_numpy()
+        else:
+            daily = horizontal.reindex(dates).to_numpy()
+
+        missing = np.isnan(daily).sum()
+        if missing == len(daily):
+            raise ValueError(
+                f"Horizontal insolation from {horizontal.index.min():%Y-%m-%d} to {horizontal.index.max():%Y-%m-%d} "
+                f"does not overlap the period {dates[0]:%Y-%m-%d} to {dates[-1]:%Y-%m-%d}"
+            )
+        if missing:
+            logger.warning(f"No horizontal insolation for {missing} of {len(daily)} days, they are left out")
+        return daily
+
+    def transpose(self, horizontal: pd.Series, unique_id = 1):
+        """
+        Transpose horizontal insolation to all panels.
+
+        Parameters
+        ----------
+        horizontal : pandas.Series
+            Daily or monthly global horizontal insolation (kWh/m²) indexed by date.
+        unique_id : int, optional
+            Value of the Id column. Defaults to 1.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table with the columns Id, date, global_ave, direct_ave, diff_ave, dir_dur, srad and panel.
+        """
+        global_horizontal = self._daily(horizontal)
+
+        clearness = np.divide(
+            global_horizontal, self.extraterrestrial,
+            out = np.zeros_like(global_horizontal), where = self.extraterrestrial > 0
+        )
+        diffuse_horizontal = global_horizontal * diffuse_fraction_erbs(clearness, self.sunset_angle)
+        direct_horizontal = global_horizontal - diffuse_horizontal
+
+        direct = direct_horizontal[None, :] * self.beam_ratio
+        diffuse = (
+            diffuse_horizontal[None, :] * self.sky.sky_view * (1 + self.cos_slope) / 2
+            + self.albedo * global_horizontal[None, :] * (1 - self.cos_slope) / 2
+        )
+        global_tilted = direct + diffuse
+
+        n_panels, n_days = global_tilted.shape
+        areas = np.array([attrs.get('area', 0) for attrs in self.panel_config.values()], dtype = float)
+        tbl = pd.DataFrame({
+            'Id': unique_id,
+            'date': np.tile(self.sky.dates, n_panels),
+            'global_ave': global_tilted.ravel(),
+            'direct_ave': direct.ravel(),
+            'diff_ave': diffuse.ravel(),
+            'dir_dur': self.direct_duration.ravel(),
+            'srad': (global_tilted * areas[:, None]).ravel(),
+            'panel': np.repeat(list(self.panel_config.keys()), n_days),
+        })
+        return tbl.dropna(subset = ['global_ave']).reset_index(drop = True)
@@ -0,0 +1,280 @@
+"""
+Timing and memory instrumentation of named spans.
+
+Code marks its stages with `span`, or whole functions with `traced`:
+
+    with span('TableToExcel', panel = panel_name):
+        ...
+
+    @traced('load_observations')
+    def load_monthly_radiation(files):
+        ...
+
+Spans are only recorded after `enable()`. While disabled, `span` returns a shared no-op
+context manager, so instrumented code pays one function call per span. Each recorded span
+holds its wall time, the CPU time of the process, the time spent outside nested spans and
+the peak resident set size (RSS) of the process. The peak RSS is a high-water mark of the
+whole process, so `rss_growth` tells which span raised it.
+
+Only the standard library is imported, so the command line interface can enable the
+instrumentation before the heavy modules are loaded.
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+def peak_rss():
+    """Peak resident set size of the process in bytes, or None if it is not available."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class _NullSpan:
+    """Span returned while the instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """A recorded span, see `span`. Extra values can be attached with `set`."""
+
+    __slots__ = ('recorder', 'name', 'args', 'start', 'cpu_start', 'peak_start', 'child_time')
+
+    def __init__(self, recorder: 'Recorder', name: str, args: dict):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+        self.child_time = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.recorder._stack().append(self)
+        self.peak_start = peak_rss()
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        cpu = time.process_time() - self.cpu_start
+        peak = peak_rss()
+
+        stack = self.recorder._stack()
+        stack.pop()
+        wall = end - self.start
+        if stack:
+            stack[-1].child_time += wall
+
+        self.recorder._add({
+            'name': self.name,
+            'start': self.start - self.recorder.origin,
+            'wall': wall,
+            'self': wall - self.child_time,
+            'cpu': cpu,
+            'peak_rss': peak,
+            'rss_growth': None if peak is None else peak - self.peak_start,
+            'depth': len(stack),
+            'tid': threading.get_ident(),
+            'args': self.args,
+            'error': exc[0].__name__ if exc[0] is not None else None,
+        })
+        return False
+
+class Recorder:
+    """
+    Store of the spans recorded since `enable()`.
+
+    Spans of all threads are collected. Nesting is tracked per thread, so spans of
+    concurrent threads do not count as children of each other.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def span(self, name: str, **args):
+        return Span(self, name, args)
+
+    def summary(self, start: int = 0):
+        """
+        Totals per span name, sorted by the time spent in the spans themselves.
+
+        Parameters
+        ----------
+        start : int, optional
+            Index of the first record to include, e.g. the number of records before a run.
+
+        Returns
+        -------
+        list of dict
+            Name, calls, wall, self and cpu time in seconds, maximum peak RSS and total
+            RSS growth in bytes, and the share of the self time in the wall time of the
+            outermost spans.
+        """
+        records = self.records[start:]
+        total = sum(r['wall'] for r in records if r['depth'] == 0) or None
+
+        rows = {}
+        for r in records:
+            row = rows.setdefault(r['name'], {
+                'name': r['name'], 'calls': 0, 'wall': 0.0, 'self': 0.0, 'cpu': 0.0,
+                'peak_rss': None, 'rss_growth': None
+            })
+            row['calls'] += 1
+            row['wall'] += r['wall']
+            row['self'] += r['self']
+            row['cpu'] += r['cpu']
+            if r['peak_rss'] is not None:
+                row['peak_rss'] = max(row['peak_rss'] or 0, r['peak_rss'])
+                row['rss_growth'] = (row['rss_growth'] or 0) + r['rss_growth']
+
+        for row in rows.values():
+            row['share'] = None if total is None else row['self'] / total
+        return sorted(rows.values(), key = lambda row: row['self'], reverse = True)
+
+    def format_summary(self, start: int = 0):
+        """Summary table as text, see `summary`."""
+        def mb(value):
+            return '-' if value is None else f"{value / 2**20:.1f}"
+
+        lines = [f"{'span':<32} {'calls':>6} {'wall (s)':>9} {'self (s)':>9} {'cpu (s)':>9} {'share':>6} {'peak MB':>8} {'+MB':>7}"]
+        for row in self.summary(start):
+            share = '-' if row['share'] is None else f"{row['share']:.0%}"
+            lines.append(
+                f"{row['name'][:32]:<32} {row['calls']:>6} {row['wall']:>9.3f} {row['self']:>9.3f} "
+                f"{row['cpu']:>9.3f} {share:>6} {mb(row['peak_rss']):>8} {mb(row['rss_growth']):>7}"
+            )
+        return "\n".join(lines)
+
+    def trace(self, start: int = 0):
+        """
+        Recorded spans in the Chrome trace event format, with the summary in `otherData`.
+
+        The trace opens in chrome://tracing, Perfetto or speedscope.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                'name': r['name'],
+                'cat': r['name'].split(':')[0].split('.')[0],
+                'ph': 'X',
+                'ts': round(r['start'] * 1e6, 1),
+                'dur': round(r['wall'] * 1e6, 1),
+                'pid': pid,
+                'tid': r['tid'],
+                'args': {
+                    **r['args'],
+                    'cpu_ms': round(r['cpu'] * 1000, 3),
+                    'self_ms': round(r['self'] * 1000, 3),
+                    'peak_rss_mb': None if r['peak_rss'] is None else round(r['peak_rss'] / 2**20, 1),
+                    'rss_growth_mb': None if r['rss_growth'] is None else round(r['rss_growth'] / 2**20, 1),
+                    **({'error': r['error']} if r['error'] else {}),
+                },
+            }
+            for r in self.records[start:]
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'summary': self.summary(start)}}
+
+    def write_trace(self, path: Union[str, Path], start: int = 0):
+        """Write the trace, see `trace`, to a JSON file and return its path."""
+        path = Path(path)
+        path.parent.mkdir(exist_ok = True, parents = True)
+        with open(path, 'w', encoding = 'utf-8') as f:
+            json.dump(self.trace(start), f, default = str)
+        logger.info(f"Trace of {len(self.records) - start} spans written to {path}")
+        return path
+
+_recorder: Optional[Recorder] = None
+
+def enable():
+    """Start recording spans and return the recorder. Spans recorded before are dropped."""
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+def disable():
+    """Stop recording spans."""
+    global _recorder
+    _recorder = None
+
+def recorder():
+    """The active recorder, or None while the instrumentation is disabled."""
+    return _recorder
+
+def span(name: str, **args):
+    """
+    Context manager that records the wall time, CPU time and peak RSS of its block.
+
+    Parameters
+    ----------
+    name : str
+        Name of the span. Spans with the same name are totaled in the summary.
+    **args
+        Values stored with the span, e.g. the panel or the number of features.
+        Only pass values that are cheap to compute, they are evaluated even while the
+        instrumentation is disabled.
+    """
+    if _recorder is None:
+        return _NULL_SPAN
+    return _recorder.span(name, **args)
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator recording every call of a function as a span, see `span`.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the span. Defaults to the qualified name of the function.
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
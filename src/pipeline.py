@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import pickle
+import re
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
+
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+def _hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys = True, default = str).encode()).hexdigest()[:16]
+
+def file_signature(path: Union[str, Path]):
+    """Signature of a file from its size and modification time, without reading its content."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+def config_value(config: dict, key: str):
+    """Value of a dotted key, e.g. 'panels.south', or None if it is missing."""
+    value = config
+    for part in key.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+class Stage:
+    """
+    One step of a `Pipeline`.
+
+    Parameters
+    ----------
+    name : str
+        Unique name of the stage.
+    func : callable
+        Function called with a mapping of the outputs of `depends`. Outputs are only
+        computed or loaded when they are accessed.
+    config : iterable of str, optional
+        Config keys (dotted for nested sections) whose values are part of the fingerprint.
+    files : iterable of str or callable, optional
+        Input files whose size and modification time are part of the fingerprint. A callable
+        returning the files can be given for inputs that are only known at run time.
+    depends : iterable of str, optional
+        Names of the stages whose outputs are inputs of this stage.
+    persist : bool, optional
+        Store the output on disk to reuse it in later runs. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        config: Iterable[str] = (),
+        files: Union[Iterable, Callable] = (),
+        depends: Iterable[str] = (),
+        persist: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.config = list(config)
+        self.files = files
+        self.depends = list(depends)
+        self.persist = persist
+
+class _StageInputs(Mapping):
+    """Mapping of stage outputs that resolves each stage on first access."""
+
+    def __init__(self, pipeline, names):
+        self.pipeline = pipeline
+        self.names = names
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        return self.pipeline.resolve(name)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+class Pipeline:
+    """
+    Directed acyclic graph of stages with persisted outputs.
+
+    Every stage has a fingerprint built from its config sections, its input files and the
+    fingerprints of the stages it depends on. When a stage is resolved and a persisted
+    output with the same fingerprint exists, the output is loaded instead of running the
+    stage. Stages are resolved lazily, so stages whose output is not needed do not run.
+
+    Parameters
+    ----------
+    config : dict
+        Configuration used for the fingerprints.
+    cache_dir : str or Path
+        Directory where stage outputs and their fingerprints are stored.
+    force : bool, optional
+        Run all requested stages regardless of their fingerprint. Defaults to False.
+    """
+
+    def __init__(self, config: dict, cache_dir: Union[str, Path], force: bool = False):
+        self.config = config
+        self.cache_dir = Path(cache_dir)
+        self.force = force
+        self.stages = {}
+        self.outputs = {}
+        self.decisions = {}
+        self._fingerprints = {}
+
+    def add(self, stage: Stage):
+        if stage.name in self.stages:
+            raise ValueError(f"Stage {stage.name} already exists.")
+        missing = [d for d in stage.depends if d not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}. Add them first.")
+        self.stages[stage.name] = stage
+
+    def components(self, name: str):
+        """Named parts of the fingerprint of a stage."""
+        stage = self.stages[name]
+        files = stage.files() if callable(stage.files) else stage.files
+
+        parts = {f"config:{key}": _hash(config_value(self.config, key)) for key in stage.config}
+        parts.update({f"file:{f}": _hash(file_signature(f)) for f in files})
+        parts.update({f"stage:{d}": self.fingerprint(d) for d in stage.depends})
+        return parts
+
+    def fingerprint(self, name: str):
+        if name not in self._fingerprints:
+            self._fingerprints[name] = _hash(self.components(name))
+        return self._fingerprints[name]
+
+    def _paths(self, name: str):
+        stem = re.sub(r'[^\w.-]', '_', name)
+        return self.cache_dir / f"{stem}.pkl", self.cache_dir / f"{stem}.json"
+
+    def _changes(self, name: str, manifest: Optional[dict]):
+        if self.force:
+            return "forced"
+        if manifest is None:
+            return "no persisted output"
+
+        components = self.components(name)
+        previous = manifest.get('components', {})
+        changed = [k for k, v in components.items() if previous.get(k) != v]
+        changed += [f"{k} (removed)" for k in previous if k not in components]
+        if changed:
+            return "changed: " + ", ".join(changed)
+        return None
+
+    def resolve(self, name: str):
+        """Output of a stage, loaded from disk if its fingerprint is unchanged or computed otherwise."""
+        if name in self.outputs:
+            return self.outputs[name]
+
+        stage = self.stages[name]
+        output_file, manifest_file = self._paths(name)
+
+        manifest = None
+        if stage.persist and manifest_file.exists() and output_file.exists():
+            with open(manifest_file, 'r', encoding = 'utf-8') as f:
+                manifest = json.load(f)
+
+        reason = self._changes(name, manifest) if stage.persist else "not persisted"
+        if reason is None:
+            with span(f"stage:{name}", status = 'skipped'), open(output_file, 'rb') as f:
+                output = pickle.load(f)
+            self.decisions[name] = ('skipped', "fingerprint unchanged")
+            logger.debug("Stage %s skipped, loaded output from %s", name, output_file)
+        else:
+            logger.info(f"Running stage {name} ({reason})")
+            with span(f"stage:{name}", status = 'ran'):
+                output = stage.func(_StageInputs(self, stage.depends))
+            self.decisions[name] = ('ran', reason)
+
+            if stage.persist:
+                self.cache_dir.mkdir(exist_ok = True, parents = True)
+                with open(output_file, 'wb') as f:
+                    pickle.dump(output, f)
+                with open(manifest_file, 'w', encoding = 'utf-8') as f:
+                    json.dump({'fingerprint': self.fingerprint(name), 'components': self.components(name)}, f, indent = 2)
+
+        self.outputs[name] = output
+        return output
+
+    def run(self, targets: Iterable[str]):
+        """Resolve the target stages and return their outputs."""
+        return {name: self.resolve(name) for name in targets}
+
+    def explain(self):
+        """One line per stage stating whether it ran, was skipped or was not needed, and why."""
+        lines = []
+        for name in self.stages:
+            status, reason = self.decisions.get(name, ('not needed', "no stage using its output ran"))
+            lines.append(f"{name:<30} {status:<11} {reason}")
+        return "\n".join(lines)
@@ -0,0 +1,439 @@
+import pandas as pd
+import numpy as np
+
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Optional
+
+from .core.solar_calculator import SolarCalculator
+from .core.sky_model import SkyModel
+from .transformation import sweep_solar_energy
+from .utils import RasterGrid
+
+logger = logging.getLogger(__name__)
+
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+PANEL_FIELDS = ('slope', 'aspect', 'area', 'efficiency', 'system_loss')
+
+SIZING_DEFAULTS = {'eff_low': 0.15, 'eff_high': 0.20, 'loss_low': 0.75, 'loss_high': 0.9, 'n': 10000}
+
+class RequestError(ValueError):
+    """Invalid request, answered with status 400. Other errors are answered with status 500."""
+
+def _numbers(values, name: str):
+    """Values of a request as a list of floats."""
+    try:
+        return [float(v) for v in values]
+    except (TypeError, ValueError) as e:
+        raise RequestError(f"{name} must be a list of numbers") from e
+
+def _consumption(values, months: int):
+    """Monthly consumption of a request."""
+    consumption = _numbers(values, 'consumption')
+    if len(consumption) != months:
+        raise RequestError(f"consumption must contain {months} monthly values")
+    return consumption
+
+def _sizing(sizing: dict, panels: dict, months: int):
+    """
+    Sizing values of a request merged with the defaults.
+
+    Raises `RequestError` for non-numeric or negative values and for empty ranges, so
+    invalid requests are rejected before they are batched.
+    """
+    values = {**SIZING_DEFAULTS, **sizing}
+    panel = values.get('panel', next(iter(panels)))
+    if panel not in panels:
+        raise RequestError(f"Unknown panel {panel}")
+    checked = {'panel': panel}
+
+    for name in ('eff_low', 'eff_high', 'loss_low', 'loss_high', 'n', 'seed', 'area_optim'):
+        if values.get(name) is None:
+            checked[name] = None
+            continue
+        value, = _numbers([values[name]], name)
+        if not np.isfinite(value) or value < 0:
+            raise RequestError(f"{name} must be a non-negative number")
+        checked[name] = value
+    for low, high in (('eff_low', 'eff_high'), ('loss_low', 'loss_high')):
+        if checked[low] > checked[high]:
+            raise RequestError(f"{low} must not be greater than {high}")
+        if checked[high] > 1:
+            raise RequestError(f"{high} must be a fraction between 0 and 1")
+    for name in ('n', 'seed'):
+        if checked[name] is not None:
+            if not checked[name].is_integer():
+                raise RequestError(f"{name} must be an integer")
+            checked[name] = int(checked[name])
+    if checked['n'] < 1:
+        raise RequestError("n must be at least 1")
+
+    size = 'kWp' if 'kWp' in values else 'area'
+    candidates = _numbers(values.get(size, [5, 10, 15, 20, 25, 30]), size)
+    if not candidates or not all(np.isfinite(c) and c > 0 for c in candidates):
+        raise RequestError(f"{size} must be a non-empty list of positive numbers")
+    checked[size] = candidates
+
+    if values.get('consumption') is not None:
+        checked['consumption'] = _consumption(values['consumption'], months)
+    return checked
+
+class MicroBatcher:
+    """
+    Collect concurrent requests and evaluate them with one call.
+
+    Items submitted within `max_delay` seconds, or until `max_batch` items are waiting,
+    are passed to `func` as one list. `func` runs in a thread and must return one result
+    per item; an exception instance as result is raised for that item only. Batches are
+    evaluated one at a time, so requests arriving during a batch form the next one.
+
+    Parameters
+    ----------
+    func : callable
+        Function evaluating a list of items.
+    max_batch : int, optional
+        Maximum number of items per call. Defaults to 64.
+    max_delay : float, optional
+        Maximum time (s) the first item of a batch waits for more items. Defaults to 0.002.
+    """
+
+    def __init__(self, func: Callable, max_batch: int = 64, max_delay: float = 0.002):
+        self.func = func
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.batches = 0
+        self._timer = None
+        self._lock = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch):
+        async with self._lock:
+            self.batches += 1
+            try:
+                results = await asyncio.to_thread(self.func, [item for item, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+class YieldService:
+    """
+    Long running yield estimation service.
+
+    The atmospheric parameters of the error table, the DEM, the sky models (solar geometry
+    and horizon) of recently requested sites and the report templates are loaded once
+    and kept in memory. Concurrent yield requests are micro-batched, so all panels of all
+    requests at a site are evaluated with one vectorized `SkyModel.monthly_insolation` call,
+    and the sizing sweeps of a batch run together in one worker thread.
+
+    Endpoints, all taking and returning JSON unless noted:
+
+    - GET /health
+    - POST /yield: `location` (x,y in the config crs) and `panels` as in the config file.
+      Both default to the config. Returns the monthly insolation and production per panel.
+    - POST /sizing: as /yield plus the monthly `consumption` and the candidate `area` or
+      `kWp` of the `sizing` config section. Returns the summary and optimal size.
+    - POST /report: as /yield plus the monthly `consumption`. Returns html.
+
+    Parameters
+    ----------
+    config : dict
+        Configuration as in the config file. Uses the optional `service` section.
+    dem : RasterGrid, optional
+        Elevation surface for the horizon. Loaded from the config if None and the horizon
+        is enabled in the `orientation` section.
+    """
+
+    def __init__(self, config: dict, dem: Optional[RasterGrid] = None):
+        self.config = config
+        service_config = config.get('service') or {}
+        self.orientation_config = config.get('orientation') or {}
+        self.max_sites = service_config.get('max_sites', 128)
+        self.albedo = service_config.get('albedo', 0.2)
+
+        self.parameters = SolarCalculator(config).radiation_parameters()
+        if dem is None and self.orientation_config.get('horizon', True):
+            try:
+                dem = RasterGrid.from_file(config['dem'])
+            except ImportError as e:
+                logger.warning(f"DEM not loaded, assuming a flat horizon: {e}")
+        self.dem = dem
+
+        # Sky models are looked up from the worker threads of both batchers
+        self.sky_models = OrderedDict()
+        self._sky_models_lock = threading.Lock()
+        self.batcher = MicroBatcher(
+            self._yield_batch,
+            max_batch = service_config.get('max_batch', 64),
+            max_delay = service_config.get('max_delay', 0.002)
+        )
+        self.sizing_batcher = MicroBatcher(
+            self._sizing_batch,
+            max_batch = service_config.get('max_batch', 64),
+            max_delay = service_config.get('max_delay', 0.002)
+        )
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('POST', '/yield'): self.estimate_yield,
+            ('POST', '/sizing'): self.size_system,
+            ('POST', '/report'): self.render_report,
+        }
+
+        # Warm up the geometry of the configured site and the templates
+        # All sites share the configured period, so requests are checked against its months
+        self.months = len(self.sky_model(tuple(config['location'])).month_starts)
+        if config.get('template_dir') is not None:
+            from .visualization.report import template_environment
+            template_environment(str(config['template_dir'])).get_template('main_template.html')
+
+    def sky_model(self, location: tuple):
+        """Sky model of a site, kept for the `max_sites` most recently requested sites."""
+        key = tuple(np.round(location, 1))
+        with self._sky_models_lock:
+            if key in self.sky_models:
+                self.sky_models.move_to_end(key)
+                return self.sky_models[key]
+
+            sky = SkyModel.from_config(
+                {**self.config, 'location': list(location)},
+                dem = self.dem,
+                cache_dir = self.orientation_config.get('cache_dir')
+            )
+            self.sky_models[key] = sky
+            if len(self.sky_models) > self.max_sites:
+                self.sky_models.popitem(last = False)
+            return sky
+
+    def _yield_batch(self, items: list):
+        """Monthly insolation (kWh/m²) per panel for a list of (location, panels) requests."""
+        transmittivity, diffuse_proportion = self.parameters
+        results = [None] * len(items)
+
+        sites = defaultdict(list)
+        for i, (location, _) in enumerate(items):
+            sites[location].append(i)
+
+        for location, indices in sites.items():
+            try:
+                sky = self.sky_model(location)
+                orientations = np.array([
+                    [attrs.get('slope', 0), attrs.get('aspect', 180)]
+                    for i in indices for attrs in items[i][1].values()
+                ], dtype = float).reshape(-1, 2)
+                insolation = sky.monthly_insolation(
+                    orientations[:, 0],
+                    orientations[:, 1],
+                    transmittivity = transmittivity,
+                    diffuse_proportion = diffuse_proportion,
+                    albedo = self.albedo
+                )
+            except Exception as e:
+                for i in indices:
+                    results[i] = e
+                continue
+
+            start = 0
+            for i in indices:
+                panels = list(items[i][1])
+                results[i] = (sky.month_starts, dict(zip(panels, insolation[start:start + len(panels)])))
+                start += len(panels)
+        return results
+
+    def _site(self, request: dict):
+        if not isinstance(request, dict):
+            raise RequestError("request must be a JSON object")
+        location = tuple(_numbers(request.get('location', self.config['location']), 'location'))
+        if len(location) != 2:
+            raise RequestError("location must contain exactly 2 coordinates [x, y]")
+        panels = request.get('panels', self.config['panels'])
+        if not isinstance(panels, dict) or not panels:
+            raise RequestError("panels must be a non-empty mapping of panel names to attributes")
+        for name, attrs in panels.items():
+            if not isinstance(attrs, dict):
+                raise RequestError(f"attributes of panel {name} must be a mapping")
+            _numbers([attrs[field] for field in PANEL_FIELDS if field in attrs], f"attributes of panel {name}")
+        return location, panels
+
+    async def _insolation(self, request: dict):
+        location, panels = self._site(request)
+        months, insolation = await self.batcher.submit((location, panels))
+        return months, panels, insolation
+
+    async def health(self, request: dict):
+        return {
+            'status': 'ok',
+            'sites': len(self.sky_models),
+            'batches': self.batcher.batches + self.sizing_batcher.batches
+        }
+
+    async def estimate_yield(self, request: dict):
+        months, panels, insolation = await self._insolation(request)
+        production = {
+            name: insolation[name] * attrs.get('area', 1) * attrs.get('efficiency', 0.15) * attrs.get('system_loss', 0.8)
+            for name, attrs in panels.items()
+        }
+        return {
+            'months': months.strftime('%Y-%m-%d').tolist(),
+            'insolation': {name: values.round(2).tolist() for name, values in insolation.items()},
+            'production': {name: values.round(2).tolist() for name, values in production.items()},
+            'total_production': round(float(sum(values.sum() for values in production.values())), 2),
+        }
+
+    def _sizing_batch(self, items: list):
+        """Sizing sweeps for a list of (location, panels, sizing) requests, sharing one insolation batch."""
+        insolations = self._yield_batch([(location, panels) for location, panels, _ in items])
+        results = []
+        for (_, _, sizing), insolation in zip(items, insolations):
+            if isinstance(insolation, Exception):
+                results.append(insolation)
+                continue
+            try:
+                results.append(self._sweep(insolation[1], sizing))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _sweep(self, insolation: dict, sizing: dict):
+        sizing = dict(sizing)
+        summary, _, optimum = sweep_solar_energy(insolation[sizing.pop('panel')], **sizing)
+        return {
+            'size': summary.index.name,
+            'summary': summary.round(2).reset_index().to_dict(orient = 'records'),
+            'optimum': None if optimum is None else float(optimum),
+        }
+
+    async def size_system(self, request: dict):
+        location, panels = self._site(request)
+        sizing = _sizing({**(self.config.get('sizing') or {}), **request}, panels, self.months)
+        return await self.sizing_batcher.submit((location, panels, sizing))
+
+    async def render_report(self, request: dict):
+        from .visualization.report import Report
+
+        location, panels = self._site(request)
+        if 'consumption' not in request:
+            raise RequestError("consumption is required for a report")
+        consumption = _consumption(request['consumption'], self.months)
+
+        months, insolation = await self.batcher.submit((location, panels))
+        srad = pd.DataFrame({
+            'date': np.tile(months, len(panels)),
+            'panel': np.repeat(list(panels), len(months)),
+            'srad': np.concatenate([insolation[name] * attrs.get('area', 1) for name, attrs in panels.items()]),
+        })
+        consumption = pd.DataFrame({'date': months, 'consumption': consumption})
+
+        report = Report(srad, panel_config = panels, consumption = consumption)
+        chart = (self.config.get('report') or {}).get('chart', 'inline')
+        return await asyncio.to_thread(report.render, self.config['template_dir'], chart = chart)
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        """Status code, content type and body of the response to a request."""
+        route = self.routes.get((method, path.split('?')[0]))
+        if route is None:
+            known = [p for _, p in self.routes if p == path.split('?')[0]]
+            status = 405 if known else 404
+            return status, 'application/json', json.dumps({'error': STATUS[status]})
+
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError as e:
+            return 400, 'application/json', json.dumps({'error': f"Invalid JSON: {e}"})
+
+        try:
+            response = await route(request)
+        except RequestError as e:
+            return 400, 'application/json', json.dumps({'error': str(e)})
+        except Exception as e:
+            logger.error(f"Request {method} {path} failed: {e}", exc_info = True)
+            return 500, 'application/json', json.dumps({'error': str(e)})
+
+        if isinstance(response, str):
+            return 200, 'text/html; charset=utf-8', response
+        return 200, 'application/json', json.dumps(response)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the HTTP/1.1 requests of one connection, keeping it alive between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, content_type, payload = await self.dispatch(method, path, body)
+                payload = payload.encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080):
+        """Start listening and return the asyncio server."""
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info(f"Yield service listening on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+        return server
+
+    def serve(self, host: Optional[str] = None, port: Optional[int] = None):
+        """Run the service until interrupted."""
+        service_config = self.config.get('service') or {}
+        host = host or service_config.get('host', '127.0.0.1')
+        port = port or service_config.get('port', 8080)
+
+        async def main():
+            server = await self.start(host, port)
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            logger.info("Yield service stopped")
@@ -1,6 +1,61 @@
 import numpy as np
+import pandas as pd
 
-def convert_solar_energy(srad, efficiency = 0.15, system_loss = 0.8, area = None, kWp = None):
+def pv_performance_factor(
+    irradiance,
+    air_temperature,
+    noct = 45,
+    temp_coefficient = -0.004,
+    low_light_coefficient = 0.02,
+):
+    """
+    Relative efficiency of a PV module compared to Standard Test Conditions (STC).
+
+    The cell temperature is estimated with the NOCT model and the efficiency is
+    reduced linearly with the temperature above 25°C. At low irradiance the efficiency
+    decreases logarithmically with the ratio of the irradiance to 1000 W/m².
+    All inputs are broadcast against each other, so the factor can be evaluated for
+    (time × panel) arrays in a single expression.
+
+    Parameters
+    ----------
+    irradiance : array_like
+        Mean in-plane irradiance (W/m²) during the period.
+    air_temperature : array_like
+        Mean air temperature (°C) during the period.
+    noct : float, optional
+        Nominal operating cell temperature (°C) at 800 W/m² and 20°C air temperature.
+        Defaults to 45.
+    temp_coefficient : float, optional
+        Relative change of the efficiency per °C cell temperature. Crystalline silicon
+        panels typically lose 0.3-0.5% per °C. Defaults to -0.004.
+    low_light_coefficient : float, optional
+        Relative change of the efficiency per unit of log(irradiance / 1000 W/m²).
+        Defaults to 0.02, i.e. about 3% lower efficiency at 200 W/m².
+
+    Returns
+    -------
+    numpy.ndarray
+        Factor applied to the STC efficiency of the panel.
+    """
+    irradiance = np.asarray(irradiance, dtype = float)
+    cell_temperature = air_temperature + irradiance * (noct - 20) / 800
+    return np.clip(
+        (1 + temp_coefficient * (cell_temperature - 25))
+        * (1 + low_light_coefficient * np.log(np.clip(irradiance, 1, None) / 1000)),
+        0, None
+    )
+
+def convert_solar_energy(
+    srad,
+    efficiency = 0.15,
+    system_loss = 0.8,
+    area = None,
+    kWp = None,
+    air_temperature = None,
+    hours = 1,
+    **pv_model
+):
     """
     Convert solar radiation input into electricity output.
 
@@ -18,6 +73,14 @@ def convert_solar_energy(srad, efficiency = 0.15, system_loss = 0.8, area = None
         Area covered by solar panels (m²). Must be provided if `kWp` is not.
     kWp : float, optional
         System size (kWp). Must be provided if `area` is not.
+    air_temperature : float or array_like, optional
+        Mean air temperature (°C) for each time period. If provided, the efficiency is
+        corrected for cell temperature and low irradiance with `pv_performance_factor`.
+    hours : float or array_like, optional
+        Duration (h) over which `srad` is received, used to derive the mean irradiance.
+        Use 1 for hourly data and the daylight hours for daily data. Defaults to 1.
+    **pv_model
+        Further arguments passed to `pv_performance_factor`.
 
     Returns
     -------
@@ -47,18 +110,147 @@ def convert_solar_energy(srad, efficiency = 0.15, system_loss = 0.8, area = None
     if kWp is not None:
         area = kWp / (1 * efficiency)
 
+    if air_temperature is not None:
+        irradiance = np.asarray(srad) * 1000 / hours
+        efficiency = efficiency * pv_performance_factor(irradiance, air_temperature, **pv_model)
+
     return srad * area * efficiency * system_loss
 
-def sample_solar_energy(srad, eff_low, eff_high, loss_low, loss_high, area, n=100000):
+def sample_solar_energy(srad, eff_low, eff_high, loss_low, loss_high, area, n=100000, q=(5, 50, 95), seed=None, **kwargs):
+    """
+    Percentiles of the electricity output for uniformly sampled efficiency and system loss.
+
+    The output is proportional to the product of efficiency and system loss, so the
+    percentiles of the output equal the percentiles of the sampled product scaled by the
+    output of a unit factor. Only the `n` factors are sampled and the conversion, including
+    the optional temperature model, is evaluated once for all requested percentiles.
+
+    Parameters
+    ----------
+    srad : array_like
+        Solar radiation (kWh/m²) for each time period.
+    eff_low, eff_high : float
+        Range of the panel efficiency.
+    loss_low, loss_high : float
+        Range of the system loss factor.
+    area : float
+        Area covered by solar panels (m²).
+    n : int, optional
+        Number of samples. Defaults to 100000.
+    q : sequence of float, optional
+        Percentiles to compute. Defaults to (5, 50, 95).
+    seed : int, optional
+        Seed of the random number generator.
+    **kwargs
+        Further arguments passed to `convert_solar_energy`, e.g. `air_temperature`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (len(q), len(srad)).
+    """
+    rng = np.random.default_rng(seed)
+    factor = rng.uniform(eff_low, eff_high, n) * rng.uniform(loss_low, loss_high, n)
+
+    return convert_solar_energy(
+        np.asarray(srad, dtype = float)[None, :],
+        efficiency = np.percentile(factor, q)[:, None],
+        system_loss = 1,
+        area = area,
+        **kwargs
+    )
+
+def sweep_solar_energy(
+    srad,
+    eff_low,
+    eff_high,
+    loss_low,
+    loss_high,
+    area=None,
+    kWp=None,
+    consumption=None,
+    area_optim=None,
+    n=100000,
+    q=(5, 50, 95),
+    seed=None,
+    **kwargs
+):
+    """
+    Evaluate the electricity output for many candidate system sizes at once.
+
+    The output is proportional to the system size and to the sampled conversion
+    factor, so the percentiles are computed once for a unit system and broadcast over
+    all candidates. Sizing 1,000 candidates costs about the same as sizing one.
+
+    Parameters
+    ----------
+    srad : array_like
+        Solar radiation (kWh/m²) for each time period.
+    eff_low, eff_high : float
+        Range of the panel efficiency.
+    loss_low, loss_high : float
+        Range of the system loss factor.
+    area : array_like, optional
+        Candidate areas (m²). Must be provided if `kWp` is not.
+    kWp : array_like, optional
+        Candidate system sizes (kWp). Must be provided if `area` is not. The efficiency
+        cancels out for a given kWp, so only the system loss is sampled.
+    consumption : array_like, optional
+        Power consumption (kWh) for each time period of `srad`.
+    area_optim : float, optional
+        Size to select as optimum. If None, the candidate whose median output is closest
+        to the total consumption is selected.
+    n : int, optional
+        Number of samples. Defaults to 100000.
+    q : sequence of float, optional
+        Percentiles to compute. Defaults to (5, 50, 95).
+    seed : int, optional
+        Seed of the random number generator.
+    **kwargs
+        Further arguments passed to `convert_solar_energy`, e.g. `air_temperature`.
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        Table indexed by candidate size with the total output for each percentile
+        and, if `consumption` is given, the difference between the total consumption
+        and the median output.
+    bands : numpy.ndarray
+        Array of shape (candidates, len(q), len(srad)) with the output percentiles.
+    optimum : float or None
+        Selected candidate size.
+    """
+    if area is None and kWp is None:
+        raise ValueError("Either area or kWp must be provided")
+    elif area is not None and kWp is not None:
+        raise ValueError("Only one of area or kWp must be provided")
+
+    rng = np.random.default_rng(seed)
+    if kWp is None:
+        sizes = np.atleast_1d(np.asarray(area, dtype = float))
+        factor = rng.uniform(eff_low, eff_high, n) * rng.uniform(loss_low, loss_high, n)
+    else:
+        sizes = np.atleast_1d(np.asarray(kWp, dtype = float))
+        factor = rng.uniform(loss_low, loss_high, n)
+
+    # Output of a unit system, including the optional temperature model
+    unit = convert_solar_energy(np.asarray(srad, dtype = float), efficiency = 1, system_loss = 1, area = 1, **kwargs)
+    bands = sizes[:, None, None] * np.percentile(factor, q)[None, :, None] * unit[None, None, :]
+
+    summary = pd.DataFrame(
+        bands.sum(axis = -1),
+        index = pd.Index(sizes, name = 'area' if kWp is None else 'kWp'),
+        columns = [f"production_p{i:g}" for i in q]
+    )
 
-    results = np.array([[]]*len(srad))
-    for _ in range(n):
-        #_rad = np.clip(np.random.normal(srad, srad*0.1), a_min = 0, a_max = np.inf)
-        _eff = np.random.uniform(eff_low, eff_high)
-        _loss = np.random.uniform(loss_low, loss_high)
-        results = np.append(results, convert_solar_energy(srad.values, _eff, _loss, area).reshape(-1, 1), axis = 1)
+    optimum = area_optim
+    if consumption is not None:
+        median = sizes * np.percentile(factor, 50) * unit.sum()
+        summary['difference'] = np.asarray(consumption, dtype = float).sum() - median
+        if optimum is None:
+            optimum = summary['difference'].abs().idxmin()
 
-    return np.percentile(results, [5, 50, 95], axis = 1)
+    return summary, bands, optimum
 
 def _solar_to_el_2(srad, system_size, performance_ratio=0.8):
     """
@@ -1,37 +1,127 @@
-import arcpy
+import numpy as np
 import pandas as pd
 
 import datetime
 import logging
+from pathlib import Path
+
+from .instrumentation import traced
+from .core.solar_geometry import daylight_hours
 
 logger = logging.getLogger(__name__)
 
+def import_arcpy():
+    """Import arcpy on first use, so modules that do not run ArcGIS tools load without it."""
+    try:
+        import arcpy
+    except ImportError as e:
+        raise ImportError("Error importing arcpy library. Make sure it is available in the current environment.") from e
+    return arcpy
+
 def coords_to_shp(coords, crs, out):
+    """
+    Write x,y coordinates to a new point feature class.
+
+    All points are inserted in one call from a numpy array, with the position of each
+    point in `coords` as Id.
+
+    Parameters
+    ----------
+    coords : array_like
+        Sequence of x,y coordinates.
+    crs : int
+        EPSG code of the coordinates.
+    out : Path
+        Path of the feature class to create.
 
-    out_dir, layer_name = str(out.parent), out.name
-    # Create a feature class with a spatial reference
-    result = arcpy.management.CreateFeatureclass(
-        out_dir, layer_name, "POINT", spatial_reference=arcpy.SpatialReference(crs)
-    )
-    logger.debug(f'Created feature class at {out}')
+    Returns
+    -------
+    Path
+        `out`
+    """
+    coords = np.atleast_2d(np.asarray(coords, dtype = float))
+    points = np.zeros(len(coords), dtype = [('Id', '<i4'), ('x', '<f8'), ('y', '<f8')])
+    points['Id'] = np.arange(len(coords))
+    points['x'], points['y'] = coords[:, 0], coords[:, 1]
 
-    feature_class = result[0]
-    # Write feature to new feature class
-    with arcpy.da.InsertCursor(feature_class, ["SHAPE@"]) as cursor:
-        for c in coords:
-            cursor.insertRow([c])
-            logger.debug(f"Feature {c} added")
+    arcpy = import_arcpy()
+    arcpy.da.NumPyArrayToFeatureClass(points, str(out), ('x', 'y'), arcpy.SpatialReference(crs))
+    logger.debug(f'Created feature class at {out} with {len(coords)} features')
 
     return(out)
 
+def read_point_features(features, id_field = 'st_id', crs = None):
+    """
+    Read the coordinates of a point feature class into a table.
+
+    Parameters
+    ----------
+    features : str or Path
+        Path to the point feature class, e.g. the `optim_coords` shapefile.
+    id_field : str, optional
+        Field with the unique feature identifier. Defaults to 'st_id'.
+    crs : int, optional
+        EPSG code the coordinates are projected to while reading. If None, the
+        coordinates are returned in the crs of the feature class.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table indexed by `id_field` with the columns x and y.
+    """
+    arcpy = import_arcpy()
+    spatial_reference = arcpy.SpatialReference(crs) if crs is not None else None
+    with arcpy.da.SearchCursor(str(features), [id_field, "SHAPE@XY"], spatial_reference = spatial_reference) as cursor:
+        rows = [(str(feature_id), x, y) for feature_id, (x, y) in cursor]
+
+    return pd.DataFrame(rows, columns = [id_field, 'x', 'y']).set_index(id_field)
+
+class RasterGrid:
+    """
+    In-memory copy of a single band raster, e.g. the DEM, for fast point sampling.
+    """
+
+    def __init__(self, values, x_min, y_max, cell_size):
+        self.values = values
+        self.x_min = x_min
+        self.y_max = y_max
+        self.cell_size = cell_size
+
+    @classmethod
+    def from_file(cls, path):
+        arcpy = import_arcpy()
+        raster = arcpy.Raster(str(path))
+        values = arcpy.RasterToNumPyArray(raster).astype(float)
+        if raster.noDataValue is not None:
+            values[values == raster.noDataValue] = np.nan
+        return cls(values, raster.extent.XMin, raster.extent.YMax, raster.meanCellWidth)
+
+    def cell_index(self, coords):
+        coords = np.atleast_2d(np.asarray(coords, dtype = float))
+        rows = np.floor((self.y_max - coords[:, 1]) / self.cell_size).astype(int)
+        cols = np.floor((coords[:, 0] - self.x_min) / self.cell_size).astype(int)
+        return rows, cols
+
+    def sample(self, coords):
+        """Raster values at the x,y coordinates in `coords`. Coordinates outside the raster return NaN."""
+        rows, cols = self.cell_index(coords)
+        n_rows, n_cols = self.values.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+
+        out = np.full(len(rows), np.nan)
+        out[inside] = self.values[rows[inside], cols[inside]]
+        return out
+
 def aggregate_srad(tbl, p_len = 7, ts_start = datetime.datetime(2024, 1, 1), ts_end = datetime.datetime(2024, 12, 31)):
     # TODO: make this more robust and dynamic for different frequencies
     tbl_diss = tbl.set_index('date').resample('D')[tbl.select_dtypes("number").columns].ffill() / p_len
     tbl_diss = tbl_diss.reindex(pd.date_range(ts_start, ts_end)).ffill()
     return(tbl_diss.resample('MS').sum())
 
+@traced('load_observations')
 def load_monthly_radiation(files):
 
+    files = [Path(f) for f in files]
     tbl_rad = pd.concat([pd.read_csv(i) for i in files], keys = [i.stem for i in files], names = ['st_id'])
     tbl_rad['date'] = pd.to_datetime(tbl_rad['date'], format = '%Y-%m-%d')
 
@@ -44,4 +134,78 @@ def load_monthly_radiation(files):
     tbl_rad['date'] = tbl_rad['date'].map(lambda x: pd.to_datetime(f"2024-{x}-01", format = "%Y-%m-%d"))
     tbl_rad.rename(columns = {'insol': "global_ave"}, inplace = True)
     tbl_rad = tbl_rad.set_index(['st_id', 'date']).squeeze()
-    return tbl_rad
\ No newline at end of file
+    return tbl_rad
+
+def time_step(dates):
+    """Median length of the time steps starting at `dates`, one day for a single date."""
+    dates = pd.DatetimeIndex(dates).sort_values()
+    if len(dates) < 2:
+        return pd.Timedelta(days = 1)
+    return pd.Series(dates).diff().median()
+
+def interval_hours(dates, latitude):
+    """
+    Hours during which the radiation of each time step is received.
+
+    Steps of one day or longer, e.g. the DAY and WEEK intervals of FeatureSolarRadiation,
+    sum the daylight hours of their days. Shorter steps last their full length.
+
+    Parameters
+    ----------
+    dates : array_like
+        Start of each time step.
+    latitude : float
+        Latitude of the site in degrees.
+
+    Returns
+    -------
+    pandas.Series
+        Hours indexed by the sorted `dates`.
+    """
+    dates = pd.DatetimeIndex(dates).unique().sort_values()
+    step = time_step(dates)
+    if step < pd.Timedelta(days = 1):
+        return pd.Series(step / pd.Timedelta(hours = 1), index = dates)
+
+    days = pd.date_range(dates[0].normalize(), (dates[-1] + step).normalize() - pd.Timedelta(days = 1), freq = 'D')
+    step_of_day = np.searchsorted(dates.to_numpy(), days.to_numpy(), side = 'right') - 1
+    hours = np.bincount(step_of_day, weights = daylight_hours(latitude, days.dayofyear.to_numpy()), minlength = len(dates))
+    return pd.Series(hours, index = dates)
+
+def interval_mean(series, dates):
+    """
+    Mean of a time series, e.g. hourly air temperature, over the time steps starting at `dates`.
+
+    Values before the first step are ignored. Steps without values are filled from the
+    nearest step.
+    """
+    dates = pd.DatetimeIndex(dates).unique().sort_values()
+    series = series.sort_index()
+    step_of_value = np.searchsorted(dates.to_numpy(), series.index.to_numpy(), side = 'right') - 1
+    valid = step_of_value >= 0
+    means = series[valid].groupby(step_of_value[valid]).mean()
+    means.index = dates[means.index]
+    return means.reindex(dates, method = 'nearest')
+
+def load_daily_radiation(file, dates):
+    """
+    Daily insolation of a station file averaged over all years onto `dates`.
+
+    Parameters
+    ----------
+    file : str or Path
+        Station csv file with the columns date and insol.
+    dates : pandas.DatetimeIndex
+        Days onto which the mean insolation of each day of year is mapped.
+
+    Returns
+    -------
+    pandas.Series
+        Insolation indexed by `dates`.
+    """
+    tbl_rad = pd.read_csv(file)
+    tbl_rad['date'] = pd.to_datetime(tbl_rad['date'], format = '%Y-%m-%d')
+    tbl_rad = tbl_rad.set_index('date')['insol'].interpolate(method = 'time', limit = 3)
+
+    climatology = tbl_rad.groupby(tbl_rad.index.dayofyear).mean()
+    return pd.Series(climatology.reindex(dates.dayofyear).to_numpy(), index = dates, name = 'global_ave')
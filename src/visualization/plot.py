@@ -2,12 +2,34 @@ import matplotlib.pyplot as plt
 from io import BytesIO
 import base64
 
-def encode_plot(fig):
+def encode_plot(fig, format = 'png', dpi = 300, close = True):
+    """
+    Encode a figure for embedding in HTML.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to encode.
+    format : str, optional
+        'png' for a base64 encoded image or 'svg' for inline svg markup. Defaults to 'png'.
+    dpi : int, optional
+        Resolution of png images. Defaults to 300.
+    close : bool, optional
+        Close the figure after encoding to release its memory. Defaults to True.
+    """
     img = BytesIO()
 
-    fig.savefig(img, format='png', dpi = 300)
-    #fig.close()
-    img.seek(0)
+    if format == 'svg':
+        with plt.rc_context({'svg.fonttype': 'none'}):
+            fig.savefig(img, format='svg')
+    else:
+        fig.savefig(img, format='png', dpi = dpi)
+    if close:
+        plt.close(fig)
+
+    if format == 'svg':
+        markup = img.getvalue().decode('utf8')
+        return markup[markup.index('<svg'):]
     return(base64.b64encode(img.getvalue()).decode('utf8'))
 
 def optim_lines(optim_tbl, observed_tbl, st_id, t_opt, d_opt):
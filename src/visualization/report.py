@@ -1,17 +1,39 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 # import pandera.pandas as pa
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 import logging
 from datetime import datetime
-from typing import Optional
+from functools import cached_property, lru_cache
+from typing import Optional, Union
 from pathlib import Path
 
-from .plot import encode_plot
+from ..transformation import pv_performance_factor
+from ..core.storage import simulate_storage
+from ..core.economics import evaluate_economics
+from ..instrumentation import span, traced
+from ..utils import time_step
 
 logger = logging.getLogger(__name__)
 
+CHART_MODES = ('inline', 'svg', 'png')
+
+@lru_cache(maxsize = None)
+def template_environment(template_dir: str, bytecode_cache: Optional[str] = None):
+    """
+    Jinja2 environment of a template directory, created once per process.
+
+    Compiled templates are kept by the environment, so each template is parsed once.
+    If `bytecode_cache` is given, the compiled templates are also stored there and
+    reused by other processes and later runs.
+    """
+    cache = None
+    if bytecode_cache is not None:
+        Path(bytecode_cache).mkdir(exist_ok = True, parents = True)
+        cache = FileSystemBytecodeCache(str(bytecode_cache))
+    return Environment(loader = FileSystemLoader(str(template_dir)), bytecode_cache = cache)
+
 ## Dataframe validation
 # class ConsumptionSchema(pa.DataFrameModel):
 #     date: datetime = pa.Field()
@@ -25,38 +47,55 @@ logger = logging.getLogger(__name__)
 
 class Report:
 
+    @traced('report.init')
     def __init__(
         self,
-        srad: pd.Series,
+        srad: pd.DataFrame,
         panel_config: dict,
-        consumption: Optional[pd.Series] = None
+        consumption: Optional[pd.DataFrame] = None,
+        air_temperature: Optional[pd.Series] = None,
+        hours: Union[float, pd.Series] = 1,
+        pv_model: Optional[dict] = None,
+        storage: Optional[dict] = None,
+        economics: Optional[dict] = None,
+        climatology: Optional[pd.DataFrame] = None
     ):
         # IncomingRadiationSchema.validate(srad)
+        # date x panel matrix at the resolution of the radiation table
         self.srad = (
             srad
-            .set_index('date')
-            .groupby('panel')
-            .resample('MS')['srad']
+            .groupby(['date', 'panel'])['srad']
             .sum()
-            .reset_index(level = 0)
+            .unstack('panel', fill_value = 0)
         )
         if consumption is not None:
             # ConsumptionSchema.validate(consumption)
             consumption = consumption.set_index('date')
 
         self.consumption = consumption
-        
-        production_tbls = []
-        for panel_name, panel_data in self.srad.groupby('panel'):
-            panel_data['production'] = self.solar_energy_to_electric_energy(
-                panel_data['srad'],
-                efficiency=panel_config[panel_name]['efficiency'],
-                system_loss=panel_config[panel_name]['system_loss']
+        self.panel_config = panel_config
+        self.storage_config = storage
+        self.economics_config = economics
+        self.climatology = climatology
+
+        panels = self.srad.columns
+        efficiency = np.array([panel_config[panel]['efficiency'] for panel in panels])
+        if air_temperature is not None:
+            # Temperature and low irradiance correction evaluated on the full date x panel matrix
+            if isinstance(hours, pd.Series):
+                hours = hours.reindex(self.srad.index, method = 'nearest').to_numpy()[:, None]
+            area = np.array([panel_config[panel]['area'] for panel in panels])
+            irradiance = self.srad.to_numpy() / np.where(area > 0, area, np.nan) * 1000 / hours
+            temperature = air_temperature.reindex(self.srad.index, method = 'nearest').to_numpy()[:, None]
+            efficiency = efficiency * np.nan_to_num(
+                pv_performance_factor(irradiance, temperature, **(pv_model or {})), nan = 1
             )
-            production_tbls.append(panel_data[['panel', 'production']])
-        self.production = pd.concat(production_tbls)
 
-        self.panel_config = panel_config
+        self.production = self.solar_energy_to_electric_energy(
+            self.srad,
+            efficiency=efficiency,
+            system_loss=np.array([panel_config[panel]['system_loss'] for panel in panels])
+        )
 
     def solar_energy_to_electric_energy(
         self, srad, efficiency=0.15, system_loss=0.8
@@ -101,40 +140,181 @@ class Report:
 
         return srad * efficiency * system_loss
 
-    @property
+    @cached_property
+    def monthly_radiation(self):
+        with span('report.resample', table = 'radiation'):
+            return self.srad.resample('MS').sum()
+
+    @cached_property
+    def monthly_production(self):
+        with span('report.resample', table = 'production'):
+            return self.production.resample('MS').sum()
+
+    @cached_property
+    def monthly_consumption(self):
+        with span('report.resample', table = 'consumption'):
+            return self.consumption['consumption'].resample('MS').sum()
+
+    @cached_property
     def total_radiation(self):
-        return self.srad['srad'].sum()
+        return self.srad.to_numpy().sum()
 
-    @property
+    @cached_property
     def total_consumption(self):
         return self.consumption['consumption'].sum()
 
-    @property
+    @cached_property
     def total_production(self):
-        return self.production['production'].sum()
+        return self.production.to_numpy().sum()
 
-    @property
+    @cached_property
     def panel_production(self):
         return (
-            self.production
-            .pivot_table(
-                index=self.production.index.month,
-                columns='panel',
-                values='production',
-                fill_value=0
-            )
+            self.monthly_production
+            .groupby(self.monthly_production.index.month)
+            .mean()
             .round()
             )
 
     @property
-    def energy_efficiency(self, freq = 'M'):
+    def energy_efficiency(self):
         return self.total_production / self.total_radiation
 
-    @property
-    def energy_balance(self, freq = 'M'):
+    @cached_property
+    def energy_balance(self):
         return self.total_production - self.total_consumption
 
-    def plot(self, encode: bool = False):
+    @cached_property
+    def monthly_balance(self):
+        production = self.monthly_production.sum(axis = 1)
+        return production.sub(self.monthly_consumption, fill_value = 0)
+
+    @cached_property
+    def time_step(self):
+        """Length of one time step of the production in hours."""
+        # Module-level helper, not this property
+        return time_step(self.production.index) / pd.Timedelta(hours = 1)
+
+    @cached_property
+    def consumption_profile(self):
+        """
+        Consumption at the resolution of the production. A finer consumption, e.g. hourly
+        against daily production, is summed per time step of the production. If the
+        consumption is coarser, its monthly totals are spread evenly over the time steps
+        of each month.
+        """
+        index = self.production.index
+        consumption = self.consumption['consumption']
+        step = pd.Timedelta(hours = self.time_step)
+        consumption_step = time_step(consumption.index)
+
+        if consumption_step < step:
+            # Time step of the production each consumption value falls into
+            position = index.searchsorted(consumption.index, side = 'right') - 1
+            inside = (position >= 0) & (consumption.index < index[-1] + step)
+            return pd.Series(
+                np.bincount(position[inside], weights = consumption.to_numpy()[inside], minlength = len(index)),
+                index = index
+            )
+
+        if consumption_step == step and index.isin(consumption.index).all():
+            return consumption.reindex(index)
+
+        months = index.to_period('M')
+        monthly = self.monthly_consumption.groupby(self.monthly_consumption.index.to_period('M')).sum()
+        steps = pd.Series(1, index = index).groupby(months).transform('sum')
+        return pd.Series(
+            monthly.reindex(months, fill_value = 0).to_numpy() / steps.to_numpy(),
+            index = index
+        )
+
+    def simulate_storage(self, capacities, **kwargs):
+        """
+        Simulate battery storage for the total production of all panels.
+
+        Parameters
+        ----------
+        capacities : array_like
+            Usable battery capacities (kWh).
+        **kwargs
+            Further arguments passed to `simulate_storage`.
+        """
+        return simulate_storage(
+            self.production.sum(axis = 1),
+            self.consumption_profile,
+            capacities,
+            hours = kwargs.pop('hours', self.time_step),
+            **kwargs
+        )
+
+    @cached_property
+    def storage(self):
+        if self.storage_config is None or self.consumption is None:
+            return None
+        storage_config = dict(self.storage_config)
+        return self.simulate_storage(storage_config.pop('capacities', [0]), **storage_config)
+
+    @cached_property
+    def self_consumption(self):
+        """Production consumed directly on site without storage (kWh)."""
+        return np.minimum(self.production.sum(axis = 1), self.consumption_profile).sum()
+
+    @cached_property
+    def economics(self):
+        if self.economics_config is None or self.consumption is None:
+            return None
+
+        economics_config = dict(self.economics_config)
+        capacity = economics_config.pop('capacity', None)
+        if capacity is not None:
+            storage_config = {k: v for k, v in (self.storage_config or {}).items() if k != 'capacities'}
+            self_consumption = self.simulate_storage([capacity], **storage_config)['self_consumption'].iloc[0]
+        else:
+            self_consumption = self.self_consumption
+
+        return evaluate_economics(
+            self.total_production,
+            self_consumption,
+            consumption = self.total_consumption,
+            **economics_config
+        )
+
+    @cached_property
+    def economics_summary(self):
+        if self.economics is None:
+            return None
+        return (
+            self.economics[['avoided_costs', 'feed_in_revenue', 'npv', 'payback']]
+            .quantile([0, 0.05, 0.5, 0.95, 1])
+            .rename(index = lambda q: f"{q:.0%}")
+        )
+
+    def chart_data(self):
+        """
+        Monthly production per panel, consumption and inter-annual range as plain lists
+        for the inline chart of the report.
+        """
+        def values(series):
+            return [None if np.isnan(v) else round(float(v), 1) for v in series]
+
+        production = self.monthly_production
+        data = {
+            'labels': production.index.strftime('%Y-%m').tolist(),
+            'series': [{'name': str(panel), 'values': values(production[panel])} for panel in production.columns],
+            'consumption': None,
+            'band': None,
+        }
+        if self.consumption is not None:
+            data['consumption'] = values(self.monthly_consumption.reindex(production.index))
+        if self.climatology is not None:
+            band = self.climatology.reindex(production.index.month)
+            low, high = band.columns[band.columns.str.startswith('p')][[0, -1]]
+            data['band'] = {'label': f'Inter-annual range ({low}-{high})', 'low': values(band[low]), 'high': values(band[high])}
+        return data
+
+    def plot(self, encode: bool = False, format: str = 'png', dpi: int = 300):
+        import matplotlib.pyplot as plt
+        from .plot import encode_plot
 
         fig, ax = plt.subplots(figsize = (12, 7))
 
@@ -142,20 +322,13 @@ class Report:
         panel_colors = plt.cm.tab10
         
         # Prepare data for stacked area plot
-        panel_names = self.production['panel'].unique()
-        
-        # Create a pivot table to get production values for each panel by date
-        production_pivot = self.production.pivot_table(
-            index=self.production.index, 
-            columns='panel', 
-            values='production', 
-            fill_value=0
-        )
-        
+        production = self.monthly_production
+        panel_names = production.columns
+
         # Create stacked area plot
         ax.stackplot(
-            production_pivot.index,
-            *[production_pivot[panel] for panel in panel_names],
+            production.index,
+            production.to_numpy().T,
             labels=panel_names,
             colors=[panel_colors(i) for i in range(len(panel_names))],
             alpha=0.8
@@ -164,8 +337,8 @@ class Report:
         # Plot consumption line with a distinct color (red)
         if self.consumption is not None:
             ax.plot(
-                self.consumption.index,
-                self.consumption['consumption'],
+                self.monthly_consumption.index,
+                self.monthly_consumption,
                 color='red',
                 marker='s',
                 linewidth=3,
@@ -173,6 +346,19 @@ class Report:
                 label='Consumption'
             )
 
+        # Inter-annual spread of the total production
+        if self.climatology is not None:
+            band = self.climatology.reindex(production.index.month)
+            low, high = band.columns[band.columns.str.startswith('p')][[0, -1]]
+            ax.fill_between(
+                production.index,
+                band[low],
+                band[high],
+                color='grey',
+                alpha=0.3,
+                label=f'Inter-annual range ({low}-{high})'
+            )
+
         ax.legend()
         ax.set_ylim(0, 750)
         ax.set_xlabel('Date')
@@ -180,33 +366,72 @@ class Report:
         ax.grid(True, alpha=0.3)
 
         if encode:
-            return encode_plot(fig)
+            with span('encode_plot', format = format, dpi = dpi):
+                return encode_plot(fig, format = format, dpi = dpi)
         return fig, ax
 
-    def generate_report(self, template_dir: str, report_dir: str):
-        
-        report_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-        data = {
+    def context(self, chart: str = 'inline', dpi: int = 100):
+        """
+        Data of the report template.
+
+        Parameters
+        ----------
+        chart : str, optional
+            How the monthly chart is embedded: 'inline' for the data and a small chart
+            script, 'svg' for vector graphics or 'png' for an image. Defaults to 'inline'.
+        dpi : int, optional
+            Resolution of png charts. Defaults to 100.
+        """
+        if chart not in CHART_MODES:
+            raise ValueError(f"Unknown chart mode {chart}. Use inline, svg or png.")
+
+        return {
             'report_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
 
             'panels': self.panel_config,
 
-            'monthly_plot': self.plot(encode = True),
+            'chart_mode': chart,
+            'chart_data': self.chart_data() if chart == 'inline' else None,
+            'monthly_plot': None if chart == 'inline' else self.plot(encode = True, format = chart, dpi = dpi),
             'panel_energy_totals': self.panel_production,
             "energy_metrics": {
                 'Total Energy Produced': (self.total_production, 'kWh'),
                 'Total Energy Consumed': (self.total_consumption, 'kWh'),
                 'Total Radiation': (self.total_radiation, 'kWh'),
                 'Energy Balance': (self.energy_balance, 'kWh'),
-            }
+            },
+            'storage': self.storage,
+            'climatology': self.climatology,
+            'economics': self.economics_summary,
+            'economics_scenarios': 0 if self.economics is None else len(self.economics),
         }
 
-        # Configure Jinja2 environment
-        env = Environment(loader=FileSystemLoader(template_dir))
-        template = env.get_template('main_template.html')
+    def render(self, template_dir: str, chart: str = 'inline', dpi: int = 100, bytecode_cache: Optional[str] = None):
+        """Report as html, see `context` for the parameters."""
+        with span('report.render', chart = chart):
+            template = template_environment(str(template_dir), bytecode_cache).get_template('main_template.html')
+            return template.render(self.context(chart = chart, dpi = dpi))
 
-        # Render the template with the data
-        output = template.render(data)
+    def generate_report(self, template_dir: str, report_dir: str, chart: str = 'inline', dpi: int = 100):
+        """
+        Render the report to an html file in `report_dir`.
+
+        Parameters
+        ----------
+        template_dir : str
+            Directory of the report templates.
+        report_dir : str
+            Output directory.
+        chart, dpi
+            Chart mode and png resolution, see `context`.
+
+        Returns
+        -------
+        Path
+            Path of the report.
+        """
+        report_time = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = self.render(template_dir, chart = chart, dpi = dpi)
 
         # Save the output to an HTML file
         out_report = Path(report_dir, f'report_{report_time}.html')
@@ -215,3 +440,4 @@ class Report:
             f.write(output)
 
         logger.info('Report sucessfully generated!')
+        return out_report
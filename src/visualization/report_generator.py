@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from .report import Report, template_environment
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS = None
+
+def _init_worker(template_dir, bytecode_cache, chart, dpi):
+    global _SETTINGS
+    _SETTINGS = (template_dir, bytecode_cache, chart, dpi)
+    # Compile the templates once per worker
+    template_environment(template_dir, bytecode_cache).get_template('main_template.html')
+
+def _render(report: Report, template_dir, bytecode_cache, chart, dpi):
+    """Html and portfolio summary of one report."""
+    html = report.render(template_dir, chart = chart, dpi = dpi, bytecode_cache = bytecode_cache)
+    summary = {
+        'production': report.total_production,
+        'consumption': None if report.consumption is None else report.total_consumption,
+        'balance': None if report.consumption is None else report.energy_balance,
+    }
+    return html, summary
+
+def _render_worker(report: Report):
+    return _render(report, *_SETTINGS)
+
+def _write(path: Path, content: str):
+    path.write_text(content, encoding = 'utf-8')
+
+def site_filename(name: str):
+    """File name of the report of a site."""
+    return re.sub(r'[^\w.-]', '_', str(name)) + '.html'
+
+class ReportGenerator:
+    """
+    Render many reports with shared templates and write them with a portfolio index.
+
+    The templates are compiled once per process and cached as bytecode in
+    `bytecode_cache`, so worker processes and later runs skip parsing them. Reports are
+    rendered in `workers` processes and written by an asyncio writer that holds at most
+    `max_pending` rendered reports in memory. Reports can be passed as an iterator, so
+    each one is rendered as soon as it is computed and released afterwards.
+
+    Parameters
+    ----------
+    template_dir : str or Path
+        Directory of the report templates.
+    out_dir : str or Path
+        Output directory of the reports and the index page.
+    chart : str, optional
+        Chart mode, see `Report.context`. Defaults to 'inline'.
+    dpi : int, optional
+        Resolution of png charts. Defaults to 100.
+    workers : int, optional
+        Number of worker processes. Reports are rendered in this process if 1. Defaults to 1.
+    bytecode_cache : str or Path, optional
+        Directory of the compiled templates. Defaults to no bytecode cache.
+    max_pending : int, optional
+        Maximum number of rendered reports waiting to be written. Defaults to 16.
+    """
+
+    def __init__(
+        self,
+        template_dir: Union[str, Path],
+        out_dir: Union[str, Path],
+        chart: str = 'inline',
+        dpi: int = 100,
+        workers: int = 1,
+        bytecode_cache: Optional[Union[str, Path]] = None,
+        max_pending: int = 16
+    ):
+        self.template_dir = str(template_dir)
+        self.out_dir = Path(out_dir)
+        self.chart = chart
+        self.dpi = dpi
+        self.workers = workers
+        self.bytecode_cache = None if bytecode_cache is None else str(bytecode_cache)
+        self.max_pending = max_pending
+
+    @property
+    def settings(self):
+        return self.template_dir, self.bytecode_cache, self.chart, self.dpi
+
+    def generate(self, reports: Union[dict, Iterable[tuple]]):
+        """
+        Render and write the reports and the portfolio index.
+
+        Parameters
+        ----------
+        reports : dict or iterable of tuple
+            Report objects by site name, or (site name, report) pairs, e.g. from a
+            generator that computes the reports one by one. Site names must give unique
+            file names, see `site_filename`.
+
+        Returns
+        -------
+        Path
+            Path of the index page.
+        """
+        self.out_dir.mkdir(exist_ok = True, parents = True)
+        names = []
+        summaries = asyncio.run(self._generate(reports.items() if isinstance(reports, dict) else reports, names))
+
+        sites = [
+            {'name': name, 'file': site_filename(name), **summaries[name]}
+            for name in names if name in summaries
+        ]
+        template = template_environment(self.template_dir, self.bytecode_cache).get_template('portfolio.html')
+        index = self.out_dir / 'index.html'
+        _write(index, template.render(
+            report_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            sites = sites,
+            total_production = sum(site['production'] for site in sites)
+        ))
+        logger.info(f'Portfolio of {len(sites)} reports generated at {index}')
+        return index
+
+    async def _generate(self, reports: Iterable[tuple], names: list):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize = self.max_pending)
+        summaries = {}
+        files = set()
+
+        def add(name):
+            file = site_filename(name)
+            if file in files:
+                raise ValueError(f"Report of {name} would overwrite {file}. Use unique site names.")
+            files.add(file)
+            names.append(name)
+
+        async def writer():
+            while (item := await queue.get()) is not None:
+                name, html = item
+                await asyncio.to_thread(_write, self.out_dir / site_filename(name), html)
+                logger.debug('Report of %s written', name)
+
+        writer_task = asyncio.create_task(writer())
+
+        async def put(item):
+            # Waits for the writer as well, so a failed writer raises instead of blocking the full queue
+            put_task = asyncio.ensure_future(queue.put(item))
+            await asyncio.wait([put_task, writer_task], return_when = asyncio.FIRST_COMPLETED)
+            if not put_task.done():
+                put_task.cancel()
+            if writer_task.done():
+                writer_task.result()
+
+        try:
+            if self.workers > 1:
+                with ProcessPoolExecutor(self.workers, initializer = _init_worker, initargs = self.settings) as executor:
+                    # Submit at most `max_pending` reports ahead of the writer
+                    pending = set()
+                    futures = {}
+                    for name, report in reports:
+                        add(name)
+                        future = loop.run_in_executor(executor, _render_worker, report)
+                        futures[future] = name
+                        pending.add(future)
+                        del report
+                        if len(pending) >= self.max_pending:
+                            done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                            await self._collect(done, futures, put, summaries)
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                        await self._collect(done, futures, put, summaries)
+            else:
+                for name, report in reports:
+                    add(name)
+                    html, summaries[name] = _render(report, *self.settings)
+                    # Release the report before the next one is computed
+                    del report
+                    await put((name, html))
+        finally:
+            if writer_task.done():
+                writer_task.result()
+            else:
+                await put(None)
+                await writer_task
+        return summaries
+
+    @staticmethod
+    async def _collect(done, names, put, summaries):
+        for future in done:
+            name = names.pop(future)
+            html, summaries[name] = future.result()
+            await put((name, html))
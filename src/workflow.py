@@ -1,13 +1,24 @@
 import pandas as pd
+import numpy as np
 import yaml
 
 import datetime
 from pathlib import Path
+from typing import Optional
 import logging
 import logging.config
 
 from .core.solar_calculator import SolarCalculator
-from .visualization.report import Report
+from .core.solar_geometry import to_latitude
+from .core.sky_model import SkyModel
+from .core.orientation import optimize_orientation
+from .core.load_profile import LoadProfileExpander
+from .core.transposition import TranspositionEngine
+from .core.climatology import MonthlyClimatology, iter_yearly_radiation
+from .utils import RasterGrid, interval_hours, interval_mean, load_daily_radiation, load_monthly_radiation
+from .transformation import sweep_solar_energy
+from .pipeline import Pipeline, Stage, config_value
+from .instrumentation import recorder, span
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +27,22 @@ class Workflow:
     def __init__(self):
         self.workflow_time = datetime.datetime.now()
         self.config = None
+        self.interpolator = None
+        self.sky_model = None
+        self.dem = None
 
-    def load_config(self, config):
+    def load_config(self, path):
         ##TODO: implement validation of config file
         try:
-            with open("config.yaml", 'r') as f:
+            with open(path, 'r') as f:
                 config = yaml.safe_load(f)
         except Exception as e:
             raise ValueError(f'Error loading config file: {e}')
+        if isinstance(config, dict):
+            # Point features are reused across runs, so a relative store is kept next to the
+            # config file instead of the working directory
+            store = Path(config.get('feature_store', 'data/features'))
+            config['feature_store'] = str(store if store.is_absolute() else Path(path).parent / store)
         self.config = config
 
     def start_logging(self):
@@ -39,34 +58,575 @@ class Workflow:
 
         logger.info('Appliction started and logging initialized!')
 
-    def run(self):
+    def run(self, explain: bool = False, force: bool = False, targets: Optional[list] = None):
+        """
+        Run the workflow as a pipeline of stages and render the report.
 
+        Stage outputs are persisted in the `cache_dir` of the config file (defaults to
+        data/cache). A stage only runs again if its config sections, input files or the
+        stages it depends on changed since the last run.
+
+        Parameters
+        ----------
+        explain : bool, optional
+            Log for every stage whether it ran or was skipped, and why. Defaults to False.
+        force : bool, optional
+            Run all stages regardless of their persisted outputs. Defaults to False.
+        targets : list, optional
+            Names of the stages to resolve, together with the stages they depend on.
+            Defaults to the report and the configured analyses.
+
+        Returns
+        -------
+        Pipeline
+            The resolved pipeline with the stage outputs and decisions.
+        """
         if self.config is None:
             raise ValueError("Load a config file first before running a workflow.")
 
         ##TODO: include province_shp into optimizer to optimize against correct points
         ##TODO: get monthly optimized values and not singe value for whole year
 
-        logger.info("Starting to calculate radiation...")
+        run_recorder = recorder()
+        first_span = 0 if run_recorder is None else len(run_recorder.records)
+
+        pipeline = self.build_pipeline(force = force)
+        if targets is None:
+            targets = [name for name in ('prescreen', 'sizing', 'orientation') if name in pipeline.stages] + ['report']
+        with span('workflow.run', targets = targets):
+            outputs = pipeline.run(targets)
+
+        if 'calibration' in outputs:
+            transmittivity, diffuse_proportion = outputs['calibration']
+            logger.info(f"Calibrated transmittivity={transmittivity:.2f} and diffuse_proportion={diffuse_proportion:.2f}")
+
+        if 'prescreen' in outputs:
+            for panel_name, panel_srad in outputs['prescreen'].groupby('panel')['srad']:
+                logger.info(f'Pre-screen estimate from station network for {panel_name}: {panel_srad.sum():.1f} kWh')
+
+        if outputs.get('sizing') is not None:
+            summary, _, area_optim = outputs['sizing']
+            unit = 'kWp' if summary.index.name == 'kWp' else 'm²'
+            logger.info(f"Optimal system size among candidates of {summary.index.min():g}-{summary.index.max():g} {unit}: {area_optim:g} {unit}")
+
+        if 'orientation' in outputs:
+            optimum, _ = outputs['orientation']
+            logger.info(f"Optimal panel orientation with slope={optimum['slope']:.0f} and aspect={optimum['aspect']:.0f}: {optimum['insolation']:.1f} kWh/m²")
+
+        if explain:
+            logger.info(f"Pipeline stages:\n{pipeline.explain()}")
+        if run_recorder is not None:
+            # The command line logs the summary of all runs, e.g. of a batch
+            logger.debug("Time and memory per span of the run:\n%s", run_recorder.format_summary(first_span))
+        return pipeline
+
+    def build_pipeline(self, force: bool = False):
+        """
+        Stages of the workflow with the config sections and files they depend on.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Run all stages regardless of their persisted outputs. Defaults to False.
+
+        Returns
+        -------
+        Pipeline
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        config = self.config
+        site = ['location', 'crs', 'dem']
+        period = ['FeatureSolarRadiation']
+        optim_dir = config['optimization'].get('optim_dir')
+        transposition = (config.get('transposition') or {}).get('enabled', False)
+
+        def observation_files():
+            return sorted(str(f) for f in Path(optim_dir).glob('*.csv')) if optim_dir else []
+
+        def optional_file(*keys):
+            path = config_value(config, '.'.join(keys))
+            return [path] if path is not None else []
+
+        def transposition_files():
+            source = config_value(config, 'transposition.source') or 'interpolation'
+            if source == 'interpolation':
+                return [config['dem']] + optional_file('optimization', 'optim_coords') + observation_files()
+            return [config['dem'], source]
+
+        # Measured insolation replaces the calibrated terrain model, the other analyses
+        # then use the parameters of the config file
+        calibration = [] if transposition else ['calibration']
+
+        pipeline = Pipeline(config, cache_dir = config.get('cache_dir', 'data/cache'), force = force)
+        pipeline.add(Stage(
+            'observations',
+            lambda inputs: load_monthly_radiation(observation_files()),
+            config = ['optimization.optim_dir'],
+            files = observation_files
+        ))
+        pipeline.add(Stage(
+            'calibration',
+            self._calibrate,
+            config = site + period + ['optimization.optim_coords'],
+            files = lambda: optional_file('optimization', 'optim_file'),
+            depends = ['observations']
+        ))
+
+        panel_stages = []
+        for panel_name in config['panels']:
+            name = f'radiation:{panel_name}'
+            if transposition:
+                stage = Stage(
+                    name,
+                    lambda inputs, panel_name = panel_name: self.transpose_measured(panels = [panel_name]),
+                    config = site + period + [
+                        'transposition', 'interpolation', 'optimization.optim_dir', 'optimization.optim_coords',
+                        f'panels.{panel_name}'
+                    ],
+                    files = transposition_files
+                )
+            else:
+                stage = Stage(
+                    name,
+                    lambda inputs, panel_name = panel_name: SolarCalculator(config).calculate_radiation(
+                        dem = config['dem'], panels = [panel_name], parameters = inputs['calibration']
+                    ),
+                    config = site + period + [f'panels.{panel_name}'],
+                    files = [config['dem']],
+                    depends = ['calibration']
+                )
+            pipeline.add(stage)
+            panel_stages.append(name)
+
+        pipeline.add(Stage(
+            'consumption',
+            lambda inputs: self.load_consumption(),
+            config = ['consumption'] + period,
+            files = lambda: optional_file('consumption', 'consumption_tbl')
+        ))
+
+        if (config.get('interpolation') or {}).get('prescreen', False):
+            pipeline.add(Stage(
+                'prescreen',
+                lambda inputs: self.prescreen(parameters = inputs.get('calibration')),
+                config = site + ['interpolation', 'optimization', 'panels'],
+                files = observation_files,
+                depends = calibration
+            ))
+
+        if config.get('sizing') is not None:
+            pipeline.add(Stage(
+                'sizing',
+                lambda inputs: (
+                    self.size_system(pd.concat([inputs[name] for name in panel_stages]), inputs['consumption'][0])
+                    if inputs['consumption'][0] is not None else None
+                ),
+                config = ['sizing', 'area_optim'],
+                depends = panel_stages + ['consumption']
+            ))
+
+        if config.get('orientation') is not None:
+            pipeline.add(Stage(
+                'orientation',
+                lambda inputs: self.optimize_orientation(inputs['consumption'][0], parameters = inputs.get('calibration')),
+                config = site + period + ['orientation', 'panels'],
+                files = [config['dem']],
+                depends = calibration + ['consumption']
+            ))
+
+        climatology = []
+        if config.get('climatology') is not None:
+            pipeline.add(Stage(
+                'climatology',
+                lambda inputs: self.climatology(parameters = inputs.get('calibration')).summary(),
+                config = site + period + ['climatology', 'panels'],
+                files = lambda: optional_file('climatology', 'source'),
+                depends = calibration
+            ))
+            climatology.append('climatology')
+
+        pipeline.add(Stage(
+            'conversion',
+            lambda inputs: self._convert(
+                pd.concat([inputs[name] for name in panel_stages]),
+                inputs['consumption'][1],
+                inputs['climatology'] if 'climatology' in inputs else None
+            ),
+            config = ['location', 'crs', 'panels', 'pv_model', 'storage', 'economics'] + period,
+            files = lambda: optional_file('pv_model', 'temperature_tbl'),
+            depends = panel_stages + ['consumption'] + climatology
+        ))
+        pipeline.add(Stage(
+            'report',
+            lambda inputs: inputs['conversion'].generate_report(
+                config['template_dir'],
+                config['report_out'],
+                chart = (config.get('report') or {}).get('chart', 'inline'),
+                dpi = (config.get('report') or {}).get('dpi', 100)
+            ),
+            config = ['template_dir', 'report_out', 'report', 'location', 'FeatureSolarRadiation'],
+            files = lambda: sorted(str(f) for f in Path(config['template_dir']).glob('*.html')),
+            depends = ['conversion'],
+            # Rendering is cheap and a deleted or overwritten report must be written again
+            persist = False
+        ))
+        return pipeline
+
+    def _calibrate(self, inputs):
+        """Transmittivity and diffuse proportion, optimized against the observations if no error table exists."""
         calculator = SolarCalculator(self.config)
         if calculator.error_tbl is None:
             calculator.optimize(
                 dem=self.config["dem"],
                 observation_dir=self.config["optimization"]["optim_dir"],
-                observation_locs=self.config["optimization"]["optim_coords"],
-                out=self.config['optimization'].get('out')
+                observation_coords=self.config["optimization"]["optim_coords"],
+                out=self.config['optimization'].get('out'),
+                observations=inputs['observations']
             )
+        return calculator.radiation_parameters()
 
-        srad = calculator.calculate_radiation(dem = self.config['dem'])
+    def load_consumption(self):
+        """
+        Load the consumption table of the config file.
 
+        Returns
+        -------
+        tuple
+            Monthly consumption table and the consumption expanded with the load profile
+            of the `consumption` config section. Both are None without a consumption table,
+            the second equals the first without a profile.
+        """
         consumption_file = self.config['consumption'].get('consumption_tbl')
-        if consumption_file is not None:
-            logger.info(f'Consumption data available. Loading from {consumption_file}')
+        if consumption_file is None:
+            return None, None
+
+        logger.info(f'Consumption data available. Loading from {consumption_file}')
+        with span('read_excel', file = str(consumption_file)):
             consumption = pd.read_excel(consumption_file, usecols = ['date', 'consumption'])
-            consumption["date"] = pd.to_datetime(consumption['date'], format = '%Y-%m-%d')
+        consumption["date"] = pd.to_datetime(consumption['date'], format = '%Y-%m-%d')
+
+        profile = self.config['consumption'].get('profile')
+        if profile is None:
+            return consumption, consumption
+
+        logger.info(f'Expanding monthly consumption with the {profile} load profile')
+        rad_config = self.config['FeatureSolarRadiation']
+        expander = LoadProfileExpander(
+            pd.to_datetime(rad_config.get('start_date_time', rad_config.get('start_date', "1/1/2024")), format = "%m/%d/%Y"),
+            pd.to_datetime(rad_config.get('end_date_time', rad_config.get('end_date', "12/31/2024")), format = "%m/%d/%Y"),
+            profile = profile,
+            holidays = self.config['consumption'].get('holidays')
+        )
+        expanded = (
+            expander.expand(consumption.set_index('date')['consumption'], freq = self.config['consumption'].get('freq', 'D'))
+            .iloc[:, 0]
+            .rename('consumption')
+            .reset_index()
+        )
+        return consumption, expanded
+
+    def _convert(self, srad: pd.DataFrame, consumption: Optional[pd.DataFrame], climatology: Optional[pd.DataFrame]):
+        """Report with the energy conversion of the panel radiation."""
+        from .visualization.report import Report
+
+        pv_model = dict(self.config.get('pv_model') or {})
+        temperature_file = pv_model.pop('temperature_tbl', None)
+        if temperature_file is not None:
+            logger.info(f'Air temperature available. Using temperature dependent conversion with data from {temperature_file}')
+            air_temperature = pd.read_csv(temperature_file, usecols = ['date', 'temperature'])
+            air_temperature['date'] = pd.to_datetime(air_temperature['date'])
+            air_temperature = air_temperature.set_index('date')['temperature']
+
+            # Sums over a day or longer are received during daylight only
+            dates = pd.DatetimeIndex(srad['date'].unique())
+            latitude = to_latitude([self.config['location']], self.config['crs'])[0]
+            hours = interval_hours(dates, latitude)
+            air_temperature = interval_mean(air_temperature, dates)
+        else:
+            air_temperature, hours = None, 1
+
+        return Report(
+            srad,
+            panel_config = self.config['panels'],
+            consumption = consumption,
+            air_temperature = air_temperature,
+            hours = hours,
+            pv_model = pv_model,
+            storage = self.config.get('storage'),
+            economics = self.config.get('economics'),
+            climatology = climatology
+        )
+
+    def prescreen(self, locations: Optional[list] = None, parameters: Optional[tuple] = None):
+        """
+        Estimate monthly panel insolation from the station network without running the terrain model.
+
+        Parameters
+        ----------
+        locations : list, optional
+            List of x,y coordinates. Defaults to the location in the config file.
+        parameters : tuple, optional
+            Transmittivity and diffuse proportion. Taken from a calculator created from the config if None.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table as returned by `StationInterpolator.estimate`.
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        if locations is None:
+            locations = [self.config['location']]
+        if parameters is None:
+            parameters = SolarCalculator(self.config).radiation_parameters()
+        _, diffuse_proportion = parameters
+
+        return self.get_interpolator().estimate(locations, self.config['panels'], diffuse_fraction = diffuse_proportion)
+
+    def size_system(self, srad: pd.DataFrame, consumption: pd.DataFrame):
+        """
+        Evaluate the candidate system sizes of the `sizing` config section against the consumption.
+
+        Parameters
+        ----------
+        srad : pandas.DataFrame
+            Radiation table as returned by `SolarCalculator.calculate_radiation`.
+        consumption : pandas.DataFrame
+            Monthly consumption table with the columns date and consumption.
+
+        Returns
+        -------
+        tuple
+            Summary table, percentile bands and optimal size as returned by `sweep_solar_energy`.
+        """
+        sizing = self.config['sizing']
+        panel = sizing.get('panel', next(iter(self.config['panels'])))
+
+        insolation = (
+            srad.loc[srad['panel'] == panel]
+            .groupby('date')['global_ave'].mean()
+            .resample('MS').sum()
+        )
+        consumption = consumption.set_index('date')['consumption'].reindex(insolation.index, fill_value = 0)
+
+        candidates = {'kWp': sizing['kWp']} if 'kWp' in sizing else {'area': sizing.get('area', [5, 10, 15, 20, 25, 30])}
+        return sweep_solar_energy(
+            insolation.to_numpy(),
+            eff_low = sizing.get('eff_low', 0.15),
+            eff_high = sizing.get('eff_high', 0.20),
+            loss_low = sizing.get('loss_low', 0.75),
+            loss_high = sizing.get('loss_high', 0.9),
+            consumption = consumption.to_numpy(),
+            area_optim = self.config.get('area_optim'),
+            n = sizing.get('n', 10000),
+            **candidates
+        )
+
+    def optimize_orientation(self, consumption: Optional[pd.DataFrame] = None, parameters: Optional[tuple] = None):
+        """
+        Search the optimal panel slope and aspect at the configured location.
+
+        Parameters
+        ----------
+        consumption : pandas.DataFrame, optional
+            Monthly consumption table with the columns date and consumption. Only used
+            if `match_consumption` is set in the `orientation` config section.
+        parameters : tuple, optional
+            Transmittivity and diffuse proportion. Taken from a calculator created from the config if None.
+
+        Returns
+        -------
+        tuple
+            Optimum and yield surface as returned by `optimize_orientation`.
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        orientation_config = self.config.get('orientation') or {}
+        if parameters is None:
+            parameters = SolarCalculator(self.config).radiation_parameters()
+        transmittivity, diffuse_proportion = parameters
+
+        sky_model = self.get_sky_model()
+
+        panel = self.config['panels'][orientation_config.get('panel', next(iter(self.config['panels'])))]
+        if consumption is not None and orientation_config.get('match_consumption', False):
+            consumption = consumption.set_index('date')['consumption']
         else:
             consumption = None
 
-        ## Generate Report
-        report = Report(srad, panel_config = self.config['panels'], consumption = consumption)
-        report.generate_report(self.config['template_dir'], self.config['report_out'])
+        slope_step = orientation_config.get('slope_step', 1)
+        aspect_step = orientation_config.get('aspect_step', 1)
+        return optimize_orientation(
+            sky_model,
+            transmittivity = transmittivity,
+            diffuse_proportion = diffuse_proportion,
+            slopes = np.arange(0, 90 + slope_step, slope_step),
+            aspects = np.arange(0, 360, aspect_step),
+            consumption = consumption,
+            area = panel.get('area', 1),
+            efficiency = panel.get('efficiency', 0.15),
+            system_loss = panel.get('system_loss', 0.8)
+        )
+
+    def get_dem(self):
+        """DEM of the config file, read once per workflow and shared by all analyses."""
+        if self.dem is None:
+            self.dem = RasterGrid.from_file(self.config['dem'])
+        return self.dem
+
+    def get_interpolator(self):
+        """Station interpolator of the config file, created once per workflow."""
+        if self.interpolator is None:
+            from .core.station_interpolation import StationInterpolator
+
+            elevation_correction = (self.config.get('interpolation') or {}).get('elevation_correction', False)
+            self.interpolator = StationInterpolator.from_config(
+                self.config,
+                dem = self.get_dem() if elevation_correction else None
+            )
+        return self.interpolator
+
+    def get_sky_model(self):
+        """Sky model of the configured location, created once per workflow."""
+        if self.sky_model is None:
+            orientation_config = self.config.get('orientation') or {}
+            # The DEM is only read if the horizon is not cached
+            self.sky_model = SkyModel.from_config(self.config, dem = self.get_dem, cache_dir = orientation_config.get('cache_dir'))
+        return self.sky_model
+
+    def sensitivity(self):
+        """
+        Run a global sensitivity analysis of the monthly production at the configured location.
+
+        Returns
+        -------
+        pandas.DataFrame
+            First-order and total Sobol indices per month and parameter, see `sobol_indices`.
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        from .core.sensitivity import sobol_indices
+
+        sensitivity_config = self.config.get('sensitivity') or {}
+        indices = sobol_indices(
+            self.get_sky_model(),
+            bounds = sensitivity_config.get('bounds'),
+            n = sensitivity_config.get('n', 1024),
+            workers = sensitivity_config.get('workers', 1),
+            seed = sensitivity_config.get('seed')
+        )
+
+        out = sensitivity_config.get('out')
+        if out is not None:
+            Path(out).parent.mkdir(exist_ok = True, parents = True)
+            indices.to_csv(out)
+            logger.info(f'Sensitivity indices saved to {out}')
+
+        annual = indices.groupby('parameter').mean().sort_values('ST', ascending = False)
+        logger.info(f"Mean sensitivity indices over all months:\n{annual.round(3)}")
+        return indices
+
+    def transpose_measured(self, panels: Optional[list] = None):
+        """
+        Panel insolation from measured or interpolated horizontal insolation, bypassing the terrain model.
+
+        The `source` of the `transposition` config section is either 'interpolation' to
+        use the station network estimate at the location, or the path to a station csv file.
+
+        Parameters
+        ----------
+        panels : list, optional
+            Names of the panels to transpose to. Defaults to all panels in the config.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table with the columns of `SolarCalculator.calculate_radiation`.
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        transposition_config = self.config.get('transposition') or {}
+        source = transposition_config.get('source', 'interpolation')
+        sky_model = self.get_sky_model()
+
+        if source == 'interpolation':
+            interpolator = self.get_interpolator()
+            horizontal = pd.Series(interpolator.query([self.config['location']])[0], index = interpolator.dates)
+        else:
+            horizontal = load_daily_radiation(source, sky_model.dates)
+        panel_config = {name: attrs for name, attrs in self.config['panels'].items() if panels is None or name in panels}
+        logger.info(f'Transposing horizontal insolation from {source} to {len(panel_config)} panels')
+
+        engine = TranspositionEngine(sky_model, panel_config, albedo = transposition_config.get('albedo', 0.2))
+        return engine.transpose(horizontal)
+
+    def climatology(self, parameters: Optional[tuple] = None):
+        """
+        Multi-year monthly production statistics, computed one year at a time.
+
+        Each year of the `climatology` config section is either computed with the terrain
+        model (`source: model`) or transposed from a station csv file with daily insolation.
+        Only the monthly totals of each year are kept.
+
+        Parameters
+        ----------
+        parameters : tuple, optional
+            Transmittivity and diffuse proportion of the terrain model. Taken from the
+            calculator if None.
+
+        Returns
+        -------
+        MonthlyClimatology
+            Running statistics of the monthly production per panel.
+        """
+        if self.config is None:
+            raise ValueError("Load a config file first before running a workflow.")
+
+        climatology_config = self.config['climatology']
+        source = climatology_config.get('source', 'model')
+        first_year, last_year = climatology_config['years']
+        from .visualization.report import Report
+
+        climatology = MonthlyClimatology(q = climatology_config.get('q', (10, 50, 90)))
+
+        if source == 'model':
+            calculator = SolarCalculator(self.config)
+            years = (
+                (year, calculator.calculate_radiation(
+                    dem = self.config['dem'],
+                    parameters = parameters,
+                    start_date_time = f"1/1/{year}",
+                    end_date_time = f"12/31/{year}"
+                ))
+                for year in range(first_year, last_year + 1)
+            )
+        else:
+            sky_model = self.get_sky_model()
+            albedo = (self.config.get('transposition') or {}).get('albedo', 0.2)
+
+            def transpose_years():
+                for year, horizontal in iter_yearly_radiation(source):
+                    if not first_year <= year <= last_year:
+                        continue
+                    sky = SkyModel(
+                        sky_model.latitude,
+                        pd.date_range(f"{year}-01-01", f"{year}-12-31"),
+                        n_steps = sky_model.n_steps,
+                        horizon = sky_model.horizon,
+                        elevation = sky_model.elevation
+                    )
+                    engine = TranspositionEngine(sky, self.config['panels'], albedo = albedo)
+                    yield year, engine.transpose(horizontal)
+            years = transpose_years()
+
+        for year, srad in years:
+            logger.info(f'Adding year {year} to the climatology')
+            climatology.update(year, Report(srad, panel_config = self.config['panels']).monthly_production)
+
+        return climatology
@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+@pytest.fixture
+def fake_arcpy(monkeypatch):
+    """Deterministic arcpy stand-in of the benchmarks, see benchmarks/fake_arcpy."""
+    monkeypatch.syspath_prepend(str(ROOT / 'benchmarks' / 'fake_arcpy'))
+    import arcpy
+    return arcpy
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.cli import COMMANDS, batch, parse_args, validate
+from src.workflow import Workflow
+
+from conftest import ROOT
+
+def test_run_is_the_default_command():
+    assert parse_args([]).command == 'run'
+    args = parse_args(['--config', 'site.yaml', '--force'])
+    assert (args.command, args.config, args.force) == ('run', 'site.yaml', True)
+
+@pytest.mark.parametrize('command', [name for name in COMMANDS if name != 'batch'])
+def test_commands_share_the_common_options(command):
+    args = parse_args([command, '--config', 'site.yaml', '--explain', '--profile', 'trace.json'])
+
+    assert (args.command, args.config, args.explain, args.profile) == (command, 'site.yaml', True, 'trace.json')
+
+def test_batch_takes_several_configs():
+    args = parse_args(['batch', 'a.yaml', 'b.yaml', '--workers', '2'])
+
+    assert args.configs == ['a.yaml', 'b.yaml']
+    assert args.workers == 2
+
+def test_batch_configures_logging_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Workflow, 'start_logging', lambda self: calls.append(self.config))
+    configs = []
+    for name in ('a', 'b', 'c'):
+        (tmp_path / f'{name}.yaml').write_text(f'location: [0, 0]\nname: {name}\n')
+        configs.append(str(tmp_path / f'{name}.yaml'))
+
+    # The configs are incomplete, so every analysis fails after its config is loaded
+    assert batch(configs) == configs
+    assert [config['name'] for config in calls] == ['a']
+
+def test_invalid_config_fails_validation(tmp_path, capsys):
+    config = tmp_path / 'config.yaml'
+    config.write_text('location: [1, 2]\n')
+
+    assert validate(str(config)) == 1
+    assert 'Invalid config' in capsys.readouterr().out
+
+def test_cli_starts_without_heavy_modules():
+    code = "import sys, src.cli; print(sorted({'pandas', 'numpy', 'matplotlib', 'arcpy'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, '-c', code], cwd = ROOT, capture_output = True, text = True, check = True).stdout
+
+    assert out.strip() == '[]'
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.climatology import MonthlyClimatology, iter_yearly_radiation
+
+def yearly_tables(n_years = 6, seed = 0):
+    rng = np.random.default_rng(seed)
+    for year in range(2000, 2000 + n_years):
+        index = pd.date_range(f'{year}-01-01', periods = 12, freq = 'MS')
+        yield year, pd.DataFrame({'south': rng.uniform(50, 150, 12), 'west': rng.uniform(20, 80, 12)}, index = index)
+
+def test_welford_statistics_equal_numpy():
+    climatology = MonthlyClimatology()
+    tables = list(yearly_tables())
+    for year, monthly in tables:
+        climatology.update(year, monthly)
+
+    values = np.stack([monthly.to_numpy() for _, monthly in tables])
+    np.testing.assert_allclose(climatology.mean, values.mean(axis = 0))
+    np.testing.assert_allclose(climatology.std, values.std(axis = 0, ddof = 1))
+
+def test_summary_of_the_total():
+    climatology = MonthlyClimatology(q = [50])
+    tables = list(yearly_tables())
+    for year, monthly in tables:
+        climatology.update(year, monthly)
+
+    totals = np.stack([monthly.sum(axis = 1).to_numpy() for _, monthly in tables])
+    summary = climatology.summary()
+    np.testing.assert_allclose(summary['mean'], totals.mean(axis = 0))
+    np.testing.assert_allclose(summary['std'], totals.std(axis = 0, ddof = 1))
+    np.testing.assert_allclose(summary['p50'], np.median(totals, axis = 0))
+    np.testing.assert_allclose(summary['cv'], summary['std'] / summary['mean'])
+
+def test_summary_per_column():
+    climatology = MonthlyClimatology()
+    for year, monthly in yearly_tables():
+        climatology.update(year, monthly)
+
+    summary = climatology.summary(total = False)
+    np.testing.assert_allclose(summary['mean']['west'], climatology.mean[:, 1])
+
+def test_months_with_missing_values_are_skipped():
+    climatology = MonthlyClimatology()
+    index = pd.date_range('2000-01-01', periods = 12, freq = 'MS')
+    climatology.update(2000, pd.DataFrame({'south': 10.0}, index = index))
+    climatology.update(2001, pd.DataFrame({'south': [np.nan] + [20.0] * 11}, index = index))
+
+    assert climatology.count[0] == 1
+    assert climatology.mean[0, 0] == pytest.approx(10)
+    assert climatology.mean[1, 0] == pytest.approx(15)
+
+def test_months_with_a_single_valid_year_have_no_spread(recwarn):
+    climatology = MonthlyClimatology()
+    index = pd.date_range('2000-01-01', periods = 12, freq = 'MS')
+    climatology.update(2000, pd.DataFrame({'south': 10.0}, index = index))
+    climatology.update(2001, pd.DataFrame({'south': [np.nan] + [20.0] * 11}, index = index))
+
+    summary = climatology.summary()
+    assert summary['std'].iloc[0] == 0
+    assert summary['std'].iloc[1] == pytest.approx(np.std([10, 20], ddof = 1))
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+def test_empty_climatology_has_no_summary():
+    with pytest.raises(ValueError):
+        MonthlyClimatology().summary()
+
+def test_station_file_is_streamed_in_complete_years(tmp_path):
+    dates = pd.date_range('2001-01-01', '2003-12-31')
+    pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'insol': 1.0}).to_csv(tmp_path / 'station.csv', index = False)
+
+    years = list(iter_yearly_radiation(tmp_path / 'station.csv', chunksize = 100))
+
+    assert [year for year, _ in years] == [2001, 2002, 2003]
+    assert [len(values) for _, values in years] == [365, 365, 365]
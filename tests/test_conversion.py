@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.solar_geometry import daylight_hours
+from src.transformation import convert_solar_energy, pv_performance_factor
+from src.utils import interval_hours, interval_mean
+
+def test_performance_factor_is_one_at_standard_test_conditions():
+    # Cell temperature of 25°C at 1000 W/m²
+    air_temperature = 25 - 1000 * (45 - 20) / 800
+    assert np.isclose(pv_performance_factor(1000, air_temperature), 1)
+
+def test_performance_factor_drops_with_heat_and_low_light():
+    factor = pv_performance_factor(np.array([[1000], [200]]), np.array([10, 40]))
+    assert factor.shape == (2, 2)
+    assert factor[0, 1] < factor[0, 0]
+
+    low_light = pv_performance_factor(np.array([1000, 200]), 25, temp_coefficient = 0)
+    assert low_light[1] < low_light[0]
+
+def test_convert_solar_energy_requires_one_size():
+    with pytest.raises(ValueError):
+        convert_solar_energy(100)
+    with pytest.raises(ValueError):
+        convert_solar_energy(100, area = 10, kWp = 2)
+
+def test_daily_interval_hours_are_daylight_hours():
+    dates = pd.date_range('2024-01-01', periods = 10, freq = 'D')
+    hours = interval_hours(dates, 47)
+
+    np.testing.assert_allclose(hours, daylight_hours(47, dates.dayofyear.to_numpy()))
+
+def test_weekly_interval_hours_sum_the_daylight_of_the_week():
+    dates = pd.date_range('2024-01-01', periods = 4, freq = '7D')
+    hours = interval_hours(dates, 47)
+
+    days = pd.date_range('2024-01-01', periods = 7, freq = 'D')
+    assert np.isclose(hours.iloc[0], daylight_hours(47, days.dayofyear.to_numpy()).sum())
+    assert (hours > 7 * 8).all()
+
+def test_hourly_interval_hours_are_one():
+    dates = pd.date_range('2024-06-01', periods = 48, freq = 'h')
+    np.testing.assert_allclose(interval_hours(dates, 47), 1)
+
+def test_hourly_temperature_is_averaged_per_day():
+    index = pd.date_range('2024-01-01', periods = 72, freq = 'h')
+    temperature = pd.Series(np.tile(np.arange(24.0), 3) + np.repeat([0, 10, 20], 24), index = index)
+    dates = pd.date_range('2024-01-01', periods = 3, freq = 'D')
+
+    np.testing.assert_allclose(interval_mean(temperature, dates), [11.5, 21.5, 31.5])
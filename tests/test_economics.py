@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.core.economics import evaluate_economics, scenario_grid
+
+def test_scenario_grid_is_full_factorial():
+    grid = scenario_grid(a = [1, 2, 3], b = [10, 20], c = 5)
+
+    assert len(grid['a']) == 6
+    assert set(zip(grid['a'], grid['b'])) == {(a, b) for a in (1, 2, 3) for b in (10, 20)}
+    np.testing.assert_array_equal(grid['c'], 5)
+
+def test_undiscounted_payback_is_cost_over_cash_flow():
+    tbl = evaluate_economics(
+        1000, 1000, tariff = 50, system_cost = 1250, degradation = 0, discount_rate = 0, lifetime = 10
+    )
+
+    assert tbl['avoided_costs'].iloc[0] == pytest.approx(500)
+    assert tbl['feed_in_revenue'].iloc[0] == pytest.approx(0)
+    assert tbl['payback'].iloc[0] == pytest.approx(2.5)
+    assert tbl['npv'].iloc[0] == pytest.approx(10 * 500 - 1250)
+
+def test_export_is_paid_with_the_feed_in_price():
+    tbl = evaluate_economics(1000, 400, tariff = 40, feed_in_price = 10)
+
+    assert tbl['avoided_costs'].iloc[0] == pytest.approx(160)
+    assert tbl['feed_in_revenue'].iloc[0] == pytest.approx(60)
+
+def test_unrecovered_investment_has_no_payback():
+    tbl = evaluate_economics(1000, 1000, system_cost = 1e6, lifetime = 5)
+
+    assert np.isnan(tbl['payback'].iloc[0])
+    assert tbl['npv'].iloc[0] < 0
+
+def test_free_system_without_cash_flow_pays_back_at_once():
+    with np.errstate(all = 'raise'):
+        tbl = evaluate_economics(1000, 500, tariff = 0, feed_in_price = 0, system_cost = 0)
+
+    assert tbl['payback'].iloc[0] == 0
+    assert tbl['npv'].iloc[0] == pytest.approx(0)
+
+def test_discounting_and_degradation_lower_the_npv():
+    tbl = evaluate_economics(1000, 1000, degradation = [0, 0.01], discount_rate = [0, 0.05])
+
+    npv = tbl.set_index(['degradation', 'discount_rate'])['npv']
+    assert npv[(0.01, 0)] < npv[(0, 0)]
+    assert npv[(0, 0.05)] < npv[(0, 0)]
+
+def test_remaining_costs_only_with_consumption():
+    assert 'remaining_costs' not in evaluate_economics(1000, 500)
+    tbl = evaluate_economics(1000, 500, consumption = 3000, tariff = 40)
+
+    assert tbl['remaining_costs'].iloc[0] == pytest.approx(1000)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.core.feature_store import FeatureStore
+from src.workflow import Workflow
+
+CRS = 25832
+
+def test_points_are_written_once(fake_arcpy, tmp_path):
+    store = FeatureStore(tmp_path)
+    first = store.points([[640000.0, 5170000.0], [641000.0, 5169000.0]], CRS)
+    mtime = first.stat().st_mtime_ns
+
+    second = store.points([[640000.0001, 5170000.0], [641000.0, 5169000.0]], CRS)
+
+    assert second == first
+    assert second.stat().st_mtime_ns == mtime
+    assert len(list(tmp_path.glob('*.shp'))) == 1
+
+def test_points_are_keyed_by_coordinates_and_crs(fake_arcpy, tmp_path):
+    store = FeatureStore(tmp_path)
+
+    assert store.points([640000.0, 5170000.0], CRS) != store.points([640001.0, 5170000.0], CRS)
+    assert store.points([640000.0, 5170000.0], CRS) != store.points([640000.0, 5170000.0], 32632)
+
+def test_features_in_the_reference_crs_are_not_projected(fake_arcpy, tmp_path):
+    store = FeatureStore(tmp_path / 'features')
+    fake_arcpy.write_raster(tmp_path / 'dem.tif', np.zeros((2, 2)), 640000.0, 5170000.0, 100, CRS)
+
+    features = store.get([[640050.0, 5169950.0]], CRS, reference = tmp_path / 'dem.tif')
+
+    assert features.parent == tmp_path / 'features'
+    assert len(list((tmp_path / 'features').glob('*.shp'))) == 1
+
+def test_replaced_dataset_is_described_again(fake_arcpy, tmp_path):
+    store = FeatureStore(tmp_path / 'features')
+    dem = tmp_path / 'dem.tif'
+    fake_arcpy.write_raster(dem, np.zeros((2, 2)), 0, 0, 100, CRS)
+    assert store.spatial_reference(dem).factoryCode == CRS
+
+    fake_arcpy.write_raster(dem, np.zeros((3, 3)), 0, 0, 100, 32632)
+    assert store.spatial_reference(dem).factoryCode == 32632
+
+def test_spatial_references_are_cached_per_store(fake_arcpy, tmp_path):
+    dem = tmp_path / 'dem.tif'
+    fake_arcpy.write_raster(dem, np.zeros((2, 2)), 0, 0, 100, CRS)
+    store = FeatureStore(tmp_path / 'features')
+    store.spatial_reference(dem)
+
+    assert len(store._spatial_references) == 1
+    assert FeatureStore(tmp_path / 'other')._spatial_references == {}
+
+def test_relative_store_is_resolved_against_the_config_file(tmp_path):
+    site = tmp_path / 'site'
+    site.mkdir()
+    (site / 'config.yaml').write_text('location: [0, 0]\n')
+    (site / 'absolute.yaml').write_text(f'feature_store: {tmp_path / "shared"}\n')
+
+    workflow = Workflow()
+    workflow.load_config(site / 'config.yaml')
+    assert workflow.config['feature_store'] == str(site / 'data' / 'features')
+
+    workflow.load_config(site / 'absolute.yaml')
+    assert workflow.config['feature_store'] == str(tmp_path / 'shared')
@@ -0,0 +1,87 @@
+import json
+import logging
+import time
+
+import pytest
+
+from src.instrumentation import disable, enable, recorder, span, traced
+
+@pytest.fixture
+def recording():
+    yield enable()
+    disable()
+
+def test_spans_are_not_recorded_while_disabled():
+    disable()
+
+    with span('idle') as s:
+        s.set(value = 1)
+    assert recorder() is None
+
+def test_nested_spans_split_their_time(recording):
+    with span('outer'):
+        time.sleep(0.01)
+        with span('inner', panel = 'south'):
+            time.sleep(0.02)
+
+    inner, outer = recording.records
+    assert (inner['name'], inner['depth'], inner['args']) == ('inner', 1, {'panel': 'south'})
+    assert outer['depth'] == 0
+    assert outer['wall'] >= inner['wall'] >= 0.02
+    assert outer['self'] == pytest.approx(outer['wall'] - inner['wall'])
+
+def test_failed_spans_record_the_error(recording):
+    with pytest.raises(KeyError):
+        with span('failing'):
+            raise KeyError('x')
+
+    assert recording.records[0]['error'] == 'KeyError'
+
+def test_traced_functions_record_each_call(recording):
+    @traced('double')
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4 and double(3) == 6
+    assert [r['name'] for r in recording.records] == ['double', 'double']
+    assert double.__name__ == 'double'
+
+def test_summary_totals_per_span_name(recording):
+    for _ in range(3):
+        with span('step'):
+            pass
+    start = len(recording.records)
+    with span('later'):
+        pass
+
+    assert {row['name']: row['calls'] for row in recording.summary()} == {'step': 3, 'later': 1}
+    assert [row['name'] for row in recording.summary(start)] == ['later']
+    assert 'step' in recording.format_summary()
+
+def test_trace_is_written_in_the_chrome_format(recording, tmp_path):
+    with span('stage:report', status = 'ran'):
+        pass
+
+    trace = json.loads(recording.write_trace(tmp_path / 'trace.json').read_text())
+    event, = trace['traceEvents']
+    assert (event['name'], event['cat'], event['ph']) == ('stage:report', 'stage', 'X')
+    assert event['args']['status'] == 'ran'
+    assert trace['otherData']['summary'][0]['name'] == 'stage:report'
+
+def test_cli_logs_one_summary_for_a_batch(monkeypatch, tmp_path, caplog):
+    from src import cli
+
+    def run_command(args):
+        # Stand-in for a batch of two runs, each logging its own summary at debug level
+        for _ in args.configs:
+            with span('workflow.run'):
+                logging.getLogger('src.workflow').debug("Time and memory per span of the run")
+    monkeypatch.setattr(cli, 'run_command', run_command)
+
+    with caplog.at_level(logging.INFO):
+        cli.main(['batch', 'a.yaml', 'b.yaml', '--profile', str(tmp_path / 'trace.json')])
+    disable()
+
+    summaries = [r for r in caplog.records if 'Time and memory per span' in r.getMessage()]
+    assert len(summaries) == 1
+    assert (tmp_path / 'trace.json').exists()
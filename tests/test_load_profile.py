@@ -0,0 +1,54 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.load_profile import LoadProfileExpander, easter_sunday, public_holidays
+
+MONTHLY = pd.Series(
+    [400.0, 350, 330, 300, 280, 260, 270, 280, 290, 320, 360, 410],
+    index = pd.date_range('2024-01-01', periods = 12, freq = 'MS')
+)
+
+@pytest.mark.parametrize('year, date', [(2024, datetime.date(2024, 3, 31)), (2025, datetime.date(2025, 4, 20))])
+def test_easter_sunday(year, date):
+    assert easter_sunday(year) == date
+
+def test_easter_monday_is_a_holiday():
+    assert pd.Timestamp('2024-04-01') in public_holidays([2024])
+
+@pytest.mark.parametrize('freq', ['D', 'h'])
+def test_expansion_keeps_the_monthly_totals(freq):
+    expanded = LoadProfileExpander('2024-01-01', '2024-12-31').expand(MONTHLY, freq = freq)
+
+    monthly = expanded[0].resample('MS').sum()
+    np.testing.assert_allclose(monthly.to_numpy(), MONTHLY.to_numpy())
+
+def test_hourly_values_sum_to_the_daily_values():
+    expander = LoadProfileExpander('2024-01-01', '2024-12-31')
+
+    hourly = expander.expand(MONTHLY, freq = 'h')[0]
+    daily = expander.expand(MONTHLY, freq = 'D')[0]
+    np.testing.assert_allclose(hourly.resample('D').sum().to_numpy(), daily.to_numpy())
+
+def test_h0_peaks_in_the_evening():
+    hourly = LoadProfileExpander('2024-01-08', '2024-01-08').expand(MONTHLY.iloc[:1], freq = 'h')[0]
+
+    assert hourly.idxmax().hour in (18, 19)
+    assert hourly.idxmin().hour in (3, 4)
+
+def test_flat_profile_spreads_evenly():
+    daily = LoadProfileExpander('2024-01-01', '2024-01-31', profile = 'flat').expand([[310.0]])[0]
+
+    np.testing.assert_allclose(daily, 10)
+
+def test_customers_are_expanded_at_once():
+    expander = LoadProfileExpander('2024-01-01', '2024-12-31')
+    both = expander.expand(pd.DataFrame({'a': MONTHLY, 'b': 2 * MONTHLY}))
+
+    np.testing.assert_allclose(both['b'], 2 * both['a'])
+
+def test_unknown_profile_raises():
+    with pytest.raises(ValueError):
+        LoadProfileExpander(profile = 'G0')
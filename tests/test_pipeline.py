@@ -0,0 +1,133 @@
+import pandas as pd
+import pytest
+
+from src.pipeline import Pipeline, Stage, config_value, file_signature
+from src.utils import load_monthly_radiation
+
+class Counter:
+    """Stage function counting its calls."""
+
+    def __init__(self, func = lambda inputs: 1):
+        self.calls = 0
+        self.func = func
+
+    def __call__(self, inputs):
+        self.calls += 1
+        return self.func(inputs)
+
+def pipeline(tmp_path, config, source, total, force = False):
+    p = Pipeline(config, cache_dir = tmp_path / 'cache', force = force)
+    p.add(Stage('source', source, config = ['a'], files = [tmp_path / 'input.txt']))
+    p.add(Stage('total', total, config = ['b.c'], depends = ['source']))
+    return p
+
+@pytest.fixture
+def inputs(tmp_path):
+    (tmp_path / 'input.txt').write_text('1')
+    return {'a': 1, 'b': {'c': 2}}
+
+def test_unchanged_stages_are_skipped(tmp_path, inputs):
+    source, total = Counter(), Counter(lambda inputs: inputs['source'] + 1)
+    assert pipeline(tmp_path, inputs, source, total).run(['total']) == {'total': 2}
+
+    p = pipeline(tmp_path, inputs, source, total)
+    assert p.run(['total']) == {'total': 2}
+    assert (source.calls, total.calls) == (1, 1)
+    assert p.decisions['total'] == ('skipped', "fingerprint unchanged")
+    # The output of the skipped stage is loaded, its inputs are not needed
+    assert 'source' not in p.decisions
+
+def test_force_runs_all_stages(tmp_path, inputs):
+    source, total = Counter(), Counter(lambda inputs: inputs['source'])
+    pipeline(tmp_path, inputs, source, total).run(['total'])
+    pipeline(tmp_path, inputs, source, total, force = True).run(['total'])
+
+    assert (source.calls, total.calls) == (2, 2)
+
+def test_changed_config_reruns_the_stage_and_its_dependents(tmp_path, inputs):
+    source, total = Counter(), Counter(lambda inputs: inputs['source'])
+    pipeline(tmp_path, inputs, source, total).run(['total'])
+
+    p = pipeline(tmp_path, {**inputs, 'a': 2}, source, total)
+    p.run(['total'])
+    assert (source.calls, total.calls) == (2, 2)
+    assert p.decisions['source'] == ('ran', "changed: config:a")
+
+def test_changed_nested_config_only_reruns_its_stage(tmp_path, inputs):
+    source, total = Counter(), Counter(lambda inputs: inputs['source'])
+    pipeline(tmp_path, inputs, source, total).run(['total'])
+
+    pipeline(tmp_path, {**inputs, 'b': {'c': 3}}, source, total).run(['total'])
+    assert (source.calls, total.calls) == (1, 2)
+
+def test_changed_input_file_reruns_the_stage(tmp_path, inputs):
+    source, total = Counter(), Counter(lambda inputs: inputs['source'])
+    pipeline(tmp_path, inputs, source, total).run(['total'])
+
+    (tmp_path / 'input.txt').write_text('changed')
+    p = pipeline(tmp_path, inputs, source, total)
+    p.run(['total'])
+    assert source.calls == 2
+    assert p.decisions['source'][1].startswith("changed: file:")
+
+def test_unused_inputs_are_not_resolved(tmp_path, inputs):
+    source = Counter()
+    p = Pipeline(inputs, cache_dir = tmp_path / 'cache')
+    p.add(Stage('source', source))
+    p.add(Stage('constant', lambda inputs: 0, depends = ['source']))
+
+    assert p.run(['constant']) == {'constant': 0}
+    assert source.calls == 0
+
+def test_stages_that_are_not_persisted_always_run(tmp_path, inputs):
+    render = Counter()
+    for _ in range(2):
+        p = Pipeline(inputs, cache_dir = tmp_path / 'cache')
+        p.add(Stage('report', render, persist = False))
+        p.run(['report'])
+
+    assert render.calls == 2
+    assert p.decisions['report'] == ('ran', "not persisted")
+    assert not (tmp_path / 'cache').exists()
+
+def test_unknown_dependency_is_rejected(tmp_path):
+    p = Pipeline({}, cache_dir = tmp_path)
+
+    with pytest.raises(ValueError):
+        p.add(Stage('total', Counter(), depends = ['source']))
+
+def test_config_value_and_file_signature(tmp_path):
+    assert config_value({'a': {'b': 1}}, 'a.b') == 1
+    assert config_value({'a': {'b': 1}}, 'a.c') is None
+    assert file_signature(tmp_path / 'missing') is None
+
+def test_workflow_report_is_rendered_every_run(tmp_path):
+    from src.workflow import Workflow
+
+    workflow = Workflow()
+    workflow.config = {
+        'location': [0, 0], 'crs': 25832, 'dem': 'dem.tif', 'cache_dir': str(tmp_path),
+        'template_dir': str(tmp_path), 'report_out': str(tmp_path / 'report'),
+        'FeatureSolarRadiation': {}, 'consumption': {}, 'optimization': {}, 'panels': {'south': {}},
+    }
+
+    assert not workflow.build_pipeline().stages['report'].persist
+
+def test_observations_are_loaded_from_str_paths(tmp_path):
+    dates = pd.date_range('2023-01-01', '2023-12-31')
+    pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'insol': 2.0}).to_csv(tmp_path / 'st1.csv', index = False)
+
+    observations = load_monthly_radiation([str(tmp_path / 'st1.csv')])
+
+    assert observations.index.get_level_values('st_id').unique().tolist() == ['st1']
+    assert observations.loc[('st1', pd.Timestamp('2024-01-01'))] == pytest.approx(62)
+
+@pytest.mark.parametrize('key', ['sizing', 'orientation', 'storage', 'consumption.profile', 'economics'])
+def test_shipped_config_keeps_optional_analyses_off(key):
+    import yaml
+
+    from conftest import ROOT
+
+    config = yaml.safe_load((ROOT / 'config.yaml').read_text(encoding = 'utf-8'))
+
+    assert config_value(config, key) is None
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualization.report import Report
+
+from conftest import ROOT
+
+PANELS = {
+    'south': {'area': 10, 'efficiency': 0.2, 'system_loss': 0.8},
+    'west': {'area': 5, 'efficiency': 0.15, 'system_loss': 0.9},
+}
+
+def radiation(days = 60, freq = 'D'):
+    dates = pd.date_range('2024-01-01', periods = days, freq = freq)
+    return pd.concat([
+        pd.DataFrame({'date': dates, 'panel': 'south', 'srad': 10.0}),
+        pd.DataFrame({'date': dates, 'panel': 'west', 'srad': 4.0}),
+    ], ignore_index = True)
+
+def test_production_per_panel():
+    report = Report(radiation(), panel_config = PANELS)
+
+    assert list(report.production.columns) == ['south', 'west']
+    np.testing.assert_allclose(report.production['south'], 10.0 * 0.2 * 0.8)
+    np.testing.assert_allclose(report.production['west'], 4.0 * 0.15 * 0.9)
+    assert np.isclose(report.total_production, 60 * (1.6 + 0.54))
+
+def test_rows_of_the_same_date_and_panel_are_summed():
+    srad = radiation()
+    report = Report(pd.concat([srad, srad]), panel_config = PANELS)
+
+    np.testing.assert_allclose(report.srad['south'], 20.0)
+
+def test_monthly_production():
+    report = Report(radiation(), panel_config = PANELS)
+
+    np.testing.assert_allclose(report.monthly_production['south'], [31 * 1.6, 29 * 1.6])
+
+def test_hot_air_lowers_the_production():
+    srad = radiation()
+    dates = pd.DatetimeIndex(srad['date'].unique())
+    cool = Report(srad, panel_config = PANELS, air_temperature = pd.Series(5.0, index = dates), hours = 8)
+    hot = Report(srad, panel_config = PANELS, air_temperature = pd.Series(35.0, index = dates), hours = 8)
+
+    assert (hot.production < cool.production).all().all()
+
+@pytest.mark.parametrize('days, freq, hours', [(60, 'D', 24), (48, 'h', 1), (1, 'D', 24)])
+def test_time_step_of_the_production(days, freq, hours):
+    assert Report(radiation(days, freq), panel_config = PANELS).time_step == hours
+
+def test_hourly_consumption_is_summed_per_day_of_production():
+    consumption = pd.DataFrame({'date': pd.date_range('2024-01-01', periods = 72, freq = 'h'), 'consumption': 1.0})
+    report = Report(radiation(days = 3), panel_config = PANELS, consumption = consumption)
+
+    np.testing.assert_allclose(report.consumption_profile, 24)
+
+def test_daily_consumption_matches_daily_production():
+    consumption = pd.DataFrame({'date': pd.date_range('2024-01-01', periods = 60), 'consumption': np.arange(60.0)})
+    report = Report(radiation(), panel_config = PANELS, consumption = consumption)
+
+    np.testing.assert_allclose(report.consumption_profile, np.arange(60.0))
+
+def test_monthly_consumption_is_spread_over_the_month():
+    consumption = pd.DataFrame({'date': pd.to_datetime(['2024-01-01', '2024-02-01']), 'consumption': [310.0, 290.0]})
+    report = Report(radiation(), panel_config = PANELS, consumption = consumption)
+
+    np.testing.assert_allclose(report.consumption_profile[:31], 10)
+    np.testing.assert_allclose(report.consumption_profile[31:], 10)
+
+def charted_report(climatology = None):
+    consumption = pd.DataFrame({'date': pd.date_range('2024-01-01', periods = 2, freq = 'MS'), 'consumption': [50.0, 40.0]})
+    return Report(radiation(), panel_config = PANELS, consumption = consumption, climatology = climatology)
+
+def test_chart_data_lists_the_monthly_values():
+    data = charted_report().chart_data()
+
+    assert data['labels'] == ['2024-01', '2024-02']
+    assert [series['name'] for series in data['series']] == ['south', 'west']
+    assert data['series'][0]['values'] == [49.6, 46.4]
+    assert data['consumption'] == [50.0, 40.0]
+    assert data['band'] is None
+
+def test_chart_data_band_of_the_climatology():
+    climatology = pd.DataFrame(
+        {'mean': 60.0, 'p10': np.arange(12.0), 'p90': np.arange(12.0) + 100},
+        index = pd.Index(range(1, 13), name = 'month')
+    )
+
+    band = charted_report(climatology).chart_data()['band']
+
+    assert band['low'] == [0.0, 1.0]
+    assert band['high'] == [100.0, 101.0]
+    assert band['label'] == 'Inter-annual range (p10-p90)'
+
+def test_inline_context_has_no_image():
+    context = charted_report().context(chart = 'inline')
+
+    assert context['chart_data'] is not None
+    assert context['monthly_plot'] is None
+
+@pytest.mark.parametrize('chart, start', [('svg', '<svg'), ('png', 'iVBOR')])
+def test_image_context_has_no_chart_data(chart, start):
+    context = charted_report().context(chart = chart, dpi = 20)
+
+    assert context['chart_data'] is None
+    assert context['monthly_plot'].startswith(start)
+
+def test_unknown_chart_mode_is_rejected():
+    with pytest.raises(ValueError):
+        charted_report().context(chart = 'gif')
+
+def test_inline_chart_data_is_rendered_as_json():
+    html = charted_report().render(str(ROOT / 'templates'), chart = 'inline')
+
+    assert 'id="monthly-chart-data"' in html
+    assert '"2024-01"' in html
@@ -0,0 +1,72 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cli import site_names
+from src.visualization import report_generator
+from src.visualization.report import Report
+from src.visualization.report_generator import ReportGenerator, site_filename
+
+from conftest import ROOT
+
+def report(level = 10.0):
+    dates = pd.date_range('2024-01-01', periods = 60)
+    srad = pd.DataFrame({'date': dates, 'panel': 'south', 'srad': level})
+    consumption = pd.DataFrame({'date': dates, 'consumption': 1.0})
+    return Report(srad, panel_config = {'south': {'area': 10, 'efficiency': 0.2, 'system_loss': 0.8}}, consumption = consumption)
+
+def test_reports_and_index_are_written(tmp_path):
+    index = ReportGenerator(ROOT / 'templates', tmp_path).generate({'north site': report(5), 'south': report()})
+
+    assert sorted(f.name for f in tmp_path.glob('*.html')) == ['index.html', 'north_site.html', 'south.html']
+    html = index.read_text(encoding = 'utf-8')
+    assert html.index('north site') < html.index('south')
+
+def test_reports_are_rendered_as_they_are_computed(monkeypatch, tmp_path):
+    rendered = []
+    render = report_generator._render
+
+    def recording_render(report, *settings):
+        rendered.append(report)
+        return render(report, *settings)
+    monkeypatch.setattr(report_generator, '_render', recording_render)
+
+    def reports():
+        for i in range(3):
+            assert len(rendered) == i
+            yield f"site{i}", report()
+
+    ReportGenerator(ROOT / 'templates', tmp_path).generate(reports())
+    assert len(rendered) == 3
+
+def test_reports_with_the_same_file_name_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ReportGenerator(ROOT / 'templates', tmp_path).generate([('a b', report()), ('a_b', report())])
+
+def test_site_names_are_unique():
+    names = site_names(['north/site.yaml', 'south/site.yaml', 'roof.yaml', 'north/site.yaml'])
+
+    assert names == ['north_site_1', 'south_site', 'roof', 'north_site_2']
+    assert len({site_filename(name) for name in names}) == 4
+
+def test_failed_writes_are_raised_instead_of_blocking(monkeypatch, tmp_path):
+    def failing_write(path, content):
+        raise OSError("disk full")
+    monkeypatch.setattr(report_generator, '_write', failing_write)
+
+    errors = []
+
+    def generate():
+        try:
+            ReportGenerator(ROOT / 'templates', tmp_path, max_pending = 1).generate((f"site{i}", report()) for i in range(5))
+        except OSError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target = generate, daemon = True)
+    thread.start()
+    thread.join(timeout = 30)
+
+    assert not thread.is_alive()
+    assert str(errors[0]) == "disk full"
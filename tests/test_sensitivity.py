@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core import sensitivity
+from src.core.sensitivity import DEFAULT_BOUNDS, evaluate_samples, sobol_indices
+from src.core.sky_model import SkyModel
+
+@pytest.fixture
+def sky():
+    return SkyModel(47, pd.date_range('2024-01-01', '2024-12-31'), n_steps = 8)
+
+def test_additive_model_indices(monkeypatch, sky):
+    # y = slope + aspect: variances 60²/12 = 300 and 180²/12 = 2700
+    monkeypatch.setattr(
+        sensitivity, 'evaluate_samples',
+        lambda sky, samples, workers = 1: np.repeat((samples['slope'] + samples['aspect']).to_numpy()[:, None], 12, axis = 1)
+    )
+
+    indices = sobol_indices(sky, n = 4096, seed = 0).xs(sky.month_starts[0], level = 'date')
+
+    assert indices.loc['slope', 'S1'] == pytest.approx(0.1, abs = 0.02)
+    assert indices.loc['aspect', 'S1'] == pytest.approx(0.9, abs = 0.02)
+    np.testing.assert_allclose(indices.loc[['slope', 'aspect'], 'ST'], [0.1, 0.9], atol = 0.02)
+    np.testing.assert_allclose(indices.drop(['slope', 'aspect']).to_numpy(), 0, atol = 1e-12)
+
+def test_interaction_only_shows_in_total_index(monkeypatch, sky):
+    # y = (efficiency - mean) * (system_loss - mean) has no first-order effects
+    def product(sky, samples, workers = 1):
+        y = (samples['efficiency'] - 0.185) * (samples['system_loss'] - 0.825)
+        return np.repeat(y.to_numpy()[:, None], 12, axis = 1)
+    monkeypatch.setattr(sensitivity, 'evaluate_samples', product)
+
+    indices = sobol_indices(sky, n = 4096, seed = 0).xs(sky.month_starts[0], level = 'date')
+
+    np.testing.assert_allclose(indices.loc[['efficiency', 'system_loss'], 'S1'], 0, atol = 0.05)
+    np.testing.assert_allclose(indices.loc[['efficiency', 'system_loss'], 'ST'], 1, atol = 0.05)
+
+def test_indices_per_month_and_parameter(sky):
+    indices = sobol_indices(sky, n = 64, seed = 0)
+
+    assert indices.shape == (12 * len(DEFAULT_BOUNDS), 2)
+    assert indices['ST'].xs('efficiency', level = 'parameter').gt(0).all()
+
+def test_unknown_bounds_are_rejected(sky):
+    with pytest.raises(ValueError, match = 'albedo'):
+        sobol_indices(sky, bounds = {'albedo': (0.1, 0.3)}, n = 8)
+
+def test_chunks_give_the_same_result(sky):
+    rng = np.random.default_rng(0)
+    samples = pd.DataFrame({name: rng.uniform(low, high, 50) for name, (low, high) in DEFAULT_BOUNDS.items()})
+
+    np.testing.assert_allclose(
+        evaluate_samples(sky, samples, chunk_size = 7),
+        evaluate_samples(sky, samples, chunk_size = 50)
+    )
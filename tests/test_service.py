@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.service import MicroBatcher, YieldService
+
+CONFIG = {
+    'location': [640000.0, 5170000.0],
+    'crs': 25832,
+    'dem': 'dem.tif',
+    'FeatureSolarRadiation': {'start_date_time': "1/1/2024", 'end_date_time': "12/31/2024"},
+    'optimization': {'optim_file': None},
+    'orientation': {'horizon': False, 'n_steps': 6},
+    'panels': {'south': {'area': 10, 'slope': 30, 'aspect': 180, 'efficiency': 0.2, 'system_loss': 0.8}},
+    'service': {'max_sites': 2},
+}
+
+@pytest.fixture
+def service(tmp_path):
+    return YieldService({**CONFIG, 'output_directory': str(tmp_path), 'feature_store': str(tmp_path)})
+
+def test_concurrent_requests_are_evaluated_in_one_batch():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [2 * item for item in items]
+
+    async def main():
+        batcher = MicroBatcher(double, max_delay = 0.05)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+def test_batches_are_split_at_max_batch():
+    calls = []
+
+    def identity(items):
+        calls.append(len(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(identity, max_batch = 2, max_delay = 0.05)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+
+    assert asyncio.run(main()) == list(range(5))
+    assert calls == [2, 2, 1]
+
+def test_exception_result_only_fails_its_item():
+    async def main():
+        batcher = MicroBatcher(lambda items: [ValueError(item) if item == 1 else item for item in items])
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions = True)
+
+    first, failed, last = asyncio.run(main())
+    assert (first, last) == (0, 2)
+    assert isinstance(failed, ValueError)
+
+def test_yield_of_the_configured_site(service):
+    status, _, body = asyncio.run(service.dispatch('POST', '/yield', b'{}'))
+
+    response = json.loads(body)
+    assert status == 200
+    assert len(response['months']) == 12
+    assert response['total_production'] == pytest.approx(sum(response['production']['south']), abs = 0.1)
+
+@pytest.mark.parametrize('body', [
+    b'not json',
+    b'[1, 2]',
+    b'{"location": [1]}',
+    b'{"location": ["a", "b"]}',
+    b'{"panels": {"south": 30}}',
+    b'{"panels": {"south": {"slope": "steep"}}}',
+])
+def test_invalid_requests_are_bad_requests(service, body):
+    status, _, _ = asyncio.run(service.dispatch('POST', '/yield', body))
+
+    assert status == 400
+
+def test_invalid_sizing_request_is_a_bad_request(service):
+    status, _, body = asyncio.run(service.dispatch('POST', '/sizing', b'{"consumption": [1, 2]}'))
+
+    assert status == 400
+    assert '12 monthly values' in json.loads(body)['error']
+
+@pytest.mark.parametrize('body', [
+    b'{"eff_low": "high"}',
+    b'{"eff_high": [0.2]}',
+    b'{"loss_low": -0.1}',
+    b'{"eff_low": 0.3, "eff_high": 0.2}',
+    b'{"loss_low": 0.9, "loss_high": 0.8}',
+    b'{"loss_high": 1.5}',
+    b'{"n": 0}',
+    b'{"n": 2.5}',
+    b'{"seed": -1}',
+    b'{"area_optim": "large"}',
+    b'{"area": [10, -5]}',
+    b'{"panel": "north"}',
+])
+def test_invalid_sizing_values_are_rejected_before_batching(service, body):
+    status, _, _ = asyncio.run(service.dispatch('POST', '/sizing', body))
+
+    assert status == 400
+    assert service.sizing_batcher.batches == 0
+
+def test_sizing_of_the_configured_site(service):
+    status, _, body = asyncio.run(service.dispatch('POST', '/sizing', b'{"area": [10, 20], "n": 100, "seed": 1}'))
+
+    response = json.loads(body)
+    assert status == 200
+    assert response['size'] == 'area'
+    assert len(response['summary']) == 2
+
+def test_report_consumption_is_checked_before_batching(service):
+    status, _, body = asyncio.run(service.dispatch('POST', '/report', b'{"consumption": [1, 2]}'))
+
+    assert status == 400
+    assert '12 monthly values' in json.loads(body)['error']
+    assert service.batcher.batches == 0
+
+def test_internal_errors_are_server_errors(service, monkeypatch):
+    def broken(items):
+        raise KeyError('transmittivity')
+    monkeypatch.setattr(service.batcher, 'func', broken)
+
+    status, _, _ = asyncio.run(service.dispatch('POST', '/yield', b'{}'))
+
+    assert status == 500
+
+def test_unknown_routes(service):
+    assert asyncio.run(service.dispatch('GET', '/missing', b''))[0] == 404
+    assert asyncio.run(service.dispatch('GET', '/yield', b''))[0] == 405
+
+def test_sky_models_of_the_least_recent_sites_are_dropped(service):
+    service.sky_model((0.0, 0.0))
+    service.sky_model((1000.0, 0.0))
+
+    assert list(service.sky_models) == [(0.0, 0.0), (1000.0, 0.0)]
+    assert tuple(CONFIG['location']) not in service.sky_models
+
+def test_sky_models_are_shared_between_threads(service, monkeypatch):
+    from src import service as service_module
+
+    created = []
+    from_config = service_module.SkyModel.from_config
+
+    def slow_from_config(*args, **kwargs):
+        created.append(1)
+        time.sleep(0.01)
+        return from_config(*args, **kwargs)
+    monkeypatch.setattr(service_module.SkyModel, 'from_config', slow_from_config)
+
+    threads = [threading.Thread(target = service.sky_model, args = ((5000.0, 0.0),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
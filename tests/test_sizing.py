@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from src.transformation import sweep_solar_energy
+
+SRAD = np.full(12, 100.0)
+
+def test_output_scales_with_the_candidate_size():
+    summary, bands, _ = sweep_solar_energy(SRAD, 0.15, 0.2, 0.8, 0.9, area = [10, 20], n = 1000, seed = 0)
+
+    assert summary.index.name == 'area'
+    assert bands.shape == (2, 3, 12)
+    np.testing.assert_allclose(summary.iloc[1], 2 * summary.iloc[0])
+    assert (summary['production_p5'] < summary['production_p95']).all()
+
+def test_kwp_candidates_only_sample_the_system_loss():
+    summary, _, _ = sweep_solar_energy(SRAD, 0.15, 0.2, 0.8, 0.8, kWp = [1, 2], n = 100, seed = 0)
+
+    assert summary.index.name == 'kWp'
+    np.testing.assert_allclose(summary['production_p50'], [0.8 * 1200, 0.8 * 2400])
+
+def test_optimum_is_closest_to_the_consumption():
+    consumption = np.full(12, 0.8 * 100 * 15)
+    summary, _, optimum = sweep_solar_energy(SRAD, 0.2, 0.2, 0.8, 0.8, kWp = [5, 10, 15, 20], consumption = consumption, n = 100)
+
+    assert optimum == 15
+    assert np.isclose(summary.loc[15, 'difference'], 0)
+
+def test_one_size_argument_is_required():
+    with pytest.raises(ValueError):
+        sweep_solar_energy(SRAD, 0.15, 0.2, 0.8, 0.9)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from src.core.orientation import optimize_orientation
+from src.core.sky_model import SkyModel
+from src.utils import RasterGrid
+
+def config(dem, horizon = True):
+    return {
+        'location': [150.0, -150.0],
+        'crs': 25832,
+        'dem': str(dem),
+        'FeatureSolarRadiation': {'start_date_time': "1/1/2024", 'end_date_time': "12/31/2024"},
+        'orientation': {'n_steps': 12, 'n_directions': 8, 'max_distance': 300, 'horizon': horizon},
+    }
+
+class CountingDem:
+    """DEM loader that counts how often the raster is read."""
+
+    def __init__(self, height = 0.0):
+        self.calls = 0
+        self.height = height
+
+    def __call__(self):
+        self.calls += 1
+        values = np.zeros((4, 4))
+        values[:, 3] = self.height
+        return RasterGrid(values, 0, 0, 100)
+
+def test_cache_hit_does_not_read_the_dem(tmp_path):
+    dem_file = tmp_path / 'dem.tif'
+    dem_file.write_bytes(b'dem')
+    dem = CountingDem(height = 100)
+
+    first = SkyModel.from_config(config(dem_file), dem = dem, cache_dir = tmp_path / 'cache')
+    second = SkyModel.from_config(config(dem_file), dem = dem, cache_dir = tmp_path / 'cache')
+
+    assert dem.calls == 1
+    np.testing.assert_array_equal(first.horizon, second.horizon)
+
+def test_edited_dem_invalidates_the_cached_horizon(tmp_path):
+    dem_file = tmp_path / 'dem.tif'
+    dem_file.write_bytes(b'dem')
+    SkyModel.from_config(config(dem_file), dem = CountingDem(height = 100), cache_dir = tmp_path / 'cache')
+
+    dem_file.write_bytes(b'edited dem')
+    dem = CountingDem(height = 0)
+    sky = SkyModel.from_config(config(dem_file), dem = dem, cache_dir = tmp_path / 'cache')
+
+    assert dem.calls == 1
+    np.testing.assert_array_equal(sky.horizon, 0)
+
+def test_disabled_horizon_ignores_dem_and_cache(tmp_path):
+    dem_file = tmp_path / 'dem.tif'
+    dem_file.write_bytes(b'dem')
+    SkyModel.from_config(config(dem_file), dem = CountingDem(height = 100), cache_dir = tmp_path / 'cache')
+
+    dem = CountingDem(height = 100)
+    sky = SkyModel.from_config(config(dem_file, horizon = False), dem = dem, cache_dir = tmp_path / 'cache')
+
+    assert dem.calls == 0
+    np.testing.assert_array_equal(sky.horizon, 0)
+
+def test_optimal_orientation_faces_south_in_the_northern_hemisphere():
+    sky = SkyModel(47, pd.date_range('2024-01-01', '2024-12-31'), n_steps = 24)
+    optimum, _ = optimize_orientation(
+        sky,
+        transmittivity = 0.6,
+        diffuse_proportion = 0.3,
+        slopes = np.arange(0, 91, 5),
+        aspects = np.arange(0, 360, 10)
+    )
+
+    assert optimum['aspect'] == 180
+    assert 20 <= optimum['slope'] <= 50
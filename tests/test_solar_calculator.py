@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from src.core.solar_calculator import SolarCalculator
+from src.utils import load_monthly_radiation
+
+@pytest.fixture
+def stations(fake_arcpy, tmp_path):
+    from benchmarks import synthetic
+
+    dem = synthetic.write_dem(tmp_path / 'dem.tif', size = 100)
+    coords = synthetic.write_stations(tmp_path / 'optim', n_stations = 3, years = 1, size = 100)
+    calculator = SolarCalculator(synthetic.config(tmp_path, dem, days = 60, stations = coords))
+    return calculator, dem, coords
+
+def test_modeled_and_observed_values_line_up_by_station(stations):
+    calculator, dem, coords = stations
+    parameters = (0.6, 0.3)
+    observed = load_monthly_radiation(sorted(coords.parent.glob('*.csv')))
+    modeled, rmse, _ = calculator._error_function(parameters, str(dem), observed, coords)
+    assert sorted(modeled.index.get_level_values('st_id').unique()) == ['st000', 'st001', 'st002']
+
+    # Two months of three stations, joined on station and month
+    joined = modeled.rename('modeled').to_frame().join(observed.rename('observed'), how = 'inner')
+    assert len(joined) == 6
+    assert rmse == pytest.approx(np.sqrt(np.mean((joined['modeled'] - joined['observed'])**2)))
+
+    # Observations equal to the model at the same parameters give no error
+    _, rmse, mae = calculator._error_function(parameters, str(dem), modeled, coords)
+    assert rmse == pytest.approx(0)
+    assert mae == pytest.approx(0)
+
+    # Observations assigned to the wrong stations do
+    swapped = modeled.rename(index = {'st000': 'st001', 'st001': 'st000'}, level = 'st_id')
+    _, rmse, _ = calculator._error_function(parameters, str(dem), swapped, coords)
+    assert rmse > 0
+
+def test_invalid_parameters_are_penalized(stations):
+    calculator, dem, coords = stations
+
+    assert calculator._error_function((0.05, 0.3), str(dem), None, coords) == np.inf
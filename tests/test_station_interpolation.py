@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.station_interpolation import StationInterpolator
+from src.utils import RasterGrid
+from src.workflow import Workflow
+
+CRS = 25832
+DATES = pd.date_range('2024-01-01', periods = 12, freq = 'MS')
+
+def network(values, coords):
+    """Observations and coordinates of stations with one constant value each."""
+    ids = [f"st{i}" for i in range(len(values))]
+    observations = pd.Series(
+        np.repeat(values, len(DATES)),
+        index = pd.MultiIndex.from_product([ids, DATES], names = ['st_id', 'date'])
+    )
+    station_coords = pd.DataFrame(coords, columns = ['x', 'y'], index = pd.Index(ids, name = 'st_id'))
+    return observations, station_coords
+
+def test_idw_returns_station_value_at_station():
+    observations, coords = network([100.0, 200.0, 300.0], [[0, 0], [1000, 0], [0, 1000]])
+    interpolator = StationInterpolator(observations, coords, crs = CRS)
+
+    np.testing.assert_allclose(interpolator.query([[0, 0], [1000, 0]]), [[100.0] * 12, [200.0] * 12], rtol = 1e-6)
+
+def test_idw_weights_equidistant_stations_equally():
+    observations, coords = network([100.0, 300.0], [[0, 0], [1000, 0]])
+    interpolator = StationInterpolator(observations, coords, crs = CRS)
+
+    np.testing.assert_allclose(interpolator.query([[500, 0]]), [[200.0] * 12])
+
+def test_idw_uses_the_k_nearest_stations():
+    observations, coords = network([100.0, 100.0, 1000.0], [[0, 0], [10, 0], [100000, 0]])
+    interpolator = StationInterpolator(observations, coords, crs = CRS, k = 2)
+
+    np.testing.assert_allclose(interpolator.query([[5, 0]]), [[100.0] * 12])
+
+def test_elevation_gradient_is_applied_at_query_elevation():
+    # Insolation rises by 0.1 kWh/m² per m of elevation
+    elevation = np.array([0.0, 100.0, 200.0, 300.0])
+    observations, coords = network(50 + 0.1 * elevation, [[50, -50], [150, -50], [250, -50], [350, -50]])
+    dem = RasterGrid(np.array([elevation]), x_min = 0, y_max = 0, cell_size = 100)
+    interpolator = StationInterpolator(observations, coords, crs = CRS, dem = dem)
+
+    np.testing.assert_allclose(interpolator.query([[150, -50]], elevation = [1000.0]), [[150.0] * 12])
+
+def test_stations_without_shared_ids_are_rejected():
+    observations, _ = network([100.0], [[0, 0]])
+    coords = pd.DataFrame({'x': [0.0], 'y': [0.0]}, index = pd.Index(['other'], name = 'st_id'))
+
+    with pytest.raises(ValueError):
+        StationInterpolator(observations, coords, crs = CRS)
+
+def test_workflow_reads_the_dem_once(monkeypatch):
+    calls = []
+
+    def from_file(path):
+        calls.append(path)
+        return RasterGrid(np.zeros((2, 2)), 0, 0, 1)
+
+    monkeypatch.setattr(RasterGrid, 'from_file', staticmethod(from_file))
+    workflow = Workflow()
+    workflow.config = {'dem': 'dem.tif'}
+
+    assert workflow.get_dem() is workflow.get_dem()
+    assert calls == ['dem.tif']
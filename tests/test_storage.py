@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.storage import simulate_storage
+
+def test_no_capacity_gives_direct_self_consumption():
+    tbl = simulate_storage([5, 0, 3], [2, 4, 3], capacities = [0])
+
+    row = tbl.loc[0]
+    assert row['self_consumption'] == pytest.approx(5)
+    assert row['grid_import'] == pytest.approx(4)
+    assert row['grid_export'] == pytest.approx(3)
+
+def test_surplus_is_shifted_to_the_next_deficit():
+    tbl = simulate_storage(
+        [10, 0], [0, 10], capacities = [20],
+        charge_efficiency = 1, discharge_efficiency = 1, c_rate = None, min_soc = 0, initial_soc = 0
+    )
+
+    assert tbl.loc[20, 'self_consumption'] == pytest.approx(10)
+    assert tbl.loc[20, 'grid_export'] == pytest.approx(0)
+    assert tbl.loc[20, 'self_sufficiency'] == pytest.approx(1)
+
+def test_c_rate_limits_the_power():
+    tbl = simulate_storage(
+        [10, 0], [0, 10], capacities = [10],
+        charge_efficiency = 1, discharge_efficiency = 1, c_rate = 0.5, hours = 1, min_soc = 0, initial_soc = 0
+    )
+
+    assert tbl.loc[10, 'self_consumption'] == pytest.approx(5)
+
+def test_initial_soc_below_min_soc_does_not_discharge():
+    tbl, soc = simulate_storage(
+        np.zeros(3), np.ones(3), capacities = [10], min_soc = 0.3, initial_soc = 0, return_soc = True
+    )
+
+    assert tbl.loc[10, 'self_consumption'] == 0
+    assert tbl.loc[10, 'grid_import'] == pytest.approx(3)
+    np.testing.assert_array_equal(soc, 0)
+
+def test_soc_stays_within_bounds():
+    rng = np.random.default_rng(0)
+    capacities = np.array([0, 2, 5, 10])
+    _, soc = simulate_storage(
+        rng.uniform(0, 10, 365), rng.uniform(0, 10, 365), capacities, min_soc = 0.2, return_soc = True
+    )
+
+    assert np.all(soc >= capacities * 0.2 - 1e-9)
+    assert np.all(soc <= capacities + 1e-9)
+
+def test_series_are_aligned_on_their_index():
+    dates = pd.date_range('2024-01-01', periods = 3)
+    production = pd.Series([1.0, 2.0, 3.0], index = dates)
+    consumption = pd.Series([2.0, 2.0], index = dates[1:])
+
+    tbl = simulate_storage(production, consumption, capacities = [0])
+
+    assert tbl.loc[0, 'self_consumption'] == pytest.approx(4)
+    assert tbl.loc[0, 'self_consumption_ratio'] == pytest.approx(0.8)
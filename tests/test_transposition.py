@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.sky_model import SkyModel
+from src.core.transposition import TranspositionEngine, diffuse_fraction_erbs, extraterrestrial_daily
+from src.workflow import Workflow
+
+DATES = pd.date_range('2024-01-01', '2024-12-31')
+
+def test_erbs_diffuse_fraction_limits():
+    short, long = np.deg2rad(70), np.deg2rad(100)
+
+    np.testing.assert_allclose(diffuse_fraction_erbs([0, 0], [short, long]), 1)
+    np.testing.assert_allclose(diffuse_fraction_erbs([0.9, 0.9], [short, long]), [0.143, 0.175])
+
+def test_erbs_diffuse_fraction_falls_with_clearness():
+    fraction = diffuse_fraction_erbs(np.linspace(0, 0.7, 15), np.deg2rad(90))
+
+    assert np.all(np.diff(fraction) <= 0)
+    assert fraction[-1] < 0.3
+
+def test_extraterrestrial_insolation_at_the_equator():
+    # About 10.4 kWh/m² per day at the equinoxes
+    assert extraterrestrial_daily(0, 80) == pytest.approx(10.4, abs = 0.2)
+    assert extraterrestrial_daily(60, 355) < extraterrestrial_daily(60, 172)
+
+def test_horizontal_panel_receives_the_horizontal_insolation():
+    sky = SkyModel(47, DATES, n_steps = 24)
+    engine = TranspositionEngine(sky, {'flat': {'area': 2, 'slope': 0, 'aspect': 180}})
+
+    tbl = engine.transpose(pd.Series(3.0, index = DATES))
+
+    np.testing.assert_allclose(tbl['global_ave'], 3.0, rtol = 1e-6)
+    np.testing.assert_allclose(tbl['srad'], 6.0, rtol = 1e-6)
+
+def test_tilted_south_panel_gains_in_winter():
+    sky = SkyModel(47, DATES, n_steps = 24)
+    engine = TranspositionEngine(sky, {'south': {'slope': 40, 'aspect': 180}, 'north': {'slope': 40, 'aspect': 0}})
+
+    tbl = engine.transpose(pd.Series(1.0, index = DATES)).set_index(['panel', 'date'])['global_ave']
+
+    january = tbl.xs('south').loc['2024-01'].mean()
+    assert january > 1.0
+    assert tbl.xs('north').loc['2024-01'].mean() < 1.0
+
+def test_monthly_totals_are_spread_over_the_days():
+    sky = SkyModel(47, DATES, n_steps = 24)
+    engine = TranspositionEngine(sky, {'flat': {'slope': 0}})
+    monthly = pd.Series(31.0, index = pd.date_range('2024-01-01', periods = 12, freq = 'MS'))
+
+    tbl = engine.transpose(monthly)
+
+    np.testing.assert_allclose(tbl.set_index('date')['global_ave'].loc['2024-01'], 1.0, rtol = 1e-6)
+
+def transposition_workflow(tmp_path, source = 'interpolation'):
+    optim = tmp_path / 'optim'
+    optim.mkdir()
+    (optim / 'st0.csv').write_text('date,insol\n2024-01-01,1\n')
+    workflow = Workflow()
+    workflow.config = {
+        'location': [0, 0], 'crs': 25832, 'dem': str(tmp_path / 'dem.tif'),
+        'cache_dir': str(tmp_path / 'cache'), 'template_dir': str(tmp_path), 'report_out': str(tmp_path / 'report'),
+        'FeatureSolarRadiation': {}, 'consumption': {},
+        'optimization': {'optim_dir': str(optim), 'optim_coords': str(optim / 'stations.shp')},
+        'transposition': {'enabled': True, 'source': source},
+        'orientation': {},
+        'panels': {'south': {'slope': 30, 'aspect': 180}},
+    }
+    return workflow
+
+def test_interpolated_transposition_depends_on_the_station_files(tmp_path):
+    pipeline = transposition_workflow(tmp_path).build_pipeline()
+
+    files = [key for key in pipeline.components('radiation:south') if key.startswith('file:')]
+    assert f"file:{tmp_path / 'dem.tif'}" in files
+    assert f"file:{tmp_path / 'optim' / 'stations.shp'}" in files
+    assert f"file:{tmp_path / 'optim' / 'st0.csv'}" in files
+
+def test_station_csv_transposition_depends_on_the_csv(tmp_path):
+    pipeline = transposition_workflow(tmp_path, source = str(tmp_path / 'station.csv')).build_pipeline()
+
+    files = [key for key in pipeline.components('radiation:south') if key.startswith('file:')]
+    assert f"file:{tmp_path / 'station.csv'}" in files
+    assert not any(key.endswith('st0.csv') for key in files)
+
+def test_transposition_skips_the_calibration(tmp_path):
+    pipeline = transposition_workflow(tmp_path).build_pipeline()
+
+    assert all('calibration' not in stage.depends for stage in pipeline.stages.values())
+
+def test_monthly_means_of_other_years_are_matched_by_month():
+    sky = SkyModel(47, pd.date_range('2023-01-01', '2023-12-31'), n_steps = 24)
+    engine = TranspositionEngine(sky, {'flat': {'slope': 0}})
+    # Long-term monthly means of the stations are dated in 2024
+    monthly = pd.Series(np.arange(1, 13) * 31.0, index = pd.date_range('2024-01-01', periods = 12, freq = 'MS'))
+
+    tbl = engine.transpose(monthly).set_index('date')['global_ave']
+
+    assert len(tbl) == 365
+    np.testing.assert_allclose(tbl.loc['2023-01'], 1.0, rtol = 1e-6)
+    np.testing.assert_allclose(tbl.loc['2023-03'], 3.0, rtol = 1e-6)
+
+def test_daily_values_outside_the_period_are_rejected():
+    sky = SkyModel(47, DATES, n_steps = 24)
+    engine = TranspositionEngine(sky, {'flat': {'slope': 0}})
+
+    with pytest.raises(ValueError, match = 'does not overlap'):
+        engine.transpose(pd.Series(3.0, index = pd.date_range('2020-01-01', '2020-12-31')))
+
+def test_interpolated_station_means_are_transposed_to_the_configured_year(tmp_path, monkeypatch):
+    class Interpolator:
+        dates = pd.date_range('2024-01-01', periods = 12, freq = 'MS')
+
+        def query(self, locations):
+            return np.full((len(locations), 12), 60.0)
+
+    workflow = transposition_workflow(tmp_path)
+    workflow.config['FeatureSolarRadiation'] = {'start_date_time': "1/1/2023", 'end_date_time': "12/31/2023"}
+    workflow.config['orientation'] = {'horizon': False}
+    monkeypatch.setattr(workflow, 'get_interpolator', Interpolator)
+
+    tbl = workflow.transpose_measured()
+
+    assert len(tbl) == 365
+    assert not tbl['global_ave'].isna().any()
+
+def test_station_climatology_uses_the_configured_albedo(tmp_path):
+    dates = pd.date_range('2023-01-01', '2023-12-31')
+    pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'insol': 3.0}).to_csv(tmp_path / 'station.csv', index = False)
+
+    def mean_production(albedo):
+        site = tmp_path / f'albedo_{albedo}'
+        site.mkdir()
+        workflow = transposition_workflow(site)
+        workflow.config['FeatureSolarRadiation'] = {'start_date_time': "1/1/2023", 'end_date_time': "12/31/2023"}
+        workflow.config['orientation'] = {'horizon': False}
+        workflow.config['transposition']['albedo'] = albedo
+        workflow.config['panels']['south'].update(efficiency = 0.2, system_loss = 0.85, area = 10)
+        workflow.config['climatology'] = {'source': str(tmp_path / 'station.csv'), 'years': [2023, 2023]}
+        return workflow.climatology().mean.sum()
+
+    assert mean_production(0.6) > mean_production(0.0)